@@ -68,6 +68,7 @@ setup(
             "utilities/SimDD.schema",
             "tests/config_files/*.xmi",
             "tests/config_files/*.json",
+            "tests/config_files/*.fgo",
         ]
     },
     scripts=["scripts/DishElementMaster-DS", "scripts/Weather-DS"],
@@ -75,6 +76,8 @@ setup(
         "console_scripts": [
             "tango-simlib-generator" "= tango_simlib.tango_sim_generator:main",
             "tango-simlib-launcher = tango_simlib.tango_launcher:main",
+            "tango-simlib-benchmark = tango_simlib.benchmarks.runner:main",
+            "tango-simlib-loadtest = tango_simlib.loadtest:main",
             "tango-yaml = tango_simlib.tango_yaml_tools.main:main",
         ]
     },
@@ -0,0 +1,52 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Performance benchmarks of the models, parsers, generator and YAML tools.
+
+A benchmark is registered with the :func:`benchmark` decorator on a function that
+takes a parameter (e.g. a number of quantities or a file name), does the setup, and
+returns the function to time. The benchmarks are run with
+``python -m tango_simlib.benchmarks`` or ``tango-simlib-benchmark``, see
+:mod:`tango_simlib.benchmarks.runner`.
+
+"""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+from collections import OrderedDict
+
+# Benchmark name -> (setup function, parameters)
+BENCHMARKS = OrderedDict()
+
+# The modules registering the benchmarks, in run order.
+BENCHMARK_MODULES = (
+    "tango_simlib.benchmarks.bench_model",
+    "tango_simlib.benchmarks.bench_parsers",
+    "tango_simlib.benchmarks.bench_generator",
+    "tango_simlib.benchmarks.bench_yaml_tools",
+)
+
+
+def benchmark(name, params=(None,)):
+    """Register a benchmark.
+
+    Parameters
+    ----------
+    name : str
+        Name of the benchmark, e.g. "model.update".
+    params : sequence
+        The parameters the benchmark is run with, each passed to the decorated
+        function. They must be JSON serialisable.
+
+    """
+
+    def register(setup):
+        assert name not in BENCHMARKS, "Benchmark {} already registered".format(name)
+        BENCHMARKS[name] = (setup, tuple(params))
+        return setup
+
+    return register
@@ -0,0 +1,11 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+
+from tango_simlib.benchmarks.runner import main
+
+if __name__ == "__main__":
+    main()
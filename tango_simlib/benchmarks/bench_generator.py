@@ -0,0 +1,53 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Benchmarks of the device model configuration from the description files."""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+from tango_simlib import tango_sim_generator
+from tango_simlib.benchmarks import benchmark
+from tango_simlib.benchmarks.synthetic import get_benchmark_file
+
+
+@benchmark(
+    "generator.configure_device_models",
+    params=(
+        "Weather.xmi",
+        "Weather_SimDD.json",
+        "DishElementMaster.xmi",
+        "database2.fgo",
+        "synthetic.xmi*10000",
+        "synthetic.json*1000",
+        "synthetic.fgo*10000",
+    ),
+)
+def time_configure_device_models(file_spec):
+    sim_data_files = [get_benchmark_file(file_spec)]
+
+    def configure_device_models():
+        tango_sim_generator.configure_device_models(
+            sim_data_files, "benchmark/generator/configure"
+        )
+
+    return configure_device_models
+
+
+@benchmark(
+    "generator.get_tango_device_server",
+    params=("Weather_SimDD.json", "synthetic.xmi*1000", "synthetic.xmi*10000"),
+)
+def time_get_tango_device_server(file_spec):
+    sim_data_files = [get_benchmark_file(file_spec)]
+    models = tango_sim_generator.configure_device_models(
+        sim_data_files, "benchmark/generator/server"
+    )
+
+    def get_tango_device_server():
+        tango_sim_generator.get_tango_device_server(models, sim_data_files)
+
+    return get_tango_device_server
@@ -0,0 +1,72 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Benchmarks of the model updates."""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import itertools
+
+from tango_simlib import model, quantities
+from tango_simlib.benchmarks import benchmark
+from tango_simlib.update_engine import UpdateEngine
+
+
+class BenchmarkModel(model.Model):
+    """A model with `num_quantities` Gaussian and as many constant quantities."""
+
+    def __init__(self, name, num_quantities, **kwargs):
+        self.num_quantities = num_quantities
+        super(BenchmarkModel, self).__init__(name, min_update_period=0.0, **kwargs)
+
+    def setup_sim_quantities(self):
+        for index in range(self.num_quantities):
+            self.sim_quantities["gaussian{}".format(index)] = (
+                quantities.GaussianSlewLimited(
+                    mean=20.0,
+                    std_dev=1.0,
+                    max_slew_rate=1.0,
+                    min_bound=-10.0,
+                    max_bound=50.0,
+                    start_time=self.start_time,
+                    meta={},
+                )
+            )
+            self.sim_quantities["constant{}".format(index)] = quantities.ConstantQuantity(
+                start_value=True, start_time=self.start_time, meta={}
+            )
+        super(BenchmarkModel, self).setup_sim_quantities()
+
+
+def _get_clock():
+    # Every update is one second after the previous one, so every update steps.
+    seconds = itertools.count(1.0)
+    return lambda: next(seconds)
+
+
+@benchmark("model.update", params=(10, 100, 1000))
+def time_model_update(num_quantities):
+    sim_model = BenchmarkModel(
+        "benchmark/model/update", num_quantities, start_time=0.0, time_func=_get_clock()
+    )
+    return sim_model.update
+
+
+@benchmark("update_engine.tick", params=(1, 8, 64))
+def time_update_engine_tick(num_models):
+    """Tick models of 10 Gaussian and 10 constant quantities, like small devices."""
+    engine = UpdateEngine()
+    clock = _get_clock()
+    for index in range(num_models):
+        sim_model = BenchmarkModel(
+            "benchmark/update_engine/{}".format(index),
+            10,
+            start_time=0.0,
+            time_func=clock,
+        )
+        engine.add_model(sim_model)
+    return engine.tick
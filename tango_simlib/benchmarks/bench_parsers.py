@@ -0,0 +1,59 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Benchmarks of the simulator description file parsers."""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+from tango_simlib.benchmarks import benchmark
+from tango_simlib.benchmarks.synthetic import get_benchmark_file
+from tango_simlib.utilities.fandango_json_parser import FandangoExportDeviceParser
+from tango_simlib.utilities.sim_xmi_parser import XmiParser
+from tango_simlib.utilities.simdd_json_parser import SimddParser
+
+
+def _time_parse(parser_class, file_spec):
+    file_name = get_benchmark_file(file_spec)
+
+    def parse():
+        parser_class().parse(file_name)
+
+    return parse
+
+
+@benchmark(
+    "parsers.XmiParser",
+    params=(
+        "Weather.xmi",
+        "DishElementMaster.xmi",
+        "synthetic.xmi*1000",
+        "synthetic.xmi*10000",
+    ),
+)
+def time_xmi_parser(file_spec):
+    return _time_parse(XmiParser, file_spec)
+
+
+@benchmark(
+    "parsers.SimddParser",
+    params=(
+        "Weather_SimDD.json",
+        "MkatVds_SimDD.json",
+        "synthetic.json*1000",
+        "synthetic.json*10000",
+    ),
+)
+def time_simdd_parser(file_spec):
+    return _time_parse(SimddParser, file_spec)
+
+
+@benchmark(
+    "parsers.FandangoExportDeviceParser",
+    params=("database2.fgo", "synthetic.fgo*1000", "synthetic.fgo*10000"),
+)
+def time_fandango_parser(file_spec):
+    return _time_parse(FandangoExportDeviceParser, file_spec)
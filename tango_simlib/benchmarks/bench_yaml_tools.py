@@ -0,0 +1,40 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Benchmarks of the YAML translation and the device validation."""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+from tango_simlib.benchmarks import benchmark
+from tango_simlib.benchmarks.synthetic import get_benchmark_file
+from tango_simlib.tango_yaml_tools.base import TangoToYAML
+from tango_simlib.utilities.sim_xmi_parser import XmiParser
+from tango_simlib.utilities.validate_device import compare_data
+
+YAML_FILES = ("Weather.xmi", "DishElementMaster.xmi", "synthetic.xmi*1000")
+
+
+def _get_yaml_tool(file_spec):
+    yaml_tool = TangoToYAML(XmiParser)
+    yaml_tool.parser.parse(get_benchmark_file(file_spec))
+    return yaml_tool
+
+
+@benchmark("yaml_tools.build_yaml", params=YAML_FILES)
+def time_build_yaml(file_spec):
+    return _get_yaml_tool(file_spec)._build_yaml
+
+
+@benchmark("yaml_tools.compare_data", params=YAML_FILES)
+def time_compare_data(file_spec):
+    """Compare a specification with a device that matches it."""
+    specification_yaml = _get_yaml_tool(file_spec)._build_yaml()
+
+    def compare():
+        compare_data(specification_yaml, specification_yaml, True)
+
+    return compare
@@ -0,0 +1,288 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Run the benchmarks, store their results and compare them with earlier results.
+
+The results of a run are saved as JSON in the results directory, in a file named
+after the tango_simlib version, so that the results of releases can be compared:
+
+.. code-block:: bash
+
+    tango-simlib-benchmark --results-dir benchmark_results
+    tango-simlib-benchmark --compare benchmark_results/0.8.0.json
+
+"""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import timeit
+
+import tango_simlib
+
+from tango_simlib.benchmarks import BENCHMARK_MODULES, BENCHMARKS
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RESULTS_DIR = "benchmark_results"
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.1
+DEFAULT_THRESHOLD = 0.1
+
+
+def load_benchmarks():
+    """Import the benchmark modules, which registers their benchmarks.
+
+    Returns
+    -------
+    benchmarks : OrderedDict
+        Benchmark name -> (setup function, parameters)
+
+    """
+    for module_name in BENCHMARK_MODULES:
+        importlib.import_module(module_name)
+    return BENCHMARKS
+
+
+def time_function(func, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME):
+    """Time a function.
+
+    The number of calls per measurement is increased until a measurement takes at
+    least `min_time` seconds.
+
+    Returns
+    -------
+    timing : dict
+        {"number": <calls per measurement>, "times": [<seconds per call>, ...],
+        "min": <seconds>, "median": <seconds>}
+
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        # Aim just past the minimum time, without overshooting a slow function.
+        number = max(number * 2, int(number * 1.2 * min_time / max(elapsed, 1e-9)))
+    times = sorted(
+        [elapsed / number] + [t / number for t in timer.repeat(repeat - 1, number)]
+    )
+    middle = len(times) // 2
+    median = times[middle] if len(times) % 2 else (times[middle - 1] + times[middle]) / 2
+    return {"number": number, "times": times, "min": times[0], "median": median}
+
+
+def run_benchmarks(
+    name_filter=None, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME, log=None
+):
+    """Run the registered benchmarks.
+
+    Parameters
+    ----------
+    name_filter : str
+        Only run the benchmarks whose name contains this string.
+    log : callable
+        Called with a line of text after each benchmark.
+
+    Returns
+    -------
+    results : list
+        A dict per benchmark and parameter: {"name": <benchmark name>,
+        "param": <parameter>, ...}, with the timing of :func:`time_function` or
+        an "error" message if the benchmark failed.
+
+    """
+    results = []
+    for name, (setup, params) in load_benchmarks().items():
+        if name_filter and name_filter not in name:
+            continue
+        for param in params:
+            result = {"name": name, "param": param}
+            try:
+                result.update(time_function(setup(param), repeat, min_time))
+            except Exception as error:
+                MODULE_LOGGER.exception("Benchmark %s(%s) failed", name, param)
+                result["error"] = str(error)
+            results.append(result)
+            if log:
+                log(format_result(result))
+    return results
+
+
+def format_result(result):
+    label = _get_label(result)
+    if "error" in result:
+        return "{:<60} failed: {}".format(label, result["error"])
+    return "{:<60} {:>12}  (median {}, {} calls)".format(
+        label,
+        _format_seconds(result["min"]),
+        _format_seconds(result["median"]),
+        result["number"],
+    )
+
+
+def get_results_file_name(results_dir, version=tango_simlib.__version__):
+    """The file the results of `version` are saved in."""
+    return os.path.join(results_dir, re.sub(r"[^\w.+-]", "_", version) + ".json")
+
+
+def save_results(results, file_name):
+    """Save benchmark results with a description of the environment."""
+    results_dir = os.path.dirname(file_name)
+    if results_dir and not os.path.isdir(results_dir):
+        os.makedirs(results_dir)
+    with open(file_name, "w") as results_file:
+        json.dump(
+            {
+                "version": tango_simlib.__version__,
+                "date": datetime.datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            },
+            results_file,
+            indent=2,
+        )
+
+
+def load_results(file_name):
+    with open(file_name) as results_file:
+        return json.load(results_file)["results"]
+
+
+def compare_results(baseline, results, threshold=DEFAULT_THRESHOLD):
+    """Compare the minimum times of two benchmark runs.
+
+    Parameters
+    ----------
+    baseline, results : list
+        Results as returned by :func:`run_benchmarks`.
+    threshold : float
+        Relative slow-down above which a benchmark is reported as a regression.
+
+    Returns
+    -------
+    comparisons : list
+        (label, baseline seconds, seconds, ratio, is_regression) of the benchmarks
+        that succeeded in both runs.
+
+    """
+    baseline_times = {
+        _get_label(result): result["min"] for result in baseline if "error" not in result
+    }
+    comparisons = []
+    for result in results:
+        label = _get_label(result)
+        if "error" in result or label not in baseline_times:
+            continue
+        ratio = result["min"] / baseline_times[label]
+        comparisons.append(
+            (label, baseline_times[label], result["min"], ratio, ratio > 1 + threshold)
+        )
+    return comparisons
+
+
+def _get_label(result):
+    if result["param"] is None:
+        return result["name"]
+    return "{}({})".format(result["name"], result["param"])
+
+
+def _format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return "{:.3f} {}".format(seconds / scale, unit)
+    return "{:.1f} ns".format(seconds / 1e-9)
+
+
+def get_argparser():
+    parser = argparse.ArgumentParser(
+        description="Run the tango_simlib benchmarks and store their results."
+    )
+    parser.add_argument(
+        "--filter", help="Only run the benchmarks whose name contains this text."
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the benchmarks and exit."
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="Number of measurements per benchmark (default %(default)s).",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=DEFAULT_MIN_TIME,
+        help="Minimum duration of a measurement [seconds] (default %(default)s).",
+    )
+    parser.add_argument(
+        "--results-dir",
+        default=DEFAULT_RESULTS_DIR,
+        help="Directory where the results are saved (default %(default)s).",
+    )
+    parser.add_argument("--no-save", action="store_true", help="Do not save the results.")
+    parser.add_argument(
+        "--compare",
+        metavar="RESULTS_FILE",
+        help="Compare the results with those saved in this file. The exit code is 1 "
+        "if a benchmark got slower by more than the threshold.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slow-down reported as a regression (default %(default)s).",
+    )
+    return parser
+
+
+def main():
+    args = get_argparser().parse_args()
+    if args.list:
+        for name, (_, params) in load_benchmarks().items():
+            print(name, ", ".join(str(param) for param in params))
+        return
+    baseline = load_results(args.compare) if args.compare else None
+    results = run_benchmarks(args.filter, args.repeat, args.min_time, log=print)
+    if not args.no_save:
+        file_name = get_results_file_name(args.results_dir)
+        save_results(results, file_name)
+        print("Results saved in {}".format(file_name))
+    if baseline is None:
+        return
+    regressions = 0
+    print("\nComparison with {}:".format(args.compare))
+    for label, baseline_time, time_, ratio, is_regression in compare_results(
+        baseline, results, args.threshold
+    ):
+        regressions += is_regression
+        print(
+            "{:<60} {:>12} -> {:>12}  x{:.2f}{}".format(
+                label,
+                _format_seconds(baseline_time),
+                _format_seconds(time_),
+                ratio,
+                "  REGRESSION" if is_regression else "",
+            )
+        )
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
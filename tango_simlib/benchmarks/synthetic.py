@@ -0,0 +1,538 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Synthetic simulator description files, to measure how the code scales.
+
+The files are valid XMI, SimDD or fandango (fgo) files with any number of attributes,
+commands and devices. The attributes cycle through the kinds in
+:data:`ATTRIBUTE_KINDS` and the commands through :data:`COMMAND_KINDS`. SimDD has no
+enumerated type, so the SimDD enum attributes are strings.
+
+Files can be written from the command line,
+
+.. code-block:: bash
+
+    python -m tango_simlib.benchmarks.synthetic xmi --attributes 10000 \\
+        --output-dir /tmp/synthetic
+
+The benchmarks refer to their files with a file spec, see :func:`get_benchmark_file`.
+
+"""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import argparse
+import atexit
+import json
+import os
+import shutil
+import tempfile
+
+import pkg_resources
+
+CONFIG_FILES_PACKAGE = "tango_simlib.tests.config_files"
+SYNTHETIC_FILE_PREFIX = "synthetic"
+SYNTHETIC_FORMATS = ("xmi", "json", "fgo")
+ATTRIBUTE_KINDS = ("double", "boolean", "enum", "spectrum", "string")
+COMMAND_KINDS = ("void", "double_in", "double_out")
+
+DEFAULT_CLASS_NAME = "SyntheticDevice"
+DEFAULT_NUM_ENUM_LABELS = 4
+DEFAULT_SPECTRUM_SIZE = 16
+
+_XMI_HEADER = """<?xml version="1.0" encoding="ASCII"?>
+<pogoDsl:PogoSystem xmi:version="2.0" xmlns:xmi="http://www.omg.org/XMI" \
+xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" \
+xmlns:pogoDsl="http://www.esrf.fr/tango/pogo/PogoDsl">
+"""
+_XMI_CLASS_HEADER = """  <classes name="{class_name}" pogoRevision="9.1">
+    <description description="Synthetic device" title="" sourcePath="" \
+language="Python" filestogenerate="XMI   file" license="GPL" copyright="" \
+hasMandatoryProperty="false" hasConcreteProperty="true" hasAbstractCommand="false" \
+hasAbstractAttribute="false">
+      <inheritances classname="Device_Impl" sourcePath=""/>
+      <identification contact="at ska.ac.za - cam" author="cam" emailDomain="ska.ac.za" \
+classFamily="Simulators" siteSpecific="" platform="Unix Like" bus="Ethernet" \
+manufacturer="none" reference=""/>
+    </description>
+"""
+_XMI_COMMAND = """\
+    <commands name="{name}" description="{description}" execMethod="{exec_method}" \
+displayLevel="OPERATOR" polledPeriod="0" isDynamic="false">
+      <argin description="">
+        <type xsi:type="pogoDsl:{argin_type}"/>
+      </argin>
+      <argout description="">
+        <type xsi:type="pogoDsl:{argout_type}"/>
+      </argout>
+      <status abstract="false" inherited="false" concrete="true" concreteHere="true"/>
+    </commands>
+"""
+_XMI_ATTRIBUTE = """\
+    <attributes name="{name}" attType="{att_type}" rwType="{rw_type}" \
+displayLevel="OPERATOR" polledPeriod="0" maxX="{max_x}" maxY="" allocReadMember="true" \
+isDynamic="false">
+      <dataType xsi:type="pogoDsl:{data_type}"/>
+      <changeEvent fire="false" libCheckCriteria="false"/>
+      <archiveEvent fire="false" libCheckCriteria="false"/>
+      <dataReadyEvent fire="false" libCheckCriteria="true"/>
+      <status abstract="false" inherited="false" concrete="true" concreteHere="true"/>
+      <properties description="Synthetic {kind} attribute" label="{name}" unit="" \
+standardUnit="" displayUnit="" format="" maxValue="{max_value}" minValue="{min_value}" \
+maxAlarm="" minAlarm="" maxWarning="" minWarning="" deltaTime="" deltaValue=""/>
+{enum_labels}    </attributes>
+"""
+_XMI_CLASS_FOOTER = """\
+    <preferences docHome="./doc_html" makefileHome="/usr/share/pogo/preferences"/>
+  </classes>
+"""
+_XMI_FOOTER = "</pogoDsl:PogoSystem>\n"
+
+# Attribute kind -> (XMI attType, XMI data type)
+_XMI_ATTRIBUTE_TYPES = {
+    "double": ("Scalar", "DoubleType"),
+    "boolean": ("Scalar", "BooleanType"),
+    "enum": ("Scalar", "EnumType"),
+    "spectrum": ("Spectrum", "DoubleType"),
+    "string": ("Scalar", "StringType"),
+}
+# Command kind -> (input type, output type), in TANGO type names without "Dev".
+_COMMAND_TYPES = {
+    "void": ("Void", "Void"),
+    "double_in": ("Double", "Void"),
+    "double_out": ("Void", "Double"),
+}
+
+_synthetic_files_dir = None
+
+
+def _get_attribute_names(num_attributes):
+    return [
+        (
+            "{}{}".format(ATTRIBUTE_KINDS[index % len(ATTRIBUTE_KINDS)], index),
+            ATTRIBUTE_KINDS[index % len(ATTRIBUTE_KINDS)],
+        )
+        for index in range(num_attributes)
+    ]
+
+
+def _get_command_names(num_commands):
+    return [
+        ("Command{}".format(index), COMMAND_KINDS[index % len(COMMAND_KINDS)])
+        for index in range(num_commands)
+    ]
+
+
+def _get_enum_labels(num_enum_labels):
+    return ["LABEL{}".format(index) for index in range(num_enum_labels)]
+
+
+def generate_xmi(
+    num_attributes,
+    num_commands,
+    num_enum_labels=DEFAULT_NUM_ENUM_LABELS,
+    spectrum_size=DEFAULT_SPECTRUM_SIZE,
+    class_names=(DEFAULT_CLASS_NAME,),
+):
+    """Generate an XMI file describing a device class per name in `class_names`."""
+    enum_labels = "".join(
+        "      <enumLabels>{}</enumLabels>\n".format(label)
+        for label in _get_enum_labels(num_enum_labels)
+    )
+    class_body = []
+    for name, kind in _get_command_names(num_commands):
+        argin_type, argout_type = _COMMAND_TYPES[kind]
+        class_body.append(
+            _XMI_COMMAND.format(
+                name=name,
+                description="Synthetic {} command".format(kind),
+                exec_method=name.lower(),
+                argin_type=argin_type + "Type",
+                argout_type=argout_type + "Type",
+            )
+        )
+    for name, kind in _get_attribute_names(num_attributes):
+        att_type, data_type = _XMI_ATTRIBUTE_TYPES[kind]
+        class_body.append(
+            _XMI_ATTRIBUTE.format(
+                name=name,
+                kind=kind,
+                att_type=att_type,
+                rw_type="READ_WRITE" if kind == "enum" else "READ",
+                max_x=spectrum_size if kind == "spectrum" else "",
+                data_type=data_type,
+                max_value=100 if kind == "double" else "",
+                min_value=-100 if kind == "double" else "",
+                enum_labels=enum_labels if kind == "enum" else "",
+            )
+        )
+    class_body = "".join(class_body)
+    return "".join(
+        [_XMI_HEADER]
+        + [
+            _XMI_CLASS_HEADER.format(class_name=class_name)
+            + class_body
+            + _XMI_CLASS_FOOTER
+            for class_name in class_names
+        ]
+        + [_XMI_FOOTER]
+    )
+
+
+def generate_simdd(
+    num_attributes,
+    num_commands,
+    spectrum_size=DEFAULT_SPECTRUM_SIZE,
+    class_name=DEFAULT_CLASS_NAME,
+):
+    """Generate a SimDD file describing a device class."""
+    attributes = []
+    for name, kind in _get_attribute_names(num_attributes):
+        attribute = {
+            "name": name,
+            "label": name,
+            "description": "Synthetic {} attribute".format(kind),
+            "data_type": {
+                "double": "Double",
+                "boolean": "Boolean",
+                "spectrum": "Double",
+            }.get(kind, "String"),
+            "data_format": "Spectrum" if kind == "spectrum" else "Scalar",
+            "data_shape": {
+                "max_dim_x": spectrum_size if kind == "spectrum" else 1,
+                "max_dim_y": 0,
+            },
+            "attributeInterlocks": {"writable": "READ"},
+            "attributeControlSystem": {"display_level": "OPERATOR", "period": 1000},
+        }
+        if kind == "double":
+            attribute["attributeErrorChecking"] = {"min_value": -100, "max_value": 100}
+            attribute["dataSimulationParameters"] = {
+                "quantity_simulation_type": "GaussianSlewLimited",
+                "min_bound": -100,
+                "max_bound": 100,
+                "mean": 0,
+                "std_dev": 10,
+                "max_slew_rate": 5,
+                "update_period": 1000,
+            }
+        else:
+            attribute["dataSimulationParameters"] = {
+                "quantity_simulation_type": "ConstantQuantity"
+            }
+        attributes.append({"basicAttributeData": attribute})
+    commands = []
+    for name, kind in _get_command_names(num_commands):
+        dtype_in, dtype_out = _COMMAND_TYPES[kind]
+        commands.append(
+            {
+                "basicCommandData": {
+                    "name": name,
+                    "description": "Synthetic {} command".format(kind),
+                    "actions": [],
+                    "input_parameters": {
+                        "dtype_in": dtype_in,
+                        "doc_in": "",
+                        "dformat_in": "Scalar",
+                    },
+                    "output_parameters": {
+                        "dtype_out": dtype_out,
+                        "doc_out": "",
+                        "dformat_out": "Scalar",
+                    },
+                }
+            }
+        )
+    return json.dumps(
+        {"class_name": class_name, "dynamicAttributes": attributes, "commands": commands},
+        indent=2,
+    )
+
+
+def generate_fgo(
+    num_attributes,
+    num_commands,
+    num_enum_labels=DEFAULT_NUM_ENUM_LABELS,
+    spectrum_size=DEFAULT_SPECTRUM_SIZE,
+    class_name=DEFAULT_CLASS_NAME,
+    device_names=("synthetic/device/1",),
+):
+    """Generate a fandango export of a device per name in `device_names`.
+
+    A single device is exported as an object, several devices as a list.
+
+    """
+    devices = []
+    for device_name in device_names:
+        attributes = {}
+        for name, kind in _get_attribute_names(num_attributes):
+            attributes[name] = _get_fgo_attribute(
+                device_name, name, kind, num_enum_labels, spectrum_size
+            )
+        commands = {}
+        for name, kind in _get_command_names(num_commands):
+            in_type, out_type = _COMMAND_TYPES[kind]
+            commands[name] = {
+                "disp_level": "OPERATOR",
+                "name": name,
+                "cmd_tag": 0,
+                "in_type": "Dev" + in_type,
+                "in_type_desc": "Uninitialised",
+                "out_type": "Dev" + out_type,
+                "out_type_desc": "Uninitialised",
+                "device": device_name,
+                "cmd_name": name,
+            }
+        devices.append(
+            {
+                "name": device_name,
+                "dev_class": class_name,
+                "server": "{}/synthetic".format(class_name),
+                "host": "localhost",
+                "level": 0,
+                "attributes": attributes,
+                "commands": commands,
+                "class_properties": {},
+                "properties": {},
+            }
+        )
+    return json.dumps(devices[0] if len(devices) == 1 else devices, indent=2)
+
+
+def _get_fgo_attribute(device_name, name, kind, num_enum_labels, spectrum_size):
+    data_type, value = {
+        "double": ("DevDouble", 0.0),
+        "boolean": ("DevBoolean", False),
+        "enum": ("DevEnum", 0),
+        "spectrum": ("DevDouble", [0.0] * spectrum_size),
+        "string": ("DevString", ""),
+    }[kind]
+    not_specified = "Not specified"
+    return {
+        "name": name,
+        "label": name,
+        "description": "Synthetic {} attribute".format(kind),
+        "data_type": data_type,
+        "data_format": "SPECTRUM" if kind == "spectrum" else "SCALAR",
+        "writable": "READ_WRITE" if kind == "enum" else "READ",
+        "max_dim_x": spectrum_size if kind == "spectrum" else 1,
+        "max_dim_y": 0,
+        "enum_labels": _get_enum_labels(num_enum_labels) if kind == "enum" else [],
+        "value": value,
+        "quality": "ATTR_VALID",
+        "unit": "",
+        "standard_unit": "No standard unit",
+        "display_unit": "No display unit",
+        "format": "%6.2f" if data_type == "DevDouble" else "%s",
+        "max_value": "100" if kind == "double" else not_specified,
+        "min_value": "-100" if kind == "double" else not_specified,
+        "max_alarm": not_specified,
+        "min_alarm": not_specified,
+        "polling": 0,
+        "alarms": {
+            "delta_t": not_specified,
+            "delta_val": not_specified,
+            "max_alarm": not_specified,
+            "min_alarm": not_specified,
+            "max_warning": not_specified,
+            "min_warning": not_specified,
+            "extensions": "[]",
+        },
+        "events": {
+            "per_event": {"extensions": "[]", "period": "1000"},
+            "ch_event": {
+                "rel_change": not_specified,
+                "abs_change": not_specified,
+                "extensions": "[]",
+            },
+            "arch_event": {
+                "archive_period": not_specified,
+                "archive_rel_change": not_specified,
+                "archive_abs_change": not_specified,
+                "extensions": "[]",
+            },
+        },
+        "device": device_name,
+        "model": "{}/{}".format(device_name, name),
+    }
+
+
+def write_sim_data_files(
+    output_dir,
+    file_format,
+    num_attributes,
+    num_commands=None,
+    num_enum_labels=DEFAULT_NUM_ENUM_LABELS,
+    spectrum_size=DEFAULT_SPECTRUM_SIZE,
+    num_devices=1,
+    class_name=DEFAULT_CLASS_NAME,
+):
+    """Write synthetic simulator description files.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory the files are written to.
+    file_format : str
+        One of :data:`SYNTHETIC_FORMATS`.
+    num_attributes : int
+        Number of attributes per device.
+    num_commands : int
+        Number of commands per device, a tenth of the attributes by default.
+    num_enum_labels : int
+        Number of labels of the enum attributes.
+    spectrum_size : int
+        Length of the spectrum attributes.
+    num_devices : int
+        Number of devices. An XMI file describes a class per device and a fandango
+        file exports all the devices, but there is a SimDD file per device.
+    class_name : str
+        Device class name, numbered if there are several XMI or SimDD devices.
+
+    Returns
+    -------
+    file_names : list
+        The files written.
+
+    """
+    if num_commands is None:
+        num_commands = num_attributes // 10
+    if num_devices > 1:
+        class_names = [
+            "{}{}".format(class_name, index) for index in range(1, num_devices + 1)
+        ]
+    else:
+        class_names = [class_name]
+    base_name = os.path.join(
+        output_dir,
+        "{}_{}a_{}c_{}d".format(class_name, num_attributes, num_commands, num_devices),
+    )
+    if file_format == "xmi":
+        contents = {
+            base_name
+            + ".xmi": generate_xmi(
+                num_attributes, num_commands, num_enum_labels, spectrum_size, class_names
+            )
+        }
+    elif file_format == "json":
+        contents = {
+            "{}_{}.json".format(base_name, name): generate_simdd(
+                num_attributes, num_commands, spectrum_size, name
+            )
+            for name in class_names
+        }
+    elif file_format == "fgo":
+        device_names = [
+            "synthetic/{}/{}".format(class_name.lower(), index)
+            for index in range(1, num_devices + 1)
+        ]
+        contents = {
+            base_name
+            + ".fgo": generate_fgo(
+                num_attributes,
+                num_commands,
+                num_enum_labels,
+                spectrum_size,
+                class_name,
+                device_names,
+            )
+        }
+    else:
+        raise ValueError(
+            "Unknown format {!r}, expected one of {}.".format(
+                file_format, SYNTHETIC_FORMATS
+            )
+        )
+    for file_name, content in sorted(contents.items()):
+        with open(file_name, "w") as sim_data_file:
+            sim_data_file.write(content)
+    return sorted(contents)
+
+
+def get_benchmark_file(file_spec):
+    """Get the path of a simulator description file the benchmarks run on.
+
+    Parameters
+    ----------
+    file_spec : str
+        Either the name of one of the bundled test config files, e.g.
+        "DishElementMaster.xmi", or "synthetic.<format>*<number of attributes>",
+        e.g. "synthetic.xmi*10000", for a synthetic file of a single device with
+        a tenth as many commands. The synthetic files are removed on exit.
+
+    """
+    file_name, _, num_attributes = file_spec.partition("*")
+    prefix, _, file_format = file_name.partition(".")
+    if prefix != SYNTHETIC_FILE_PREFIX:
+        return pkg_resources.resource_filename(CONFIG_FILES_PACKAGE, file_name)
+    global _synthetic_files_dir
+    if _synthetic_files_dir is None:
+        _synthetic_files_dir = tempfile.mkdtemp(prefix="tango_simlib_benchmarks")
+        atexit.register(shutil.rmtree, _synthetic_files_dir, True)
+    output_dir = os.path.join(_synthetic_files_dir, file_format, num_attributes)
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+        return write_sim_data_files(output_dir, file_format, int(num_attributes))[0]
+    return os.path.join(output_dir, os.listdir(output_dir)[0])
+
+
+def get_argparser():
+    parser = argparse.ArgumentParser(
+        description="Write synthetic simulator description files of any size."
+    )
+    parser.add_argument("format", choices=SYNTHETIC_FORMATS, help="File format.")
+    parser.add_argument(
+        "--attributes", type=int, default=1000, help="Number of attributes per device."
+    )
+    parser.add_argument(
+        "--commands",
+        type=int,
+        help="Number of commands per device (default a tenth of the attributes).",
+    )
+    parser.add_argument(
+        "--enum-labels",
+        type=int,
+        default=DEFAULT_NUM_ENUM_LABELS,
+        help="Number of labels of the enum attributes (default %(default)s).",
+    )
+    parser.add_argument(
+        "--spectrum-size",
+        type=int,
+        default=DEFAULT_SPECTRUM_SIZE,
+        help="Length of the spectrum attributes (default %(default)s).",
+    )
+    parser.add_argument(
+        "--devices", type=int, default=1, help="Number of devices (default 1)."
+    )
+    parser.add_argument(
+        "--class-name",
+        default=DEFAULT_CLASS_NAME,
+        help="Device class name (default %(default)s).",
+    )
+    parser.add_argument(
+        "--output-dir", default=".", help="Directory the files are written to."
+    )
+    return parser
+
+
+def main():
+    args = get_argparser().parse_args()
+    for file_name in write_sim_data_files(
+        args.output_dir,
+        args.format,
+        args.attributes,
+        args.commands,
+        args.enum_labels,
+        args.spectrum_size,
+        args.devices,
+        args.class_name,
+    ):
+        print(file_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Latency and error injection for the simulated attributes and commands."""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import logging
+import numbers
+import random
+import threading
+import time
+from builtins import object
+
+from tango import Except
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+# Latency distribution name -> the parameters it requires.
+LATENCY_DISTRIBUTIONS = {
+    "constant": ("value",),
+    "uniform": ("min", "max"),
+    "gaussian": ("mean", "std_dev"),
+    "exponential": ("mean",),
+}
+INJECTED_FAULT_REASON = "InjectedFault"
+
+
+class FaultInjector(object):
+    """Delay and fail the reads of attributes and the calls of commands.
+
+    The faults of an attribute or command are configured with a dict:
+
+    - latency : dict
+        The delay distribution, {"distribution": "constant", "value": <seconds>},
+        {"distribution": "uniform", "min": <seconds>, "max": <seconds>},
+        {"distribution": "gaussian", "mean": <seconds>, "std_dev": <seconds>} or
+        {"distribution": "exponential", "mean": <seconds>}. Negative delays are
+        not applied.
+    - error_rate : float
+        Probability between 0 and 1 that the request fails with a DevFailed error.
+    - error_reason, error_message : str
+        The reason and description of the DevFailed error.
+
+    Parameters
+    ----------
+    random_generator : random.Random instance
+        Source of the random delays and errors.
+    sleep : callable
+        Function delaying the requests.
+
+    """
+
+    def __init__(self, random_generator=None, sleep=time.sleep):
+        self.random = random_generator or random.Random()
+        self.sleep = sleep
+        self._faults = {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def faults(self):
+        """The fault configurations, keyed by attribute or command name."""
+        return dict(self._faults)
+
+    def set_faults(self, faults):
+        """Configure the faults of attributes and commands.
+
+        Parameters
+        ----------
+        faults : dict
+            Attribute or command name -> fault configuration, see
+            :class:`FaultInjector`. A configuration of None removes the faults of
+            the attribute or command. The other ones are left as they are.
+
+        Raises
+        ------
+        ValueError
+            If a configuration is not valid, nothing is changed then.
+
+        """
+        for name, fault in faults.items():
+            if fault is not None:
+                _check_fault(name, fault)
+        new_faults = dict(self._faults)
+        for name, fault in faults.items():
+            if fault is None:
+                new_faults.pop(name, None)
+            else:
+                new_faults[name] = dict(fault)
+        # Replaced in one go, the requests being served look it up concurrently.
+        self._faults = new_faults
+
+    def clear(self):
+        """Remove all the faults and statistics."""
+        self._faults = {}
+        with self._stats_lock:
+            self._stats = {}
+
+    def get_stats(self):
+        """Get the injection statistics.
+
+        Returns
+        -------
+        stats : dict
+            Attribute or command name -> {"requests": <number of requests>,
+            "delayed": <number of delayed requests>, "total_delay": <seconds>,
+            "max_delay": <seconds>, "errors": <number of injected errors>}
+
+        """
+        with self._stats_lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def inject(self, name):
+        """Apply the faults of an attribute or command to a request.
+
+        The delay is applied in the thread serving the request. It does not hold
+        the model lock, so the model updates and the other devices of the server
+        are not held up. TANGO serialises the requests to a device, so the other
+        requests to the same device wait for the delayed one, like they would for
+        a slow device. Neither the NO_SYNC serialisation model, which lets TANGO
+        serve concurrent reads of an attribute into the same buffers, nor releasing
+        the device monitor with `AutoTangoAllowThreads`, which deadlocks when the
+        monitor is taken back, avoids that safely.
+
+        Raises
+        ------
+        PyTango.DevFailed
+            If an error is injected.
+
+        """
+        fault = self._faults.get(name)
+        if fault is None:
+            return
+        delay = 0.0
+        latency = fault.get("latency")
+        if latency is not None:
+            delay = max(0.0, self._get_delay(latency))
+        is_error = self.random.random() < fault.get("error_rate", 0.0)
+        with self._stats_lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {
+                    "requests": 0,
+                    "delayed": 0,
+                    "total_delay": 0.0,
+                    "max_delay": 0.0,
+                    "errors": 0,
+                }
+            stats["requests"] += 1
+            if delay > 0:
+                stats["delayed"] += 1
+                stats["total_delay"] += delay
+                stats["max_delay"] = max(stats["max_delay"], delay)
+            if is_error:
+                stats["errors"] += 1
+        if delay > 0:
+            self.sleep(delay)
+        if is_error:
+            Except.throw_exception(
+                fault.get("error_reason", INJECTED_FAULT_REASON),
+                fault.get("error_message", "Fault injected in {}.".format(name)),
+                name,
+            )
+
+    def _get_delay(self, latency):
+        distribution = latency["distribution"]
+        if distribution == "constant":
+            return latency["value"]
+        if distribution == "uniform":
+            return self.random.uniform(latency["min"], latency["max"])
+        if distribution == "gaussian":
+            return self.random.gauss(latency["mean"], latency["std_dev"])
+        return self.random.expovariate(1.0 / latency["mean"])
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _check_fault(name, fault):
+    if not isinstance(fault, dict):
+        raise ValueError("The faults of {!r} must be an object.".format(name))
+    unknown_keys = set(fault) - {"latency", "error_rate", "error_reason", "error_message"}
+    if unknown_keys:
+        raise ValueError(
+            "Unknown fault settings {} for {!r}.".format(sorted(unknown_keys), name)
+        )
+    error_rate = fault.get("error_rate", 0.0)
+    if not _is_number(error_rate) or not 0 <= error_rate <= 1:
+        raise ValueError(
+            "The error_rate of {!r} must be a number from 0 to 1.".format(name)
+        )
+    latency = fault.get("latency")
+    if latency is None:
+        return
+    distribution = latency.get("distribution") if isinstance(latency, dict) else None
+    if distribution not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(
+            "The latency distribution of {!r} must be one of {}.".format(
+                name, sorted(LATENCY_DISTRIBUTIONS)
+            )
+        )
+    for parameter in LATENCY_DISTRIBUTIONS[distribution]:
+        if not _is_number(latency.get(parameter)):
+            raise ValueError(
+                "The {} latency of {!r} needs a numeric {!r}.".format(
+                    distribution, name, parameter
+                )
+            )
+    if distribution == "exponential" and latency["mean"] <= 0:
+        raise ValueError(
+            "The exponential latency of {!r} needs a positive mean.".format(name)
+        )
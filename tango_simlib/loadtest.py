@@ -0,0 +1,518 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Load tests of simulated devices, run locally without a TANGO database.
+
+The simulators are started with a TANGO test context and driven by concurrent
+clients, each a thread with its own device proxy, which read attributes, write
+attributes or call commands for a given time. The throughput and the latency
+percentiles are reported per operation and attribute or command type:
+
+.. code-block:: bash
+
+    tango-simlib-loadtest Weather.xmi --devices 2 --readers 8 --writers 2 \\
+        --command-callers 2 --duration 30
+
+"""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import argparse
+import json
+import logging
+import threading
+import timeit
+from builtins import object, range
+
+import numpy as np
+from tango import AttrWriteType, CmdArgType, DevFailed, DeviceProxy
+from tango.test_context import DeviceTestContext, MultiDeviceTestContext
+from tango.utils import is_array_type, is_bool_type, is_numerical_type, is_str_type
+
+from tango_simlib import tango_sim_generator
+from tango_simlib.utilities import helper_module
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DEVICE_NAME_FORMAT = "loadtest/sim/{}"
+DEFAULT_DURATION = 10.0
+DEFAULT_READERS = 4
+# The simulated commands can change the device state, which makes the attribute
+# reads fail, so only the standard commands are called unless others are given.
+DEFAULT_COMMANDS = ("State", "Status")
+OPERATIONS = ("read", "write", "command")
+PERCENTILES = (50, 95, 99)
+
+
+class SimulatorContext(object):
+    """Simulated devices running in a TANGO test context.
+
+    The device properties of the models are kept in memory instead of being
+    written to the TANGO database.
+
+    Parameters
+    ----------
+    sim_data_files : list
+        Paths to the xmi/json/fgo files describing the devices.
+    num_devices : int
+        Number of devices, all of the class described by `sim_data_files`.
+    device_name_format : str
+        Name of the devices, formatted with the device number starting at 1.
+    process : bool
+        Run the device server in a child process instead of a thread of this
+        process, so that it does not compete with the clients for the GIL.
+
+    """
+
+    def __init__(
+        self,
+        sim_data_files,
+        num_devices=1,
+        device_name_format=DEFAULT_DEVICE_NAME_FORMAT,
+        process=False,
+    ):
+        self.sim_data_files = list(sim_data_files)
+        self.device_names = [
+            device_name_format.format(number) for number in range(1, num_devices + 1)
+        ]
+        self.process = process
+        self._context = None
+        self._get_database = None
+
+    def start(self):
+        models = {}
+        for device_name in self.device_names:
+            models.update(
+                tango_sim_generator.configure_device_models(
+                    self.sim_data_files, device_name
+                )
+            )
+        device_class = tango_sim_generator.get_tango_device_server(
+            models, self.sim_data_files
+        )[0]
+        property_store = _DevicePropertyStore()
+        self._get_database = helper_module.get_database
+        helper_module.get_database = lambda: property_store
+        if len(self.device_names) == 1:
+            self._context = DeviceTestContext(
+                device_class, device_name=self.device_names[0], process=self.process
+            )
+        else:
+            self._context = MultiDeviceTestContext(
+                [
+                    {
+                        "class": device_class,
+                        "devices": [{"name": name} for name in self.device_names],
+                    }
+                ],
+                process=self.process,
+            )
+        try:
+            self._context.start()
+        except Exception:
+            self._context = None
+            self.stop()
+            raise
+
+    def stop(self):
+        if self._context is not None:
+            self._context.stop()
+            self._context = None
+        if self._get_database is not None:
+            helper_module.get_database = self._get_database
+            self._get_database = None
+
+    def get_device_access(self, device_name):
+        """The full name used by device proxies to access the device."""
+        return self._context.get_device_access(device_name)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class _DevicePropertyStore(object):
+    """Stands in for the TANGO database the model device properties are put in."""
+
+    def __init__(self):
+        self.properties = {}
+
+    def get_device_property(self, device_name, property_names):
+        device_properties = self.properties.get(device_name, {})
+        return {
+            name: device_properties[name]
+            for name in property_names
+            if name in device_properties
+        }
+
+    def put_device_property(self, device_name, properties):
+        self.properties.setdefault(device_name, {}).update(properties)
+
+
+def run_load_test(
+    sim_data_files, num_devices=1, process=False, log=None, **client_options
+):
+    """Start simulated devices and run the load test clients against them.
+
+    Parameters
+    ----------
+    sim_data_files : list
+        Paths to the xmi/json/fgo files describing the devices.
+    num_devices : int
+        Number of simulated devices.
+    process : bool
+        Run the device server in a child process, see :class:`SimulatorContext`.
+    log : callable
+        Called with a line of text when the devices are started.
+    client_options
+        The options of :func:`run_clients`.
+
+    Returns
+    -------
+    results : list
+        As returned by :func:`run_clients`.
+
+    """
+    with SimulatorContext(sim_data_files, num_devices, process=process) as context:
+        if log:
+            log("Started devices {}".format(", ".join(context.device_names)))
+        return run_clients(
+            context.device_names,
+            lambda device_name: DeviceProxy(context.get_device_access(device_name)),
+            **client_options
+        )
+
+
+def run_clients(
+    device_names,
+    get_device_proxy=DeviceProxy,
+    readers=DEFAULT_READERS,
+    writers=0,
+    command_callers=0,
+    duration=DEFAULT_DURATION,
+    attributes=None,
+    commands=DEFAULT_COMMANDS,
+    group_by="type",
+):
+    """Drive devices with concurrent clients and measure their requests.
+
+    The clients are spread over the devices. Each client repeatedly goes through
+    the attributes or commands of its device, starting at a different one than the
+    other clients of the same operation.
+
+    Parameters
+    ----------
+    device_names : list
+        Names of the devices.
+    get_device_proxy : callable
+        Returns a new device proxy given a device name.
+    readers, writers, command_callers : int
+        Number of clients reading attributes, writing attributes and calling
+        commands. The writers write back the values the attributes have when the
+        load test starts.
+    duration : float
+        Time the clients run for [seconds].
+    attributes : list
+        Names of the attributes read and written, by default all of them.
+    commands : list
+        Names of the commands called. The input argument is zero, False, an empty
+        string or an empty array, depending on the command input type.
+    group_by : str
+        Report the requests per attribute or command "type" or "name".
+
+    Returns
+    -------
+    results : list
+        A dict per operation and group: {"operation": "read", "write" or
+        "command", "group": <type or name>, "count": <successful requests>,
+        "errors": <failed requests>, "throughput": <successful requests per
+        second>, "p50", "p95", "p99", "max": <latency in seconds>}, followed by a
+        dict with the group "all" per operation.
+
+    """
+    if group_by not in ("type", "name"):
+        raise ValueError("Unknown group_by {!r}, not 'type' or 'name'.".format(group_by))
+    clients = []
+    for operation, num_clients in zip(OPERATIONS, (readers, writers, command_callers)):
+        for index in range(num_clients):
+            device_name = device_names[len(clients) % len(device_names)]
+            requests = _get_requests(
+                get_device_proxy(device_name), operation, attributes, commands, group_by
+            )
+            if not requests:
+                raise ValueError(
+                    "Device {} has nothing to {}.".format(device_name, operation)
+                )
+            clients.append((requests, index, {}))
+
+    started = threading.Event()
+    threads = [
+        threading.Thread(
+            target=_run_client, args=(requests, first, started, duration, samples)
+        )
+        for requests, first, samples in clients
+    ]
+    for thread in threads:
+        thread.start()
+    start_time = timeit.default_timer()
+    started.set()
+    for thread in threads:
+        thread.join()
+    elapsed = timeit.default_timer() - start_time
+
+    merged_samples = {}
+    for _, _, samples in clients:
+        for key, client_samples in samples.items():
+            merged_samples.setdefault(key, _Samples()).add(client_samples)
+    results = []
+    for operation in OPERATIONS:
+        operation_samples = _Samples()
+        for (sample_operation, group), group_samples in sorted(merged_samples.items()):
+            if sample_operation == operation:
+                results.append(_get_result(operation, group, group_samples, elapsed))
+                operation_samples.add(group_samples)
+        if operation_samples.latencies or operation_samples.errors:
+            results.append(_get_result(operation, "all", operation_samples, elapsed))
+    return results
+
+
+def _get_requests(device_proxy, operation, attributes, commands, group_by):
+    """The (operation, function, arguments, group) of the requests of a client."""
+    requests = []
+    if operation == "command":
+        for info in device_proxy.command_list_query():
+            if info.cmd_name not in commands:
+                continue
+            group = info.cmd_name
+            if group_by == "type":
+                group = "{}->{}".format(info.in_type, info.out_type)
+            args = (info.cmd_name,)
+            if info.in_type != CmdArgType.DevVoid:
+                args += (_get_command_argument(info.in_type),)
+            requests.append((operation, device_proxy.command_inout, args, group))
+        return requests
+
+    for info in device_proxy.attribute_list_query():
+        if attributes is not None and info.name not in attributes:
+            continue
+        group = info.name
+        if group_by == "type":
+            group = "{} {}".format(CmdArgType.values[info.data_type], info.data_format)
+        if operation == "read":
+            if info.writable != AttrWriteType.WRITE:
+                requests.append(
+                    (operation, device_proxy.read_attribute, (info.name,), group)
+                )
+        elif info.writable != AttrWriteType.READ:
+            value = _get_attribute_write_value(device_proxy, info.name)
+            if value is not None:
+                requests.append(
+                    (operation, device_proxy.write_attribute, (info.name, value), group)
+                )
+    return requests
+
+
+def _get_attribute_write_value(device_proxy, attribute_name):
+    try:
+        device_attribute = device_proxy.read_attribute(attribute_name)
+    except DevFailed:
+        MODULE_LOGGER.warning(
+            "Attribute %s is not written, its value cannot be read.",
+            attribute_name,
+            exc_info=True,
+        )
+        return None
+    if device_attribute.w_value is not None:
+        return device_attribute.w_value
+    return device_attribute.value
+
+
+def _get_command_argument(arg_type):
+    if is_array_type(arg_type):
+        return []
+    if is_bool_type(arg_type):
+        return False
+    if is_str_type(arg_type):
+        return ""
+    if is_numerical_type(arg_type):
+        return 0
+    raise ValueError("Cannot make an input argument of type {}.".format(arg_type))
+
+
+class _Samples(object):
+    """The latencies of the successful requests and the number of failed ones."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+    def add(self, samples):
+        self.latencies.extend(samples.latencies)
+        self.errors += samples.errors
+
+
+def _run_client(requests, first_request, started, duration, samples):
+    """Make requests until `duration` seconds after `started` is set.
+
+    The requests are measured in `samples`, a dict of :class:`_Samples` keyed by
+    (operation, group).
+
+    """
+    timer = timeit.default_timer
+    num_requests = len(requests)
+    # Look up the samples of the requests before the clock starts.
+    request_samples = [
+        samples.setdefault((operation, group), _Samples())
+        for operation, _, _, group in requests
+    ]
+    index = first_request % num_requests
+    started.wait()
+    end_time = timer() + duration
+    request_start = timer()
+    while request_start < end_time:
+        _, func, args, _ = requests[index]
+        try:
+            func(*args)
+        except DevFailed:
+            request_samples[index].errors += 1
+        else:
+            request_samples[index].latencies.append(timer() - request_start)
+        index = (index + 1) % num_requests
+        request_start = timer()
+
+
+def _get_result(operation, group, samples, elapsed):
+    result = {
+        "operation": operation,
+        "group": group,
+        "count": len(samples.latencies),
+        "errors": samples.errors,
+        "throughput": len(samples.latencies) / elapsed,
+    }
+    if samples.latencies:
+        percentiles = np.percentile(samples.latencies, PERCENTILES)
+        for percentile, latency in zip(PERCENTILES, percentiles):
+            result["p{}".format(percentile)] = float(latency)
+        result["max"] = max(samples.latencies)
+    return result
+
+
+def format_results(results):
+    """A table of the results of :func:`run_clients`, as a list of lines."""
+    row_format = "{:<8} {:<32} {:>9} {:>7} {:>10} {:>9} {:>9} {:>9} {:>9}"
+    lines = [
+        row_format.format(
+            "", "", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms"
+        )
+    ]
+    for result in results:
+        latencies = [
+            "{:.3f}".format(result[key] * 1e3) if key in result else "-"
+            for key in ["p{}".format(percentile) for percentile in PERCENTILES] + ["max"]
+        ]
+        lines.append(
+            row_format.format(
+                result["operation"],
+                result["group"],
+                result["count"],
+                result["errors"],
+                "{:.1f}".format(result["throughput"]),
+                *latencies
+            )
+        )
+    return lines
+
+
+def get_argparser():
+    parser = argparse.ArgumentParser(
+        description="Load test simulated devices locally, without a TANGO database."
+    )
+    parser.add_argument(
+        "sim_data_files",
+        nargs="+",
+        help="Simulator description files (xmi, json or fgo) of the device class.",
+    )
+    parser.add_argument(
+        "--devices", type=int, default=1, help="Number of devices (default 1)."
+    )
+    parser.add_argument(
+        "--readers",
+        type=int,
+        default=DEFAULT_READERS,
+        help="Number of clients reading attributes (default %(default)s).",
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=0,
+        help="Number of clients writing attributes (default 0).",
+    )
+    parser.add_argument(
+        "--command-callers",
+        type=int,
+        default=0,
+        help="Number of clients calling commands (default 0).",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=DEFAULT_DURATION,
+        help="Duration of the load test [seconds] (default %(default)s).",
+    )
+    parser.add_argument(
+        "--attributes",
+        nargs="+",
+        help="Attributes read and written (default all of them).",
+    )
+    parser.add_argument(
+        "--commands",
+        nargs="+",
+        default=list(DEFAULT_COMMANDS),
+        help="Commands called (default %(default)s).",
+    )
+    parser.add_argument(
+        "--group-by",
+        choices=("type", "name"),
+        default="type",
+        help="Report per attribute or command type or name (default %(default)s).",
+    )
+    parser.add_argument(
+        "--process",
+        action="store_true",
+        help="Run the device server in a child process instead of a thread.",
+    )
+    parser.add_argument("--output", help="Also save the results to this JSON file.")
+    return parser
+
+
+def main():
+    args = get_argparser().parse_args()
+    results = run_load_test(
+        args.sim_data_files,
+        num_devices=args.devices,
+        process=args.process,
+        log=print,
+        readers=args.readers,
+        writers=args.writers,
+        command_callers=args.command_callers,
+        duration=args.duration,
+        attributes=args.attributes,
+        commands=args.commands,
+        group_by=args.group_by,
+    )
+    for line in format_results(results):
+        print(line)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,12 @@ from future import standard_library
 standard_library.install_aliases()  # noqa: E402
 from future.utils import iteritems
 
+import atexit
+import copy
 import importlib
 import logging
 import sys
+import threading
 import time
 import weakref
 from builtins import map, object, range
@@ -19,6 +22,9 @@ from functools import partial
 
 from tango import CmdArgType
 from tango_simlib import quantities
+from tango_simlib.fault_injection import FaultInjector
+from tango_simlib.shared_state import SharedQuantityState
+from tango_simlib.utilities.startup_timing import startup_timer
 
 MODULE_LOGGER = logging.getLogger(__name__)
 
@@ -158,6 +164,16 @@ class Model(object):
         self.override_pre_updates = []
         self.override_post_updates = []
         self.paused = False  # Flag to pause updates
+        # Held while the model is updated, see `set_quantity_attributes`.
+        self.update_lock = threading.RLock()
+        self.scenario = None  # See `set_scenario`
+        # Steps the model with other models when set, see `update_engine.UpdateEngine`.
+        self.update_engine = None
+        # Whether the shared memory segment is removed at exit, see
+        # `share_quantity_state`.
+        self._unshare_at_exit = False
+        # Latency and errors of the attribute reads and command calls.
+        self.fault_injector = FaultInjector()
         # Making a public reference to _sim_state. Allows us to hook read-only views
         # or updates or whatever the future requires of this humble public attribute.
         self.quantity_state = self._sim_state
@@ -185,6 +201,37 @@ class Model(object):
         )
 
     def update(self):
+        if self.update_engine is not None:
+            # The engine steps this model together with the other models it owns.
+            self.update_engine.tick()
+            return
+        # The quantities are not changed in bulk while the model is stepped.
+        with self.update_lock:
+            update_times = self.start_update()
+            if update_times is None:
+                return
+            sim_time, dt = update_times
+            try:
+                for var, quant in self.sim_quantities.items():
+                    self._sim_state[var] = (quant.next_val(sim_time), sim_time)
+            except Exception:
+                self.logger.exception("Exception in update loop")
+            self.finish_update(sim_time, dt)
+
+    def start_update(self):
+        """Start stepping the model, before its quantities get their next values.
+
+        Applies the scenario events that are due and runs the pre-update overrides.
+        Must be called with :attr:`update_lock` held, see :meth:`update`.
+
+        Returns
+        -------
+        update_times : tuple or None
+            (sim_time, dt), the simulation time of the update and the time since the
+            last one, or None if the model is paused or was updated too recently.
+
+        """
+        self.run_scenario()
         sim_time = self.time_func()
         dt = sim_time - self.last_update_time
         if dt < self.min_update_period or self.paused:
@@ -197,19 +244,17 @@ class Model(object):
                     self.name, sim_time, dt, self.min_update_period, self.paused
                 )
             )
-            return
+            return None
 
         for override_update in self.override_pre_updates:
             override_update(self, sim_time, dt)
 
         self.logger.debug("Stepping at {}, dt: {}".format(sim_time, dt))
         self.last_update_time = sim_time
-        try:
-            for var, quant in self.sim_quantities.items():
-                self._sim_state[var] = (quant.next_val(sim_time), sim_time)
-        except Exception:
-            self.logger.exception("Exception in update loop")
+        return sim_time, dt
 
+    def finish_update(self, sim_time, dt):
+        """Run the post-update overrides, once the quantities have been stepped."""
         for override_update in self.override_post_updates:
             override_update(self, sim_time, dt)
 
@@ -251,6 +296,7 @@ class Model(object):
         quantities = self.sim_quantities.values()
         for quantity in quantities:
             self._reset_quantity_adjustable_attributes_values(quantity)
+        self._quantities_changed()
 
     def _reset_quantity_adjustable_attributes_values(self, quantity):
         quantity_metadata = quantity.meta
@@ -277,6 +323,322 @@ class Model(object):
 
                 setattr(quantity, adjustable_attr, adjustable_val)
 
+    def get_quantity_attributes(self):
+        """Get the adjustable attributes of all the quantities at once.
+
+        Returns
+        -------
+        quantity_attributes : dict
+            Quantity name -> {adjustable attribute name: value}, all read between
+            two model updates.
+
+        """
+        with self.update_lock:
+            return {
+                name: {
+                    attr: getattr(quantity, attr)
+                    for attr in quantity.adjustable_attributes
+                }
+                for name, quantity in self.sim_quantities.items()
+            }
+
+    def set_quantity_attributes(self, quantity_attributes, update_time=None):
+        """Set the adjustable attributes of many quantities at once.
+
+        All the values are set between two model updates. Nothing is set if any of
+        the quantities or attributes is unknown.
+
+        Parameters
+        ----------
+        quantity_attributes : dict
+            Quantity name -> {adjustable attribute name: value}, e.g.
+            {'temperature': {'mean': 20.0, 'last_val': 18.5}}. Setting `last_val`
+            also sets the quantity's `last_update_time`, unless `last_update_time` is
+            given as well.
+        update_time : float
+            The `last_update_time` of the quantities whose `last_val` is set, by
+            default the current model time.
+
+        Raises
+        ------
+        ValueError
+            If a quantity or an adjustable attribute does not exist.
+
+        """
+        self.check_quantity_attributes(quantity_attributes)
+        with self.update_lock:
+            if update_time is None:
+                update_time = self.time_func()
+            for name, attributes in quantity_attributes.items():
+                quantity = self.sim_quantities[name]
+                if "last_val" in attributes:
+                    quantity.set_val(attributes["last_val"], update_time)
+                for attr, value in attributes.items():
+                    if attr != "last_val":
+                        setattr(quantity, attr, value)
+            self._quantities_changed()
+
+    def _quantities_changed(self):
+        """Let the update engine know that the quantities or their settings changed."""
+        if self.update_engine is not None:
+            self.update_engine.invalidate()
+
+    def check_quantity_attributes(self, quantity_attributes):
+        """Check that the quantities and their adjustable attributes exist.
+
+        Parameters
+        ----------
+        quantity_attributes : dict
+            As for :meth:`set_quantity_attributes`.
+
+        Raises
+        ------
+        ValueError
+            If a quantity or an adjustable attribute does not exist.
+
+        """
+        for name, attributes in quantity_attributes.items():
+            quantity = self.sim_quantities.get(name)
+            if quantity is None:
+                raise ValueError("Quantity {!r} not in the model.".format(name))
+            unknown_attributes = set(attributes) - quantity.adjustable_attributes
+            if unknown_attributes:
+                raise ValueError(
+                    "Quantity {!r} has no adjustable attributes {}.".format(
+                        name, sorted(unknown_attributes)
+                    )
+                )
+
+    def get_snapshot(self):
+        """Take a snapshot of the model state, see :meth:`restore_snapshot`.
+
+        Returns
+        -------
+        snapshot : dict
+            The adjustable attributes of the quantities, the update settings, the
+            scenario and the faults.
+
+        """
+        with self.update_lock:
+            return {
+                "quantity_attributes": copy.deepcopy(self.get_quantity_attributes()),
+                "paused": self.paused,
+                "min_update_period": self.min_update_period,
+                "last_update_time": self.last_update_time,
+                "time_func": self.time_func,
+                "scenario": self.scenario,
+                "faults": self.fault_injector.faults,
+            }
+
+    def restore_snapshot(self, snapshot):
+        """Put the model back in the state of a snapshot.
+
+        This is much faster than configuring a new model, e.g. to reset a simulator
+        between tests. The fault statistics are cleared.
+
+        Parameters
+        ----------
+        snapshot : dict
+            As returned by :meth:`get_snapshot`. It can be restored many times.
+
+        """
+        with self.update_lock:
+            self.set_quantity_attributes(copy.deepcopy(snapshot["quantity_attributes"]))
+            self.paused = snapshot["paused"]
+            self.min_update_period = snapshot["min_update_period"]
+            self.last_update_time = snapshot["last_update_time"]
+            self.time_func = snapshot["time_func"]
+            self.scenario = snapshot["scenario"]
+            self.fault_injector.clear()
+            self.fault_injector.set_faults(snapshot["faults"])
+            for var, quant in self.sim_quantities.items():
+                self._sim_state[var] = (quant.last_val, quant.last_update_time)
+
+    def set_scenario(self, scenario):
+        """Replace the scenario applied to the model.
+
+        The events of the scenario are applied as they become due whenever the model
+        is updated or :meth:`run_scenario` is called.
+
+        Parameters
+        ----------
+        scenario : scenario.Scenario instance or None
+            The new scenario, None to stop the current one.
+
+        Raises
+        ------
+        ValueError
+            If the scenario refers to quantities or test actions not in the model.
+
+        """
+        if scenario is not None:
+            scenario.check_model(self)
+        with self.update_lock:
+            self.scenario = scenario
+
+    def run_scenario(self):
+        """Apply the scenario events that are due at the current model time.
+
+        Returns
+        -------
+        num_applied : int
+            Number of events applied.
+
+        """
+        with self.update_lock:
+            if self.scenario is None:
+                return 0
+            return self.scenario.run_due(self, self.time_func())
+
+    def share_quantity_state(self, name=None):
+        """Keep the quantity state in shared memory, readable by other processes.
+
+        The numeric scalar quantities are copied to a new shared memory segment, see
+        :mod:`tango_simlib.shared_state`, which :attr:`quantity_state` then refers to.
+        The segment is removed when the process exits, unless the state is unshared
+        before. Needs Python 3.8 or later.
+
+        Parameters
+        ----------
+        name : str
+            Name of the shared memory segment, None for a random name.
+
+        Returns
+        -------
+        shared_state : shared_state.SharedQuantityState instance
+            The new quantity state, or the current one if it is already shared
+            under `name`.
+
+        Raises
+        ------
+        FileExistsError
+            If a segment named `name` is in use, see
+            :meth:`shared_state.SharedQuantityState.create`.
+
+        """
+        with self.update_lock:
+            if isinstance(self._sim_state, SharedQuantityState):
+                if name is None or self._sim_state.name == name:
+                    return self._sim_state
+                self.unshare_quantity_state()
+            shared_state = SharedQuantityState.create(name, self._sim_state)
+            self._sim_state = self.quantity_state = shared_state
+            if not self._unshare_at_exit:
+                atexit.register(self.unshare_quantity_state)
+                self._unshare_at_exit = True
+        return shared_state
+
+    def unshare_quantity_state(self):
+        """Move the quantity state back from shared memory and remove the segment."""
+        with self.update_lock:
+            shared_state = self._sim_state
+            if not isinstance(shared_state, SharedQuantityState):
+                return
+            self._sim_state = self.quantity_state = dict(shared_state)
+            shared_state.unlink()
+
+    def update_from_model(self, new_model):
+        """Apply the differences between this model and a newly populated model.
+
+        Only the quantities, actions and properties that differ are replaced. The
+        value of a changed quantity is kept if the quantity type, data type and data
+        format did not change.
+
+        Parameters
+        ----------
+        new_model : Model instance
+            A model populated from the updated simulator description data. It is not
+            used after the call.
+
+        Returns
+        -------
+        changes : dict
+            The names of the quantities, actions and properties that were added,
+            changed or removed, e.g. {'quantities_changed': ['temperature'], ...}
+
+        """
+        # The model is not updated, e.g. by a running scenario or an update engine,
+        # while its quantities and actions are replaced.
+        with self.update_lock:
+            changes = {}
+            quantities_diff = _diff_dicts(
+                self.sim_quantities,
+                new_model.sim_quantities,
+                lambda quantity, new_quantity: quantity.meta == new_quantity.meta
+                and type(quantity) is type(new_quantity),
+            )
+            for change_type, names in zip(
+                ("added", "changed", "removed"), quantities_diff
+            ):
+                changes["quantities_" + change_type] = names
+            added, changed, removed = quantities_diff
+            for name in added + changed:
+                new_quantity = new_model.sim_quantities[name]
+                quantity = self.sim_quantities.get(name)
+                if quantity is not None and _quantity_types_match(quantity, new_quantity):
+                    new_quantity.last_val = quantity.last_val
+                    new_quantity.last_update_time = quantity.last_update_time
+                self.sim_quantities[name] = new_quantity
+                self._sim_state[name] = (
+                    new_quantity.last_val,
+                    new_quantity.last_update_time,
+                )
+            for name in removed:
+                del self.sim_quantities[name]
+                if isinstance(
+                    self._sim_state, SharedQuantityState
+                ) and self._sim_state.is_shared(name):
+                    # The slots of a shared memory segment are fixed, the slot of
+                    # the quantity is left with its last value.
+                    continue
+                self._sim_state.pop(name, None)
+            if any(quantities_diff):
+                self._quantities_changed()
+
+            actions_diff = _diff_dicts(self.sim_actions_meta, new_model.sim_actions_meta)
+            for change_type, names in zip(("added", "changed", "removed"), actions_diff):
+                changes["actions_" + change_type] = names
+            if any(actions_diff):
+                # The action handlers are bound to the model they were created for.
+                self.sim_actions = {
+                    name: partial(handler.func, self)
+                    for name, handler in new_model.sim_actions.items()
+                }
+                self.test_sim_actions = {
+                    name: partial(handler.func, self)
+                    for name, handler in new_model.test_sim_actions.items()
+                }
+                self.sim_actions_meta = new_model.sim_actions_meta
+                self.override_pre_updates = new_model.override_pre_updates
+                self.override_post_updates = new_model.override_post_updates
+
+            properties_diff = _diff_dicts(self.sim_properties, new_model.sim_properties)
+            for change_type, names in zip(
+                ("added", "changed", "removed"), properties_diff
+            ):
+                changes["properties_" + change_type] = names
+            if any(properties_diff):
+                self.sim_properties = new_model.sim_properties
+        return changes
+
+
+def _diff_dicts(old, new, is_equal=lambda old_value, new_value: old_value == new_value):
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = sorted(
+        name for name in set(old) & set(new) if not is_equal(old[name], new[name])
+    )
+    return added, changed, removed
+
+
+def _quantity_types_match(quantity, new_quantity):
+    if type(quantity) is not type(new_quantity):
+        return False
+    for key in ("data_type", "data_format", "max_dim_x", "max_dim_y"):
+        if str(quantity.meta.get(key)) != str(new_quantity.meta.get(key)):
+            return False
+    return True
+
 
 class PopulateModelQuantities(object):
     """Used to populate/update model quantities.
@@ -551,12 +913,13 @@ class PopulateModelActions(object):
     def _get_class_instances(self, override_class_info):
         instances = {}
         for klass_info in override_class_info.values():
-            if klass_info["module_directory"] == "None":
-                module = importlib.import_module(klass_info["module_name"])
-            else:
-                sys.path.append(klass_info["module_directory"])
-                module = importlib.import_module(klass_info["module_name"])
-                sys.path.remove(klass_info["module_directory"])
+            with startup_timer.phase("import_override_classes"):
+                if klass_info["module_directory"] == "None":
+                    module = importlib.import_module(klass_info["module_name"])
+                else:
+                    sys.path.append(klass_info["module_directory"])
+                    module = importlib.import_module(klass_info["module_name"])
+                    sys.path.remove(klass_info["module_directory"])
             klass = getattr(module, klass_info["class_name"])
             instance = klass()
             instances[klass_info["name"]] = instance
@@ -0,0 +1,178 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Scenarios of model operations scheduled against the simulation clock."""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import json
+import logging
+import numbers
+from builtins import object
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+# Operation name -> the event keys it requires.
+SCENARIO_OPERATIONS = {
+    "set": ("quantities",),
+    "action": ("name",),
+    "pause": (),
+    "resume": (),
+}
+
+
+class Scenario(object):
+    """Operations to apply to a model at scheduled simulation times.
+
+    Parameters
+    ----------
+    events : list
+        The scheduled operations, each a dict with the `time` in seconds from the
+        start of the scenario and the `operation`, one of:
+
+        - "set": set the adjustable attributes of the `quantities`, given as
+          {quantity name: {adjustable attribute name: value}},
+        - "action": call the test action `name` with the optional `input`,
+        - "pause" and "resume": pause or resume the model updates.
+
+        Events with the same time are applied in the order they are given.
+    start_time : float
+        Simulation time at which the scenario starts.
+    tango_dev : PyTango.Device
+        The device passed to the test actions, usually the SimControl device.
+
+    Raises
+    ------
+    ValueError
+        If an event is not valid.
+
+    """
+
+    def __init__(self, events, start_time, tango_dev=None):
+        for event in events:
+            _check_event(event)
+        # The sort is stable, so events with the same time keep their order.
+        self.events = sorted(events, key=lambda event: event["time"])
+        self.start_time = start_time
+        self.tango_dev = tango_dev
+        self._next_event_index = 0
+
+    @classmethod
+    def from_json(cls, scenario_json, start_time, tango_dev=None):
+        """Create a scenario from a JSON document {"events": [...]}.
+
+        See :class:`Scenario` for the parameters and the format of the events.
+
+        """
+        try:
+            events = json.loads(scenario_json)["events"]
+        except (TypeError, KeyError):
+            raise ValueError('A scenario is a JSON object with a list of "events".')
+        if not isinstance(events, list):
+            raise ValueError('The scenario "events" must be a list.')
+        return cls(events, start_time, tango_dev)
+
+    @property
+    def pending_events(self):
+        """Number of events that have not been applied yet."""
+        return len(self.events) - self._next_event_index
+
+    def check_model(self, model):
+        """Check that the quantities and actions of the events exist in a model.
+
+        Raises
+        ------
+        ValueError
+            If an event refers to an unknown quantity, adjustable attribute or test
+            action.
+
+        """
+        for event in self.events:
+            if event["operation"] == "set":
+                model.check_quantity_attributes(event["quantities"])
+            elif event["operation"] == "action":
+                if event["name"] not in model.test_sim_actions:
+                    raise ValueError(
+                        "Test action {!r} not in the model.".format(event["name"])
+                    )
+
+    def run_due(self, model, sim_time):
+        """Apply all the events scheduled up to `sim_time` that were not applied yet.
+
+        An event that raises an error is logged and skipped.
+
+        Parameters
+        ----------
+        model : model.Model instance
+            The model the scenario is applied to.
+        sim_time : float
+            The current simulation time.
+
+        Returns
+        -------
+        num_applied : int
+            Number of events applied.
+
+        """
+        first_index = index = self._next_event_index
+        while index < len(self.events):
+            event = self.events[index]
+            event_time = self.start_time + event["time"]
+            if event_time > sim_time:
+                break
+            index += 1
+            # Advance first, so an event is not retried if it fails.
+            self._next_event_index = index
+            try:
+                self._apply(model, event, event_time)
+            except Exception:
+                model.logger.exception(
+                    "Scenario event %s failed on model %s.", event, model.name
+                )
+        return index - first_index
+
+    def _apply(self, model, event, event_time):
+        operation = event["operation"]
+        if operation == "set":
+            model.set_quantity_attributes(event["quantities"], update_time=event_time)
+        elif operation == "action":
+            action_handler = model.test_sim_actions[event["name"]]
+            action_handler(tango_dev=self.tango_dev, data_input=event.get("input"))
+        elif operation == "pause":
+            model.paused = True
+        elif operation == "resume":
+            model.paused = False
+
+
+def _check_event(event):
+    if not isinstance(event, dict):
+        raise ValueError("Scenario event {!r} is not an object.".format(event))
+    event_time = event.get("time")
+    if (
+        not isinstance(event_time, numbers.Real)
+        or isinstance(event_time, bool)
+        or event_time < 0
+    ):
+        raise ValueError(
+            "Scenario event {!r} needs a 'time' of at least 0 seconds.".format(event)
+        )
+    operation = event.get("operation")
+    if operation not in SCENARIO_OPERATIONS:
+        raise ValueError(
+            "Scenario event {!r} has an unknown 'operation', expected one of {}.".format(
+                event, sorted(SCENARIO_OPERATIONS)
+            )
+        )
+    missing_keys = [key for key in SCENARIO_OPERATIONS[operation] if key not in event]
+    if missing_keys:
+        raise ValueError(
+            "Scenario event {!r} is missing {}.".format(event, sorted(missing_keys))
+        )
+    if operation == "set" and not isinstance(event["quantities"], dict):
+        raise ValueError(
+            "The 'quantities' of scenario event {!r} must be an object.".format(event)
+        )
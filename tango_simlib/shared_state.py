@@ -0,0 +1,358 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Model quantity state kept in shared memory, readable by other processes.
+
+The numeric scalar quantities of a model are stored in fixed slots of a
+``multiprocessing.shared_memory`` segment (Python 3.8 and later), so that other
+processes, e.g. a scenario driver or an aggregating simulator, can read and write them
+without going through TANGO.
+
+Layout of the segment, all little-endian:
+
+- header: magic ``TSIMSHM1``, format version (uint32), number of slots (uint32),
+  index size in bytes (uint32) and process ID of the owner (uint32),
+- index: JSON object {"names": [<quantity name of each slot>], "kinds": "<kind of
+  each slot>"}, the kind being "f" (float), "i" (int) or "b" (bool), padded to 8 bytes,
+- slots: sequence number (uint64), value (float64) and update time (float64).
+
+Each slot is protected by a seqlock: a writer makes the sequence number odd while it
+writes and even afterwards, and readers retry until they read the same even sequence
+number before and after the data. There must be only one writer per quantity at a
+time, normally the model that created the segment.
+
+"""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import json
+import logging
+import numbers
+import os
+import struct
+import time
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # Python 2
+    from collections import MutableMapping
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+SHARED_STATE_MAGIC = b"TSIMSHM1"
+SHARED_STATE_VERSION = 2
+_HEADER = struct.Struct("<8sIIII")
+_SLOT = struct.Struct("<Qdd")
+_SEQUENCE = struct.Struct("<Q")
+_VALUE_TIME = struct.Struct("<dd")
+# The slots as a numpy structured array, see `SharedQuantityState.as_array`.
+SLOT_DTYPE = np.dtype([("sequence", "<u8"), ("value", "<f8"), ("time", "<f8")])
+_KIND_TYPES = {"f": float, "i": int, "b": bool}
+# Names of the segments created by this process.
+_created_names = set()
+
+
+def is_shared_state_supported():
+    """Whether shared memory is available, i.e. Python 3.8 or later."""
+    return shared_memory is not None
+
+
+def _get_kind(value):
+    if isinstance(value, (bool, np.bool_)):
+        return "b"
+    if isinstance(value, (numbers.Integral, np.integer)):
+        return "i"
+    if isinstance(value, (numbers.Real, np.floating)):
+        return "f"
+    return None
+
+
+class SharedQuantityState(MutableMapping):
+    """The state of model quantities, {name: (value, update time)}, in shared memory.
+
+    Use :meth:`create` or :meth:`attach` to get an instance. Quantities that are not
+    numeric scalars (strings, spectrums, ...), or that were not in the model when the
+    segment was created, are kept in a local dict that is not shared. The integer
+    values are stored as floats, so they are exact up to 2**53.
+
+    """
+
+    def __init__(self, shm, names, kinds, slots_offset, is_owner):
+        self._shm = shm
+        self._buffer = shm.buf
+        self._kinds = kinds
+        self._offsets = {
+            name: slots_offset + index * _SLOT.size for index, name in enumerate(names)
+        }
+        self._slot_names = names
+        self._slots_offset = slots_offset
+        self._local_state = {}
+        self.is_owner = is_owner
+
+    @property
+    def name(self):
+        """Name of the shared memory segment."""
+        return self._shm.name
+
+    @property
+    def shared_names(self):
+        """The names of the quantities of the shared memory slots, in slot order."""
+        return list(self._slot_names)
+
+    @classmethod
+    def create(cls, name, quantity_state):
+        """Create a shared memory segment for the current state of a model.
+
+        Parameters
+        ----------
+        name : str
+            Name of the shared memory segment, None for a random name.
+        quantity_state : dict
+            The model quantity state, {name: (value, update time)}.
+
+        Returns
+        -------
+        shared_state : SharedQuantityState
+            Initialised with `quantity_state`. It owns the segment: call
+            :meth:`unlink` when it is no longer needed.
+
+        Raises
+        ------
+        FileExistsError
+            If a segment exists under `name`, unless it holds a model quantity state
+            whose owner process is gone, e.g. left behind by a server that crashed,
+            in which case it is replaced.
+
+        """
+        if shared_memory is None:
+            raise RuntimeError("Shared memory needs Python 3.8 or later.")
+        names = []
+        kinds = {}
+        for quantity_name in sorted(quantity_state):
+            kind = _get_kind(quantity_state[quantity_name][0])
+            if kind is not None:
+                names.append(quantity_name)
+                kinds[quantity_name] = kind
+        index = json.dumps(
+            {"names": names, "kinds": "".join(kinds[name] for name in names)}
+        ).encode("utf-8")
+        slots_offset = _align(_HEADER.size + len(index))
+        size = slots_offset + len(names) * _SLOT.size
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            _unlink_stale_segment(name)
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created_names.add(shm._name)
+        _HEADER.pack_into(
+            shm.buf,
+            0,
+            SHARED_STATE_MAGIC,
+            SHARED_STATE_VERSION,
+            len(names),
+            len(index),
+            os.getpid(),
+        )
+        index_start = _HEADER.size
+        index_end = index_start + len(index)
+        shm.buf[index_start:index_end] = index
+        shared_state = cls(shm, names, kinds, slots_offset, is_owner=True)
+        shared_state.update(quantity_state)
+        return shared_state
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to the shared memory segment of a model in another process.
+
+        Parameters
+        ----------
+        name : str
+            Name of the shared memory segment.
+
+        Raises
+        ------
+        ValueError
+            If the segment does not hold a model quantity state.
+
+        """
+        if shared_memory is None:
+            raise RuntimeError("Shared memory needs Python 3.8 or later.")
+        shm = _open_shared_memory(name)
+        try:
+            magic, version, num_slots, index_size, _ = _HEADER.unpack_from(shm.buf, 0)
+            if magic != SHARED_STATE_MAGIC:
+                raise ValueError(
+                    "Shared memory {} is not a model quantity state.".format(name)
+                )
+            if version != SHARED_STATE_VERSION:
+                raise ValueError(
+                    "Unsupported shared quantity state version {}, expected {}.".format(
+                        version, SHARED_STATE_VERSION
+                    )
+                )
+            index_start = _HEADER.size
+            index_end = index_start + index_size
+            index = json.loads(bytes(shm.buf[index_start:index_end]).decode("utf-8"))
+        except Exception:
+            shm.close()
+            raise
+        names = index["names"]
+        kinds = dict(zip(names, index["kinds"]))
+        assert len(names) == num_slots
+        return cls(
+            shm, names, kinds, _align(_HEADER.size + index_size), is_owner=False
+        )
+
+    def __getitem__(self, name):
+        offset = self._offsets.get(name)
+        if offset is None:
+            return self._local_state[name]
+        buffer = self._buffer
+        while True:
+            sequence, value, update_time = _SLOT.unpack_from(buffer, offset)
+            if not sequence & 1 and _SEQUENCE.unpack_from(buffer, offset)[0] == sequence:
+                return _KIND_TYPES[self._kinds[name]](value), update_time
+            # A writer is busy with the slot.
+            time.sleep(0)
+
+    def __setitem__(self, name, value_and_time):
+        offset = self._offsets.get(name)
+        if offset is None:
+            self._local_state[name] = value_and_time
+            return
+        value, update_time = value_and_time
+        if _get_kind(value) is None:
+            # E.g. the quantity was changed to a string by a simulator description
+            # file reload, its slot is no longer used.
+            MODULE_LOGGER.warning(
+                "Quantity %r is no longer numeric, it is not shared anymore.", name
+            )
+            del self._offsets[name]
+            self._local_state[name] = value_and_time
+            return
+        buffer = self._buffer
+        sequence = _SEQUENCE.unpack_from(buffer, offset)[0]
+        _SEQUENCE.pack_into(buffer, offset, sequence + 1)
+        _VALUE_TIME.pack_into(buffer, offset + _SEQUENCE.size, value, update_time)
+        _SEQUENCE.pack_into(buffer, offset, sequence + 2)
+
+    def is_shared(self, name):
+        """Whether the state of a quantity is kept in a shared memory slot."""
+        return name in self._offsets
+
+    def __delitem__(self, name):
+        if name in self._offsets:
+            raise KeyError("Shared quantity {!r} cannot be removed.".format(name))
+        del self._local_state[name]
+
+    def __iter__(self):
+        for name in self._slot_names:
+            if name in self._offsets:
+                yield name
+        for name in list(self._local_state):
+            yield name
+
+    def __len__(self):
+        return len(self._offsets) + len(self._local_state)
+
+    def __contains__(self, name):
+        return name in self._offsets or name in self._local_state
+
+    def as_array(self):
+        """Get the shared slots as a numpy structured array, without copying them.
+
+        The array has the fields "sequence", "value" and "time" (see
+        :data:`SLOT_DTYPE`) and a row per quantity in :attr:`shared_names` order.
+        Reading it does not use the seqlock, so a value and time may come from
+        different updates. Delete the array before calling :meth:`close`.
+
+        """
+        return np.ndarray(
+            (len(self._slot_names),),
+            dtype=SLOT_DTYPE,
+            buffer=self._buffer,
+            offset=self._slots_offset,
+        )
+
+    def close(self):
+        """Detach from the shared memory segment."""
+        self._buffer = None
+        self._shm.close()
+
+    def unlink(self):
+        """Detach from and remove the shared memory segment."""
+        self.close()
+        self._shm.unlink()
+        _created_names.discard(self._shm._name)
+
+
+def _align(size, alignment=8):
+    return (size + alignment - 1) // alignment * alignment
+
+
+def _is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # Owned by another user
+        return True
+    return True
+
+
+def _unlink_stale_segment(name):
+    """Remove the segment of a model quantity state whose owner process is gone."""
+    # Opened without `_open_shared_memory`, the unlink unregisters the segment from
+    # the resource tracker.
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        if shm.size < _HEADER.size:
+            header = None
+        else:
+            header = _HEADER.unpack_from(shm.buf, 0)
+    finally:
+        shm.close()
+    if header is None or header[0] != SHARED_STATE_MAGIC:
+        raise FileExistsError(
+            "Shared memory {} exists and is not a model quantity state.".format(name)
+        )
+    _, version, _, _, owner_pid = header
+    if version != SHARED_STATE_VERSION:
+        # Its owner is not known, it may still be in use.
+        raise FileExistsError(
+            "Shared memory {} holds a quantity state of version {}.".format(name, version)
+        )
+    if _is_process_alive(owner_pid):
+        raise FileExistsError(
+            "Shared memory {} is owned by the running process {}.".format(name, owner_pid)
+        )
+    MODULE_LOGGER.warning(
+        "Replacing the shared quantity state %s of the exited process %d.",
+        name,
+        owner_pid,
+    )
+    shm.unlink()
+
+
+def _open_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        if shm._name not in _created_names:
+            # Otherwise the segment would be removed when this process exits.
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
@@ -9,11 +9,24 @@ from future import standard_library
 standard_library.install_aliases()  # noqa: E402
 from future.utils import with_metaclass
 
+import json
+import threading
+import time
 import weakref
 
-from tango import Attr, AttrWriteType, DevDouble, DevState, UserDefaultAttrProp
-from tango.server import Device, DeviceMeta, attribute, device_property
+from tango import (
+    Attr,
+    AttrWriteType,
+    DevDouble,
+    DevFailed,
+    DevState,
+    EnsureOmniThread,
+    UserDefaultAttrProp,
+    Util,
+)
+from tango.server import Device, DeviceMeta, attribute, command, device_property
 from tango_simlib import model
+from tango_simlib.scenario import Scenario
 from tango_simlib.utilities.helper_module import generate_cmd_handler
 
 
@@ -25,6 +38,13 @@ class TangoTestDeviceServerBase(Device):
         doc="Simulator model key, usually the TANGO name of the simulated device.",
     )
 
+    scenario_tick_period = device_property(
+        dtype=float,
+        default_value=0.001,
+        doc="Period at which the due events of a loaded scenario are applied to the "
+        "model [seconds].",
+    )
+
     def __init__(self, dev_class, name):
         super(TangoTestDeviceServerBase, self).__init__(dev_class, name)
 
@@ -33,6 +53,8 @@ class TangoTestDeviceServerBase(Device):
         self.model_quantity = None
         self._pause_active = False
         self.sim_device_attributes = None
+        self._model_snapshot = None
+        self._device_state_snapshot = None
         self.init_device()
 
     def init_device(self):
@@ -83,13 +105,147 @@ class TangoTestDeviceServerBase(Device):
     # Static attributes of the device
     @attribute(dtype=bool)
     def pause_active(self):
-        return self._pause_active
+        # The model can also be paused and resumed by a scenario.
+        return self.model.paused
 
     @pause_active.write
     def pause_active(self, is_active):
         self._pause_active = is_active
         setattr(self.model, "paused", is_active)
 
+    @attribute(
+        dtype=int,
+        doc="Number of events of the loaded scenario that have not been applied yet.",
+    )
+    def scenario_events_pending(self):
+        scenario = self.model.scenario
+        return scenario.pending_events if scenario is not None else 0
+
+    @command(
+        dtype_in=str,
+        doc_in="JSON object of the adjustable attribute values to set, keyed by "
+        'quantity name, e.g. {"temperature": {"mean": 20.0, "last_val": 18.5}}. '
+        "All the values are set between two model updates.",
+    )
+    def SetQuantityAttributes(self, quantity_attributes):
+        self.model.set_quantity_attributes(json.loads(quantity_attributes))
+
+    @command(
+        dtype_out=str,
+        doc_out="JSON object of the adjustable attribute values of all the "
+        "quantities, keyed by quantity name.",
+    )
+    def GetQuantityAttributes(self):
+        return json.dumps(
+            self.model.get_quantity_attributes(), default=_get_json_serializable
+        )
+
+    @command(
+        dtype_in=str,
+        doc_in='JSON scenario {"events": [...]}, each event with the "time" in seconds '
+        'from now and an "operation": "set" (with "quantities" as for '
+        'SetQuantityAttributes), "action" (with the test action "name" and optional '
+        '"input"), "pause" or "resume". It replaces the current scenario.',
+    )
+    def LoadScenario(self, scenario_json):
+        scenario = Scenario.from_json(
+            scenario_json, self.model.time_func(), tango_dev=self
+        )
+        self.model.set_scenario(scenario)
+        # The events are applied at the tick period, also when no client reads the
+        # simulated device and the model is not updated.
+        scenario_thread = threading.Thread(
+            target=self._apply_scenario_events, args=(scenario,)
+        )
+        scenario_thread.daemon = True
+        scenario_thread.start()
+
+    @command(doc_in="Stop the loaded scenario, its pending events are discarded.")
+    def StopScenario(self):
+        self.model.set_scenario(None)
+
+    def _apply_scenario_events(self, scenario):
+        with EnsureOmniThread():
+            while self.model.scenario is scenario and scenario.pending_events:
+                self.model.run_scenario()
+                time.sleep(self.scenario_tick_period)
+
+    @command(
+        dtype_in=str,
+        doc_in="JSON object of the latency and error injection settings to change, "
+        "keyed by attribute or command name, e.g. "
+        '{"temperature": {"latency": {"distribution": "uniform", "min": 0.1, '
+        '"max": 0.5}, "error_rate": 0.01}}. A null value removes the settings.',
+    )
+    def SetFaultInjection(self, faults):
+        self.model.fault_injector.set_faults(json.loads(faults))
+
+    @command(doc_in="Remove all the fault injection settings and statistics.")
+    def ClearFaultInjection(self):
+        self.model.fault_injector.clear()
+
+    @command(
+        doc_in="Take a snapshot of the model and of the state of the simulated "
+        "device, to be restored with RestoreModelSnapshot.",
+    )
+    def TakeModelSnapshot(self):
+        self._model_snapshot = self.model.get_snapshot()
+        simulated_device = self._get_simulated_device()
+        if simulated_device is not None:
+            self._device_state_snapshot = simulated_device.get_state()
+
+    @command(
+        doc_in="Put the model and the state of the simulated device back as they "
+        "were at the last TakeModelSnapshot, e.g. between tests.",
+    )
+    def RestoreModelSnapshot(self):
+        if self._model_snapshot is None:
+            raise RuntimeError("No model snapshot taken, call TakeModelSnapshot first.")
+        self.model.restore_snapshot(self._model_snapshot)
+        simulated_device = self._get_simulated_device()
+        if simulated_device is not None and self._device_state_snapshot is not None:
+            simulated_device.set_state(self._device_state_snapshot)
+
+    @command(
+        dtype_in=str,
+        doc_in="JSON object of the polling periods [ms] of attributes of the "
+        'simulated device, e.g. {"temperature": 1000, "pressure": 0}. A period of 0 '
+        "stops the polling of the attribute.",
+    )
+    def SetAttributesPolling(self, poll_periods):
+        simulated_device = self._get_simulated_device()
+        if simulated_device is None:
+            raise RuntimeError(
+                "The simulated device {} does not run in this device server.".format(
+                    self.model_key
+                )
+            )
+        simulated_device.set_attributes_polling(json.loads(poll_periods))
+
+    def _get_simulated_device(self):
+        """The simulated device, if it runs in this device server."""
+        try:
+            return Util.instance().get_device_by_name(self.model_key)
+        except DevFailed:
+            return None
+
+    @attribute(
+        dtype=str,
+        doc="JSON object of the fault injection settings, keyed by attribute or "
+        "command name.",
+    )
+    def fault_injection_settings(self):
+        return json.dumps(self.model.fault_injector.faults)
+
+    @attribute(
+        dtype=str,
+        doc="JSON object of the number of requests, delayed requests and injected "
+        "errors and the total and maximum delay [seconds] of each attribute and "
+        "command with fault injection settings.",
+    )
+    def fault_injection_stats(self):
+        return json.dumps(self.model.fault_injector.get_stats())
+
     def read_attributes(self, attr):
         """Method reading an attribute value.
 
@@ -119,3 +275,11 @@ class TangoTestDeviceServerBase(Device):
             self.model_quantity.set_val(data, self.model.time_func())
         else:
             setattr(self.model_quantity, name, data)
+
+
+def _get_json_serializable(value):
+    # Quantity values can be numpy arrays and scalars.
+    try:
+        return value.tolist()
+    except AttributeError:
+        raise TypeError("{!r} is not JSON serializable".format(value))
@@ -6,7 +6,8 @@
 #########################################################################################
 """Utility to help launch a TANGO device in a KATCP eco-system.
 
-Helps by auto-registering a TANGO device if needed.
+Helps by auto-registering a TANGO device if needed. In farm mode the devices are
+sharded across several server processes, which are started concurrently.
 """
 from __future__ import absolute_import, division, print_function
 from future import standard_library
@@ -14,16 +15,19 @@ from future import standard_library
 standard_library.install_aliases()  # noqa: E402
 
 import argparse
+import multiprocessing
 import os
+import subprocess
 import sys
+import time
 
+from collections import namedtuple
 from functools import partial
 
 import tango
 
-from builtins import range
-
 from tango_simlib.compat import PYTHON_SYS_VERSION
+from tango_simlib.utilities.helper_module import get_port, put_device_properties
 
 parser = argparse.ArgumentParser(
     description="Launch a TANGO device, handling registration as needed. "
@@ -46,7 +50,10 @@ required_argument(
 )
 required_argument("--server-command", help="TANGO server executable command")
 required_argument("--server-instance", help="TANGO server instance name")
-required_argument("--port", help="TCP port where TANGO server should listen")
+parser.add_argument(
+    "--port",
+    help="TCP port where TANGO server should listen. Required unless --farm is used",
+)
 parser.add_argument(
     "--file-name",
     help="ASCII file containing device configuration parameters"
@@ -62,44 +69,87 @@ parser.add_argument(
     dest="device_properties",
     default=[],
 )
+parser.add_argument(
+    "--farm",
+    action="store_true",
+    help="Shard the devices across several server processes, named "
+    "<server-instance>-<N>. Each process listens on a free port and the "
+    "launcher waits until all the devices are ready. A device with a "
+    "'model_key' property is started in the same process as the device it "
+    "refers to. Requires a TANGO DB",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of server processes started in farm mode. Defaults to the "
+    "number of CPUs",
+)
+parser.add_argument(
+    "--ready-timeout",
+    type=float,
+    default=60.0,
+    help="Time to wait for the devices to be ready in farm mode [seconds]",
+)
 
+FarmWorker = namedtuple("FarmWorker", "instance port device_names process")
+# The number of times a farm server is started before giving up, in case the free
+# port it was given is taken by another process before the server binds it.
+MAX_SERVER_STARTS = 3
 
-def register_device(name, device_class, server_name, instance, db):
+
+def get_device_info(name, device_class, server_name, instance):
     dev_info = tango.DbDevInfo()
     dev_info.name = name
     dev_info._class = device_class
     dev_info.server = "{}/{}".format(server_name.split(".")[0], instance)
-    print(
-        """Attempting to register TANGO device {!r}
+    return dev_info
+
+
+def register_devices(names, device_classes, server_name, instance, db):
+    """Register all the devices of a server instance in a single database call.
+
+    Nothing is written if the devices are already registered with the same classes.
+    """
+    dev_infos = [
+        get_device_info(name, device_class, server_name, instance)
+        for name, device_class in zip(names, device_classes)
+    ]
+    server = dev_infos[0].server
+    registered = list(db.get_device_class_list(server))
+    registered_devices = {
+        dev_name.lower(): dev_class
+        for dev_name, dev_class in zip(registered[::2], registered[1::2])
+    }
+    unregistered = [
+        dev_info
+        for dev_info in dev_infos
+        if registered_devices.get(dev_info.name.lower()) != dev_info._class
+    ]
+    if not unregistered:
+        print("TANGO devices {!r} already registered.".format(list(names)))
+        return
+    for dev_info in unregistered:
+        print(
+            """Attempting to register TANGO device {!r}
     class: {!r}  server: {!r}.""".format(
-            dev_info.name, dev_info._class, dev_info.server
+                dev_info.name, dev_info._class, dev_info.server
+            )
         )
-    )
-    db.add_device(dev_info)
+    db.add_server(server, unregistered, with_dserver=True)
 
 
-def put_device_property(dev_name, property_name, property_value, db):
-    print(
-        "Setting device {!r} property {!r}: {!r}".format(
-            dev_name, property_name, property_value
-        )
-    )
-    db.put_device_property(dev_name, {property_name: [property_value]})
+def get_device_properties(device_properties, device_names):
+    """Group the `--put-device-property` arguments per device.
 
+    Returns
+    -------
+    properties : dict
+        Device name -> {property name: [property value]}
 
-def start_device(opts):
-    if opts.file_name:
-        db = tango.Database(opts.file_name)
-    else:
-        db = tango.Database()
-        server_name = os.path.basename(opts.server_command)
-        number_of_devices = len(opts.name)
-        # Register tango devices
-        for i in range(number_of_devices):
-            register_device(
-                opts.name[i], opts.device_class[i], server_name, opts.server_instance, db
-            )
-    for dev_property in opts.device_properties:
+    """
+    properties = {}
+    for dev_property in device_properties:
         try:
             dev_name, dev_property_name, dev_property_val = dev_property.split(":", 2)
         except ValueError:
@@ -107,10 +157,27 @@ def start_device(opts):
                 "Device property incorrectly specified, "
                 "see help for --put-device-property"
             )
-        assert dev_name in opts.name, "Device {!r} not launched by this command".format(
-            dev_name
+        assert (
+            dev_name in device_names
+        ), "Device {!r} not launched by this command".format(dev_name)
+        properties.setdefault(dev_name, {})[dev_property_name] = [dev_property_val]
+    return properties
+
+
+def start_device(opts):
+    if opts.file_name:
+        db = tango.Database(opts.file_name)
+    else:
+        db = tango.Database()
+        server_name = os.path.basename(opts.server_command)
+        # Register tango devices
+        register_devices(
+            opts.name, opts.device_class, server_name, opts.server_instance, db
         )
-        put_device_property(dev_name, dev_property_name, dev_property_val, db)
+    device_properties = get_device_properties(opts.device_properties, opts.name)
+    for dev_name, properties in device_properties.items():
+        print("Setting device {!r} properties: {!r}".format(dev_name, properties))
+        put_device_properties(db, dev_name, properties)
 
     if ".py" in opts.server_command:
         args = [
@@ -146,9 +213,206 @@ def start_device(opts):
         os.execvp(opts.server_command, args)
 
 
+def shard_devices(names, device_properties, num_shards):
+    """Distribute the devices over a number of server processes.
+
+    A device that has a 'model_key' property (e.g. a SimControl device) is kept in
+    the same shard as the device that it refers to, since it controls that device's
+    model in the server process.
+
+    Parameters
+    ----------
+    names : list
+        TANGO device names.
+    device_properties : dict
+        Device name -> {property name: [property value]}
+    num_shards : int
+        Maximum number of shards.
+
+    Returns
+    -------
+    shards : list
+        A list of lists of device names, no shard is empty.
+
+    """
+    groups = {}
+    for name in names:
+        model_key = device_properties.get(name, {}).get("model_key", [None])[0]
+        group_name = model_key if model_key in names else name
+        groups.setdefault(group_name, []).append(name)
+    group_list = [groups[name] for name in names if name in groups]
+    shards = [[] for _ in range(min(num_shards, len(group_list)))]
+    # Largest groups first, each one into the shard with the least devices.
+    for group in sorted(group_list, key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return shards
+
+
+def get_server_args(server_command, instance, port):
+    if ".py" in server_command:
+        args = [sys.executable, server_command]
+    else:
+        args = [server_command]
+    args.extend([instance, "-ORBendPoint", "giop:tcp::{}".format(port)])
+    return args
+
+
+def start_server(server_command, worker):
+    """Start the server process of a farm worker on a free port.
+
+    The port is only looked up right before the process starts, so that another
+    process is unlikely to take it in the meantime.
+
+    Returns
+    -------
+    worker : FarmWorker
+        The worker with its port and process.
+
+    """
+    port = get_port()
+    process = subprocess.Popen(get_server_args(server_command, worker.instance, port))
+    return worker._replace(port=port, process=process)
+
+
+def wait_until_ready(workers, timeout, poll_period=0.1, restart=None):
+    """Wait until all the devices of the farm workers respond to a ping.
+
+    A proxy is created once per device and reused until the device responds.
+
+    Parameters
+    ----------
+    workers : list
+        A list of `FarmWorker` with started processes. The restarted workers
+        replace the ones in the list.
+    timeout : float
+        Time to wait for all the devices [seconds].
+    poll_period : float
+        Time between the pings of a device that is not ready [seconds].
+    restart : callable
+        Called with a worker whose process exited before its devices were ready,
+        e.g. because its port was taken, to start it again. It returns the
+        restarted worker. A worker is started at most `MAX_SERVER_STARTS` times.
+
+    Raises
+    ------
+    RuntimeError
+        If a server process exits and cannot be restarted, or the devices are not
+        ready within `timeout`.
+
+    """
+    deadline = time.time() + timeout
+    proxies = {}
+    for index, worker in enumerate(workers):
+        num_starts = 1
+        pending = list(worker.device_names)
+        while pending:
+            if worker.process.poll() is not None:
+                if restart is None or num_starts >= MAX_SERVER_STARTS:
+                    raise RuntimeError(
+                        "TANGO server instance {!r} exited with code {}.".format(
+                            worker.instance, worker.process.returncode
+                        )
+                    )
+                print(
+                    "TANGO server instance {!r} on port {} exited with code {}, "
+                    "restarting it.".format(
+                        worker.instance, worker.port, worker.process.returncode
+                    )
+                )
+                worker = workers[index] = restart(worker)
+                num_starts += 1
+            try:
+                if pending[0] not in proxies:
+                    proxies[pending[0]] = tango.DeviceProxy(pending[0])
+                proxies[pending[0]].ping()
+            except tango.DevFailed:
+                if time.time() > deadline:
+                    raise RuntimeError(
+                        "TANGO devices {!r} of server instance {!r} not ready after "
+                        "{} seconds.".format(pending, worker.instance, timeout)
+                    )
+                time.sleep(poll_period)
+            else:
+                pending.pop(0)
+        print(
+            "TANGO server instance {!r} ready on port {}.".format(
+                worker.instance, worker.port
+            )
+        )
+
+
+def start_farm(opts):
+    """Register the devices in shards and start a server process per shard.
+
+    Returns
+    -------
+    workers : list
+        A list of `FarmWorker`, returned once all the devices are ready.
+
+    """
+    if opts.file_name:
+        raise ValueError("Farm mode requires a TANGO DB, --file-name is not supported")
+    num_workers = opts.workers or multiprocessing.cpu_count()
+    device_classes = dict(zip(opts.name, opts.device_class))
+    device_properties = get_device_properties(opts.device_properties, opts.name)
+    server_name = os.path.basename(opts.server_command)
+    db = tango.Database()
+    shards = shard_devices(opts.name, device_properties, num_workers)
+    workers = []
+    for index, device_names in enumerate(shards):
+        instance = "{}-{}".format(opts.server_instance, index)
+        register_devices(
+            device_names,
+            [device_classes[name] for name in device_names],
+            server_name,
+            instance,
+            db,
+        )
+        for dev_name in device_names:
+            if dev_name in device_properties:
+                put_device_properties(db, dev_name, device_properties[dev_name])
+        workers.append(FarmWorker(instance, None, device_names, None))
+
+    print(
+        "Starting {} TANGO server processes for {} devices.".format(
+            len(workers), len(opts.name)
+        )
+    )
+    sys.stdout.flush()
+    sys.stderr.flush()
+    start = partial(start_server, opts.server_command)
+    workers = [start(worker) for worker in workers]
+    try:
+        wait_until_ready(workers, opts.ready_timeout, restart=start)
+    except Exception:
+        stop_farm(workers)
+        raise
+    return workers
+
+
+def stop_farm(workers):
+    for worker in workers:
+        if worker.process.poll() is None:
+            worker.process.terminate()
+    for worker in workers:
+        worker.process.wait()
+
+
 def main():
     opts = parser.parse_args()
-    start_device(opts)
+    if len(opts.name) != len(opts.device_class):
+        parser.error("--name and --class must be specified the same number of times")
+    if not opts.farm:
+        if opts.port is None:
+            parser.error("--port is required unless --farm is used")
+        start_device(opts)
+        return
+    workers = start_farm(opts)
+    try:
+        for worker in workers:
+            worker.process.wait()
+    finally:
+        stop_farm(workers)
 
 
 if __name__ == "__main__":
@@ -16,6 +16,8 @@ standard_library.install_aliases()  # noqa: E402
 import argparse
 import logging
 import os
+import pprint
+import sys
 import time
 import weakref
 from builtins import map, object, range
@@ -42,13 +44,23 @@ from tango_simlib.model import (
 from future.utils import with_metaclass
 from future.utils import itervalues
 from tango_simlib.sim_test_interface import TangoTestDeviceServerBase
-from tango_simlib.utilities import helper_module
+from tango_simlib.update_engine import update_engine
+from tango_simlib.utilities import helper_module, precompiled_parser
+from tango_simlib.utilities.startup_timing import startup_timer
 from tango_simlib.utilities.fandango_json_parser import FandangoExportDeviceParser
 from tango_simlib.utilities.sim_xmi_parser import XmiParser
 from tango_simlib.utilities.simdd_json_parser import SimddParser
 
 MODULE_LOGGER = logging.getLogger(__name__)
 
+# The attribute properties that are specific to each attribute, which are not part
+# of the templates shared by attributes, see
+# `get_attribute_default_properties_templates`.
+ATTRIBUTE_SPECIFIC_PROPERTIES = frozenset(["label", "description"])
+# The simulator description files that can define several devices, see
+# `get_device_parsers`.
+MULTI_DEVICE_FILE_EXTENSIONS = (".xmi", ".fgo")
+
 
 class TangoDeviceServerBase(Device):
     instances = weakref.WeakValueDictionary()
@@ -72,8 +84,11 @@ class TangoDeviceServerBase(Device):
             The attribute to read from.
 
         """
+        if startup_timer.first_read_time is None:
+            startup_timer.record_first_read()
         if self.get_state() != DevState.OFF:
             name = attr.get_name()
+            self.model.fault_injector.inject(name)
             value, update_time = self.model.quantity_state[name]
             quality = AttrQuality.ATTR_VALID
             attr.set_value_date_quality(value, update_time, quality)
@@ -92,6 +107,24 @@ class TangoDeviceServerBase(Device):
             data = attr.get_write_value()
             self.model.sim_quantities[name].set_val(data, self.model.time_func())
 
+    def set_attributes_polling(self, poll_periods):
+        """Set the polling periods of many attributes in one call.
+
+        The polling thread picks the new periods up asynchronously, the device's
+        polling status shows when it did.
+
+        Parameters
+        ----------
+        poll_periods : dict
+            Attribute name -> polling period [ms], 0 to stop polling the attribute.
+
+        """
+        for name, period in poll_periods.items():
+            if period:
+                self.poll_attribute(name, int(period))
+            elif self.is_attribute_polled(name):
+                self.stop_poll_attribute(name)
+
 
 def add_static_attribute(tango_device_class, attr_name, attr_meta):
     """Add any TANGO attribute of to the device server before start-up.
@@ -112,6 +145,12 @@ def add_static_attribute(tango_device_class, attr_name, attr_meta):
 
     """
     polling_period = attr_meta["period"]
+    is_enum = str(attr_meta["data_type"]) == "DevEnum"
+    display_properties = {}
+    for prop in ("unit", "standard_unit", "display_unit", "format"):
+        prop_value = attr_meta.get(prop)
+        if prop_value and prop_value not in helper_module.TANGO_NOT_SPECIFIED_PROPS:
+            display_properties[prop] = prop_value
     attr = attribute(
         label=attr_meta.get("label", attr_name),
         dtype=attr_meta["data_type"],
@@ -136,21 +175,27 @@ def add_static_attribute(tango_device_class, attr_name, attr_meta):
         archive_abs_change=attr_meta.get("archive_abs_change", ""),
         archive_rel_change=attr_meta.get("archive_rel_change", ""),
         archive_period=attr_meta.get("archive_period", ""),
+        **display_properties
     )
     attr.__name__ = attr_name
 
     # Attribute read method
-    def read_meth(tango_device_instance, attr):
-        name = attr.get_name()
-        value, update_time = tango_device_instance.model.quantity_state[name]
+    def read_meth(tango_device_instance, attr=None):
+        if startup_timer.first_read_time is None:
+            startup_timer.record_first_read()
+        tango_device_instance.model.fault_injector.inject(attr_name)
+        value, update_time = tango_device_instance.model.quantity_state[attr_name]
         quality = AttrQuality.ATTR_VALID
-        # For attributes that have a SPECTRUM data format, there is no need to
-        # type cast them to an integer data type. we need assign the list of values
-        # to the attribute value parameter.
-        if type(value) in (list, np.ndarray):
-            attr.set_value_date_quality(value, update_time, quality)
-        else:
-            attr.set_value_date_quality(int(value), update_time, quality)
+        # Only the DevEnum values need to be type cast to an integer data type. For
+        # attributes that have a SPECTRUM data format, we need assign the list of
+        # values to the attribute value parameter.
+        if is_enum and type(value) not in (list, np.ndarray):
+            value = int(value)
+        # PyTango versions that call the read method without the attribute expect
+        # the value to be returned.
+        if attr is None:
+            return value, update_time, quality
+        attr.set_value_date_quality(value, update_time, quality)
 
     # Attribute write method for writable attributes
     if str(attr_meta["writable"]) in ("READ_WRITE", "WRITE"):
@@ -203,7 +248,9 @@ def _create_sim_test_interface_atttribute(models, class_instance):
     return attr
 
 
-def get_tango_device_server(models, sim_data_files):
+def get_tango_device_server(
+    models, sim_data_files, device_class_name=None, static_interface=False
+):
     """Declares a tango device class that inherits the Device class and then
     adds tango attributes (DevEnum and Spectrum type).
 
@@ -214,6 +261,11 @@ def get_tango_device_server(models, sim_data_files):
         e.g. {'model-name': model.Model}
     sim_data_files: list
         A list of direct paths to either xmi/fgo/json data files.
+    device_class_name: str
+        TANGO device class name. If not specified it is read from `sim_data_files`.
+    static_interface: bool
+        If True all the attributes and commands are declared on the device class
+        before start-up, instead of being added to each device in `init_device`.
 
     Returns
     -------
@@ -229,13 +281,17 @@ def get_tango_device_server(models, sim_data_files):
     class TangoTestDeviceServerStaticAttrs(object):
         pass
 
+    first_model = list(itervalues(models))[0]
+    # The `attribute_name` enum labels, sorted once instead of on every write.
+    quantity_names = sorted(first_model.sim_quantities)
+
     def read_fn(tango_device_instance):
         return tango_device_instance._attribute_name_index
 
     def write_fn(tango_device_instance, val):
         tango_device_instance._attribute_name_index = val
         tango_device_instance.model_quantity = tango_device_instance.model.sim_quantities[
-            sorted(tango_device_instance.model.sim_quantities.keys())[val]
+            quantity_names[val]
         ]
 
     # Sim test interface static attribute `attribute_name` info
@@ -252,10 +308,15 @@ def get_tango_device_server(models, sim_data_files):
     # Exchange community (AskTango) and also make follow ups on the next tango
     # releases.
     static_attributes_added = []
-    for quantity_name, quantity in list(itervalues(models))[0].sim_quantities.items():
-        d_type = str(quantity.meta["data_type"])
-        d_format = str(quantity.meta["data_format"])
-        if d_type == "DevEnum" or d_format in ("SPECTRUM", "IMAGE"):
+    with startup_timer.phase("static_attributes"):
+        for quantity_name, quantity in first_model.sim_quantities.items():
+            d_type = str(quantity.meta["data_type"])
+            d_format = str(quantity.meta["data_format"])
+            if static_interface:
+                if quantity_name in helper_module.DEFAULT_TANGO_DEVICE_ATTRIBUTES:
+                    continue
+            elif d_type != "DevEnum" and d_format not in ("SPECTRUM", "IMAGE"):
+                continue
             add_static_attribute(
                 TangoDeviceServerStaticAttrs, quantity_name, quantity.meta
             )
@@ -265,8 +326,26 @@ def get_tango_device_server(models, sim_data_files):
         "Static attributes addded to the device: [{}]".format(static_attributes_added)
     )
 
+    if static_interface:
+        with startup_timer.phase("static_commands"):
+            for action_name in first_model.sim_actions:
+                cmd_handler = helper_module.generate_static_cmd_handler(
+                    first_model, action_name
+                )
+                setattr(TangoDeviceServerStaticAttrs, action_name, cmd_handler)
+        MODULE_LOGGER.info(
+            "Static commands added to the device: [{}]".format(
+                list(first_model.sim_actions)
+            )
+        )
+
     class TangoDeviceServer(TangoDeviceServerBase, TangoDeviceServerStaticAttrs):
         _models = models
+        _sim_data_files = sim_data_files
+        _static_interface = static_interface
+        _attribute_default_properties = get_attribute_default_properties_templates(
+            first_model
+        )
 
         min_update_period = device_property(
             dtype=float,
@@ -274,14 +353,55 @@ def get_tango_device_server(models, sim_data_files):
             doc="Minimum time before model update method can be called again [seconds].",
         )
 
+        sim_data_files_watch_period = device_property(
+            dtype=float,
+            default_value=0.0,
+            doc="Period at which the simulator description files are checked for "
+            "changes, which are then applied to the running device [seconds]. "
+            "Zero disables the check.",
+        )
+
+        shared_quantity_state_name = device_property(
+            dtype=str,
+            default_value="",
+            doc="Name of the shared memory segment in which the numeric quantity "
+            "values are kept for other processes, see tango_simlib.shared_state. "
+            "Empty to keep them private.",
+        )
+
+        shared_update_engine = device_property(
+            dtype=bool,
+            default_value=False,
+            doc="Step the model together with the models of the other devices of the "
+            "server that set this property, see tango_simlib.update_engine.",
+        )
+
         def init_device(self):
             super(TangoDeviceServer, self).init_device()
             self.model = self._models[self.get_name()]
             self._not_added_attributes = []
-            write_device_properties_to_db(self.get_name(), self.model)
+            self._sim_data_files_checked = time.time()
+            self._sim_data_files_mtimes = self._get_sim_data_files_mtimes()
+            with startup_timer.phase("write_device_properties"):
+                write_device_properties_to_db(self.get_name(), self.model)
             self.model.reset_model_state()
             self.model.min_update_period = self.min_update_period
-            self.initialize_dynamic_commands()
+            if self.shared_update_engine:
+                update_engine.add_model(self.model)
+            else:
+                update_engine.remove_model(self.model)
+            if self.shared_quantity_state_name:
+                shared_state = self.model.share_quantity_state(
+                    self.shared_quantity_state_name
+                )
+                MODULE_LOGGER.info(
+                    "Device %s: quantity state shared in %s.",
+                    self.get_name(),
+                    shared_state.name,
+                )
+            if not self._static_interface:
+                with startup_timer.phase("dynamic_commands"):
+                    self.initialize_dynamic_commands()
 
             # Only the .fgo file has the State as an attribute. The .xmi files has it as
             # a command, so it won't have an initial value. And in some other data
@@ -292,14 +412,117 @@ def get_tango_device_server(models, sim_data_files):
                 state_value = int(state_quantity["value"])
                 self.set_state(DevState.values[state_value])
 
+        def always_executed_hook(self):
+            if self.sim_data_files_watch_period > 0:
+                now = time.time()
+                if now - self._sim_data_files_checked >= self.sim_data_files_watch_period:
+                    self._sim_data_files_checked = now
+                    self._check_sim_data_files()
+            super(TangoDeviceServer, self).always_executed_hook()
+
+        def _get_sim_data_files_mtimes(self):
+            mtimes = {}
+            for file_name in self._sim_data_files:
+                try:
+                    mtimes[file_name] = os.stat(file_name).st_mtime
+                except OSError:
+                    mtimes[file_name] = None
+            return mtimes
+
+        def _check_sim_data_files(self):
+            mtimes = self._get_sim_data_files_mtimes()
+            if mtimes == self._sim_data_files_mtimes:
+                return
+            # Only retry when the files change again if the reload fails.
+            self._sim_data_files_mtimes = mtimes
+            try:
+                self.reload_sim_data_files()
+            except Exception:
+                MODULE_LOGGER.exception(
+                    "Device %s: could not reload the simulator description files %s.",
+                    self.get_name(),
+                    self._sim_data_files,
+                )
+
+        def reload_sim_data_files(self):
+            """Apply the changes in the simulator description files to the device.
+
+            Returns
+            -------
+            changes : dict
+                As returned by :meth:`model.Model.update_from_model`.
+
+            """
+            old_meta = {
+                name: quantity.meta
+                for name, quantity in self.model.sim_quantities.items()
+            }
+            changes = reload_device_model(
+                self.model, self._sim_data_files, self.TangoClassName
+            )
+            MODULE_LOGGER.info(
+                "Device %s: simulator description files reloaded, changes %s.",
+                self.get_name(),
+                {change: names for change, names in changes.items() if names},
+            )
+            if self._static_interface:
+                if changes["quantities_added"] or changes["actions_added"]:
+                    MODULE_LOGGER.warning(
+                        "Device %s: new attributes and commands are not added to "
+                        "a static device interface.",
+                        self.get_name(),
+                    )
+                return changes
+
+            # Replace the TANGO attributes whose configuration changed.
+            self._attribute_default_properties = dict(self._attribute_default_properties)
+            attributes_to_add = list(changes["quantities_added"])
+            for name in changes["quantities_removed"] + changes["quantities_changed"]:
+                meta_data = old_meta[name]
+                if not self._is_attribute_addable_dynamically(meta_data):
+                    continue
+                quantity = self.model.sim_quantities.get(name)
+                if quantity is not None:
+                    if not self._is_attribute_config_changed(meta_data, quantity.meta):
+                        continue
+                    attributes_to_add.append(name)
+                self.remove_attribute(name)
+            for name in attributes_to_add:
+                meta_data = self.model.sim_quantities[name].meta
+                self._attribute_default_properties[name] = (
+                    get_default_attribute_properties(
+                        name, get_attribute_property_setters(meta_data)
+                    )
+                )
+                self._add_quantity_attribute(name, meta_data)
+
+            for action_name in changes["actions_removed"] + changes["actions_changed"]:
+                self.remove_command(action_name)
+            for action_name in changes["actions_added"] + changes["actions_changed"]:
+                self._add_dynamic_command(action_name)
+            return changes
+
+        def _is_attribute_config_changed(self, meta_data, new_meta_data):
+            return (
+                get_attribute_property_setters(meta_data)
+                != get_attribute_property_setters(new_meta_data)
+                or str(meta_data["data_type"]) != str(new_meta_data["data_type"])
+                or meta_data["writable"] != new_meta_data["writable"]
+            )
+
+        def _add_dynamic_command(self, action_name):
+            # The command handler looks up the action on the device model when it is
+            # called, so the action can be replaced when the model is reloaded.
+            cmd_handler = helper_module.generate_static_cmd_handler(
+                self.model, action_name
+            )
+            setattr(TangoDeviceServer, action_name, cmd_handler)
+            self.add_command(cmd_handler, device_level=True)
+
         def initialize_dynamic_commands(self):
             commands_added = []
-            for action_name, action_handler in self.model.sim_actions.items():
-                cmd_handler = helper_module.generate_cmd_handler(
-                    self.model, action_name, action_handler
-                )
-                setattr(TangoDeviceServer, action_name, cmd_handler)
-                self.add_command(cmd_handler, device_level=True)
+            for action_name in self.model.sim_actions:
+                self._add_dynamic_command(action_name)
                 commands_added.append(action_name)
 
             MODULE_LOGGER.info(
@@ -307,35 +530,41 @@ def get_tango_device_server(models, sim_data_files):
             )
 
         def initialize_dynamic_attributes(self):
+            if self._static_interface:
+                return
             model_sim_quants = self.model.sim_quantities
             attribute_list = set([attr for attr in model_sim_quants.keys()])
             attributes_added = []
-            for attribute_name in attribute_list:
-                meta_data = model_sim_quants[attribute_name].meta
-                # Dynamically add all attributes except those with DevEnum data type,
-                # and SPECTRUM data format since they are added statically to the device
-                # class prior to start-up. Also exclude attributes with a data format
-                # 'IMAGE' as we currently do not handle them.
-                if not self._is_attribute_addable_dynamically(meta_data):
-                    continue
-                # The return value of rwType is a string and it is required as a
-                # PyTango data type when passed to the Attr function.
-                # e.g. 'READ' -> tango._tango.AttrWriteType.READ
-                rw_type = meta_data["writable"]
-                rw_type = getattr(AttrWriteType, rw_type)
-                attr = self._create_attribute(
-                    attribute_name, meta_data["data_type"], rw_type
-                )
-                if attr is None:
-                    continue
-
-                self._configure_attribute_default_properties(attr, meta_data)
-                self._add_dynamic_attribute(attr, rw_type)
+            with startup_timer.phase("dynamic_attributes"):
+                for attribute_name in attribute_list:
+                    meta_data = model_sim_quants[attribute_name].meta
+                    if self._add_quantity_attribute(attribute_name, meta_data):
+                        attributes_added.append(attribute_name)
 
             MODULE_LOGGER.info(
                 "Dynamic attributes added to the device: [{}]".format(attributes_added)
             )
 
+        def _add_quantity_attribute(self, attribute_name, meta_data):
+            # Dynamically add all attributes except those with DevEnum data type,
+            # and SPECTRUM data format since they are added statically to the device
+            # class prior to start-up. Also exclude attributes with a data format
+            # 'IMAGE' as we currently do not handle them.
+            if not self._is_attribute_addable_dynamically(meta_data):
+                return False
+            # The return value of rwType is a string and it is required as a
+            # PyTango data type when passed to the Attr function.
+            # e.g. 'READ' -> tango._tango.AttrWriteType.READ
+            rw_type = meta_data["writable"]
+            rw_type = getattr(AttrWriteType, rw_type)
+            attr = self._create_attribute(attribute_name, meta_data["data_type"], rw_type)
+            if attr is None:
+                return False
+
+            self._configure_attribute_default_properties(attr, meta_data)
+            self._add_dynamic_attribute(attr, rw_type)
+            return True
+
         def _add_dynamic_attribute(self, attribute, read_write_type):
             if read_write_type in (AttrWriteType.READ, AttrWriteType.READ_WITH_WRITE):
                 self.add_attribute(attribute, r_meth=self.read_attributes)
@@ -372,41 +601,14 @@ def get_tango_device_server(models, sim_data_files):
             return attribute
 
         def _configure_attribute_default_properties(self, attribute, quantity_meta_data):
-            attribute_properties = UserDefaultAttrProp()
-            for prop, prop_value in quantity_meta_data.items():
-                # NB: Calling 'set_enum_labels' or setting the 'enum_labels' results
-                # in a error, and we do not need to do anyway as DevEnum attributes are
-                # handled by the `add_static_attribute` method.
-                if prop == "enum_labels":
-                    continue
-
-                # UserDefaultAttrProp does not have the property 'event_period' but does
-                # have a setter method for it.
-                if prop == "event_period":
-                    attribute_properties.set_event_period(prop_value)
-                    continue
-
-                attribute_name = quantity_meta_data["name"]
-                if hasattr(attribute_properties, prop):
-                    try:
-                        setattr(attribute_properties, prop, prop_value)
-                    except Exception as e:
-                        MODULE_LOGGER.error(
-                            "The attribute '%s's property '%s' could not be set to "
-                            "value '%s' due to an error raised %s.",
-                            attribute_name,
-                            prop,
-                            prop_value,
-                            str(e),
-                        )
-                else:
-                    MODULE_LOGGER.debug(
-                        "UserDefaultAttrProp has no attribute named '%s' "
-                        "for the device attribute '%s'.",
-                        prop,
-                        attribute_name,
-                    )
-
+            attribute_name = quantity_meta_data["name"]
+            attribute_properties = self._attribute_default_properties.get(attribute_name)
+            if attribute_properties is None:
+                # The attribute is not known to the class (e.g. the device model
+                # differs from the one the class was created from).
+                attribute_properties = get_default_attribute_properties(
+                    attribute_name, get_attribute_property_setters(quantity_meta_data)
+                )
             attribute.set_default_properties(attribute_properties)
 
         @attribute(
@@ -425,6 +627,14 @@ def get_tango_device_server(models, sim_data_files):
         def NumAttributesNotAdded(self):
             return len(self._not_added_attributes)
 
+        @attribute(
+            dtype=str,
+            doc="JSON report of the time taken by each start-up phase of the "
+            "device server [seconds].",
+        )
+        def StartupTimingReport(self):
+            return startup_timer.get_report_json()
+
     class SimControl(TangoTestDeviceServerBase, TangoTestDeviceServerStaticAttrs):
         instances = weakref.WeakValueDictionary()
 
@@ -434,7 +644,7 @@ def get_tango_device_server(models, sim_data_files):
             name = self.get_name()
             self.instances[name] = self
 
-    klass_name = get_device_class(sim_data_files)
+    klass_name = device_class_name or get_device_class(sim_data_files)
     TangoDeviceServer.TangoClassName = klass_name
     TangoDeviceServer.__name__ = klass_name
     SimControl.TangoClassName = "%sSimControl" % klass_name
@@ -442,6 +652,129 @@ def get_tango_device_server(models, sim_data_files):
     return [TangoDeviceServer, SimControl]
 
 
+def get_attribute_property_setters(quantity_meta_data):
+    """Resolve the attribute metadata that applies to a `UserDefaultAttrProp`.
+
+    Parameters
+    ----------
+    quantity_meta_data : dict
+        The metadata of a model quantity.
+
+    Returns
+    -------
+    property_setters : tuple
+        Sorted (property name, value) pairs that can be set on a
+        `UserDefaultAttrProp` instance.
+
+    """
+    property_setters = []
+    for prop, prop_value in quantity_meta_data.items():
+        # NB: Calling 'set_enum_labels' or setting the 'enum_labels' results
+        # in a error, and we do not need to do anyway as DevEnum attributes are
+        # handled by the `add_static_attribute` method.
+        if prop == "enum_labels":
+            continue
+        # UserDefaultAttrProp does not have the property 'event_period' but does
+        # have a setter method for it.
+        if prop == "event_period" or hasattr(UserDefaultAttrProp, prop):
+            property_setters.append((prop, prop_value))
+        else:
+            MODULE_LOGGER.debug(
+                "UserDefaultAttrProp has no attribute named '%s' "
+                "for the device attribute '%s'.",
+                prop,
+                quantity_meta_data.get("name"),
+            )
+    return tuple(sorted(property_setters, key=lambda setter: setter[0]))
+
+
+def get_default_attribute_properties(attribute_name, property_setters):
+    """Create a `UserDefaultAttrProp` instance from resolved property setters.
+
+    Parameters
+    ----------
+    attribute_name : str
+        Name of the attribute, only used for error reporting.
+    property_setters : tuple
+        (property name, value) pairs as returned by `get_attribute_property_setters`.
+
+    Returns
+    -------
+    attribute_properties : tango.UserDefaultAttrProp
+
+    """
+    attribute_properties = UserDefaultAttrProp()
+    for prop, prop_value in property_setters:
+        try:
+            if prop == "event_period":
+                attribute_properties.set_event_period(prop_value)
+            else:
+                setattr(attribute_properties, prop, prop_value)
+        except Exception as e:
+            MODULE_LOGGER.error(
+                "The attribute '%s's property '%s' could not be set to "
+                "value '%s' due to an error raised %s.",
+                attribute_name,
+                prop,
+                prop_value,
+                str(e),
+            )
+    return attribute_properties
+
+
+def get_attribute_default_properties_templates(model):
+    """Precompute the default properties of all the attributes of a device class.
+
+    The properties are resolved once per device class instead of at every device
+    init. The label and description are specific to each attribute, while the other
+    properties (format, units, ranges, alarms, events...) are often common to many
+    attributes. Attributes without a label or description share one template
+    `UserDefaultAttrProp` instance per distinct set of common properties. The others
+    get a copy of their common properties with their own label and description set.
+
+    Parameters
+    ----------
+    model : model.Model instance
+        Device model instance the device class is created from.
+
+    Returns
+    -------
+    attribute_default_properties : dict
+        Attribute name -> tango.UserDefaultAttrProp instance.
+
+    """
+    templates = {}
+    attribute_default_properties = {}
+    for quantity_name, quantity in model.sim_quantities.items():
+        common_setters = []
+        specific_setters = []
+        for setter in get_attribute_property_setters(quantity.meta):
+            if setter[0] in ATTRIBUTE_SPECIFIC_PROPERTIES:
+                specific_setters.append(setter)
+            else:
+                common_setters.append(setter)
+        if specific_setters:
+            # A UserDefaultAttrProp instance cannot be copied, nor all its properties
+            # read (e.g. the event period), so the copy is made from the setters.
+            properties = get_default_attribute_properties(
+                quantity_name, common_setters + specific_setters
+            )
+        else:
+            signature = repr(common_setters)
+            if signature not in templates:
+                templates[signature] = get_default_attribute_properties(
+                    quantity_name, common_setters
+                )
+            properties = templates[signature]
+        attribute_default_properties[quantity_name] = properties
+    MODULE_LOGGER.debug(
+        "%d attribute default properties templates created for %d attributes.",
+        len(templates),
+        len(attribute_default_properties),
+    )
+    return attribute_default_properties
+
+
 def write_device_properties_to_db(device_name, model, db_instance=None):
     """Writes device properties, including optional default value, to tango DB.
 
@@ -457,10 +790,16 @@ def write_device_properties_to_db(device_name, model, db_instance=None):
     if not db_instance:
         db_instance = helper_module.get_database()
 
-    for prop_name, prop_meta in model.sim_properties.items():
-        db_instance.put_device_property(
-            device_name, {prop_name: prop_meta["DefaultPropValue"]}
-        )
+    # Write all the properties in one database call, skipping the ones that
+    # already hold the same value.
+    helper_module.put_device_properties(
+        db_instance,
+        device_name,
+        {
+            prop_name: prop_meta["DefaultPropValue"]
+            for prop_name, prop_meta in model.sim_properties.items()
+        },
+    )
 
 
 def get_parser_instance(sim_datafile):
@@ -481,18 +820,116 @@ def get_parser_instance(sim_datafile):
     extension = os.path.splitext(sim_datafile)[-1]
     extension = extension.lower()
     parser_instance = None
-    if extension in [".xmi"]:
-        parser_instance = XmiParser()
-        parser_instance.parse(sim_datafile)
-    elif extension in [".json"]:
-        parser_instance = SimddParser()
-        parser_instance.parse(sim_datafile)
-    elif extension in [".fgo"]:
-        parser_instance = FandangoExportDeviceParser()
-        parser_instance.parse(sim_datafile)
+    with startup_timer.phase("parse:{}".format(os.path.basename(sim_datafile))):
+        if extension in [".xmi"]:
+            parser_instance = XmiParser()
+            parser_instance.parse(sim_datafile)
+        elif extension in [".json"]:
+            parser_instance = SimddParser()
+            parser_instance.parse(sim_datafile)
+        elif extension in [".fgo"]:
+            parser_instance = FandangoExportDeviceParser()
+            parser_instance.parse(sim_datafile)
+        elif extension in [precompiled_parser.COMPILED_FILE_EXTENSION]:
+            parser_instance = precompiled_parser.load_compiled_parser(sim_datafile)
     return parser_instance
 
 
+def get_device_parsers(sim_data_file):
+    """Parse all the device definitions in a simulator description file at once.
+
+    Parameters
+    ----------
+    sim_data_file : str
+        A direct path to the xmi/json/fgo file.
+
+    Returns
+    -------
+    parsers : dict
+        For fgo files the parsers are keyed by device name, otherwise by device class
+        name. The xmi files may describe several device classes.
+
+    """
+    extension = os.path.splitext(sim_data_file)[-1].lower()
+    if extension not in MULTI_DEVICE_FILE_EXTENSIONS:
+        parser_instance = get_parser_instance(sim_data_file)
+        return {parser_instance.device_class_name: parser_instance}
+    with startup_timer.phase("parse:{}".format(os.path.basename(sim_data_file))):
+        if extension == ".xmi":
+            return XmiParser.parse_classes(sim_data_file)
+        return FandangoExportDeviceParser.parse_devices(sim_data_file)
+
+
+def _is_multi_device_file(sim_data_files):
+    """Whether the simulator description is one file that may define many devices."""
+    return (
+        len(sim_data_files) == 1
+        and os.path.splitext(sim_data_files[0])[-1].lower()
+        in MULTI_DEVICE_FILE_EXTENSIONS
+    )
+
+
+def configure_multi_device_models(sim_data_file, device_names=None, logger=None):
+    """Configure the models of all the devices defined in one description file.
+
+    The file is parsed once and each model is populated from its own device
+    definition. For fgo exports the model names are the exported device names, for
+    the other files the devices registered in the TANGO DB for each device class
+    are used, as with :func:`configure_device_models`.
+
+    Parameters
+    ----------
+    sim_data_file : str
+        A direct path to the xmi/json/fgo file.
+    device_names : list
+        Only configure the models of these devices, by default all of them.
+
+    Returns
+    -------
+    models : dict
+        Device class name -> {device name: model.Model instance}
+
+    """
+    return _configure_multi_device_models_from_parsers(
+        get_device_parsers(sim_data_file), sim_data_file, device_names, logger
+    )
+
+
+def _configure_multi_device_models_from_parsers(
+    parsers, sim_data_file, device_names=None, logger=None
+):
+    is_fgo_file = os.path.splitext(sim_data_file)[-1].lower() == ".fgo"
+    if device_names is not None and is_fgo_file:
+        unknown_devices = set(device_names).difference(parsers)
+        if unknown_devices:
+            raise ValueError(
+                "Devices {} are not defined in {}.".format(
+                    sorted(unknown_devices), sim_data_file
+                )
+            )
+    models = {}
+    for key, parser in parsers.items():
+        if is_fgo_file:
+            if device_names is not None and key not in device_names:
+                continue
+            model = Model(key, logger=logger)
+            _populate_device_model(model, [parser])
+            class_models = {key: model}
+        else:
+            class_models = _configure_device_models_from_parsers(
+                [parser], key, logger=logger
+            )
+            if device_names is not None:
+                class_models = {
+                    name: model
+                    for name, model in class_models.items()
+                    if name in device_names
+                }
+        if class_models:
+            models.setdefault(parser.device_class_name, {}).update(class_models)
+    return models
+
+
 def configure_device_model(sim_data_file=None, test_device_name=None, logger=None):
     models = configure_device_models(sim_data_file, test_device_name, logger)
     if len(models) == 1:
@@ -513,6 +950,10 @@ def configure_device_models(sim_data_file=None, test_device_name=None, logger=No
     take the attribute and command information, populate the model(s) quantities and
     actions to be simulated and return that model.
 
+    A single fgo or xmi file may define several devices or device classes, in which
+    case the models of all of them are returned, see
+    :func:`configure_device_models_by_class`.
+
     Parameters
     ----------
     sim_datafile : list
@@ -527,8 +968,113 @@ def configure_device_models(sim_data_file=None, test_device_name=None, logger=No
         A dictionary of model.Model instances
 
     """
-    data_file = sim_data_file
-    klass_name = get_device_class(data_file)
+    models = {}
+    for class_models in configure_device_models_by_class(
+        sim_data_file, test_device_name, logger
+    ).values():
+        models.update(class_models)
+    return models
+
+
+def configure_device_models_by_class(sim_data_file, test_device_name=None, logger=None):
+    """Configure the device models of every device class of a device server.
+
+    A single fgo or xmi file that defines several devices or device classes is parsed
+    once and each model is populated from its own device definition, see
+    :func:`configure_multi_device_models`. Otherwise the files describe a single
+    device class, as for :func:`configure_device_models`.
+
+    Parameters
+    ----------
+    sim_data_file : list
+        A list of direct paths to either xmi/json/fgo files.
+    test_device_name : str
+        A TANGO device name, for tests. Only the first device or device class of a
+        multi-device file is then configured.
+
+    Returns
+    -------
+    models : dict
+        Device class name -> {device name: model.Model instance}
+
+    """
+    if _is_multi_device_file(sim_data_file):
+        device_parsers = get_device_parsers(sim_data_file[0])
+        if len(device_parsers) > 1 and test_device_name is None:
+            return _configure_multi_device_models_from_parsers(
+                device_parsers, sim_data_file[0], logger=logger
+            )
+        parsers = list(device_parsers.values())[:1]
+    else:
+        # In case there are more than one data description files to be used to
+        # configure the device.
+        parsers = [get_parser_instance(file_name) for file_name in sim_data_file]
+    klass_name = _get_device_class_from_parsers(sim_data_file, parsers)
+    return {
+        klass_name: _configure_device_models_from_parsers(
+            parsers, klass_name, test_device_name, logger
+        )
+    }
+
+
+def get_tango_device_servers(sim_data_files, logger=None):
+    """Configure the device models and declare the TANGO classes of a device server.
+
+    Parameters
+    ----------
+    sim_data_files : list
+        A list of direct paths to either xmi/json/fgo files.
+
+    Returns
+    -------
+    tango_classes : list
+        The TANGO device class and simulator controller class of every device class
+        of the server, see :func:`configure_device_models_by_class` and
+        :func:`get_tango_device_server`.
+
+    """
+    tango_classes = []
+    for klass_name, models in configure_device_models_by_class(
+        sim_data_files, logger=logger
+    ).items():
+        tango_classes.extend(
+            get_tango_device_server(models, sim_data_files, device_class_name=klass_name)
+        )
+    return tango_classes
+
+
+def configure_device_models_from_definition(
+    sim_definition, test_device_name=None, logger=None
+):
+    """Configure the device model(s) from a precompiled simulator definition.
+
+    This does the same as :func:`configure_device_models`, but the data is taken from
+    a simulator definition (see :func:`get_sim_definition`), so no simulator
+    description file is read, parsed or validated.
+
+    Parameters
+    ----------
+    sim_definition : dict
+        Simulator definition as returned by :func:`get_sim_definition`.
+    test_device_name : str
+        A TANGO device name. This is used for running tests as we want the model
+        instance and the device name to have the same name.
+
+    Returns
+    -------
+    models : dict
+        A dictionary of model.Model instances
+
+    """
+    parsers = precompiled_parser.get_parser_instances(sim_definition)
+    return _configure_device_models_from_parsers(
+        parsers, sim_definition["class_name"], test_device_name, logger
+    )
+
+
+def _configure_device_models_from_parsers(
+    parsers, klass_name, test_device_name=None, logger=None
+):
     dev_names = None
     if test_device_name is None:
         server_name = helper_module.get_server_name()
@@ -546,12 +1092,6 @@ def configure_device_models(sim_data_file=None, test_device_name=None, logger=No
     else:
         dev_name = test_device_name
 
-    # In case there are more than one data description files to be used to configure the
-    # device.
-    parsers = []
-    for file_name in data_file:
-        parsers.append(get_parser_instance(file_name))
-
     # In case there is more than one device instance per class.
     models = {}
     if dev_names:
@@ -560,24 +1100,91 @@ def configure_device_models(sim_data_file=None, test_device_name=None, logger=No
     else:
         models[dev_name] = Model(dev_name, logger=logger)
 
-    # In case there is more than one parser instance for each file
     for model in models.values():
-        command_info = {}
-        properties_info = {}
-        override_info = {}
-        for parser in parsers:
+        _populate_device_model(model, parsers)
+    return models
+
+
+def _populate_device_model(model, parsers):
+    # In case there is more than one parser instance for each file
+    command_info = {}
+    properties_info = {}
+    override_info = {}
+    fault_info = {}
+    for parser in parsers:
+        with startup_timer.phase("populate_model_quantities"):
             PopulateModelQuantities(parser, model.name, model)
-            command_info.update(parser.get_device_command_metadata())
-            properties_info.update(
-                parser.get_device_properties_metadata("deviceProperties")
-            )
-            override_info.update(parser.get_device_cmd_override_metadata())
+        command_info.update(parser.get_device_command_metadata())
+        properties_info.update(parser.get_device_properties_metadata("deviceProperties"))
+        override_info.update(parser.get_device_cmd_override_metadata())
+        fault_info.update(parser.get_device_fault_injection_metadata())
+    with startup_timer.phase("populate_model_actions"):
         PopulateModelActions(command_info, override_info, model.name, model)
+    with startup_timer.phase("populate_model_properties"):
         PopulateModelProperties(properties_info, model.name, model)
-    return models
+    model.fault_injector.set_faults(fault_info)
+
+
+def reload_device_model(model, sim_data_files, device_class_name=None):
+    """Re-parse the simulator description files and apply the changes to a model.
+
+    Parameters
+    ----------
+    model : model.Model instance
+        The model of a running device.
+    sim_data_files : list
+        A list of direct paths to either xmi/json/fgo files.
+    device_class_name : str
+        TANGO device class name of the device. The definition of the device in a
+        multi-device fgo file is found by the model name, in a xmi file with several
+        device classes by this name.
+
+    Returns
+    -------
+    changes : dict
+        As returned by :meth:`model.Model.update_from_model`.
+
+    """
+    if _is_multi_device_file(sim_data_files):
+        device_parsers = get_device_parsers(sim_data_files[0])
+        parser = device_parsers.get(model.name, device_parsers.get(device_class_name))
+        if parser is None:
+            parser = list(device_parsers.values())[0]
+        parsers = [parser]
+    else:
+        parsers = [get_parser_instance(file_name) for file_name in sim_data_files]
+    # A separate name keeps the running model in the model registry.
+    new_model = Model(
+        "{}.reload".format(model.name),
+        start_time=model.start_time,
+        time_func=model.time_func,
+        logger=model.logger,
+    )
+    _populate_device_model(new_model, parsers)
+    return model.update_from_model(new_model)
+
+
+def get_sim_definition(sim_data_files):
+    """Parse the simulator description files into a precompiled simulator definition.
+
+    Parameters
+    ----------
+    sim_data_files: list
+        A list of direct paths to either xmi/fgo/json data files.
+
+    Returns
+    -------
+    sim_definition : dict
+        The parsed data of all the files and the device class name, as plain data
+        that can be written out as a Python literal.
 
+    """
+    parsers = [get_parser_instance(file_name) for file_name in sim_data_files]
+    klass_name = _get_device_class_from_parsers(sim_data_files, parsers)
+    return precompiled_parser.get_sim_definition(parsers, klass_name)
 
-def generate_device_server(server_name, sim_data_files, directory=""):
+
+def generate_device_server(server_name, sim_data_files, directory="", static=False):
     """Create a tango device server python file.
 
     Parameters
@@ -586,28 +1193,72 @@ def generate_device_server(server_name, sim_data_files, directory=""):
         Tango device server name
     sim_data_files: list
         A list of direct paths to either xmi/fgo/json data files.
+    static: bool
+        If True the data files are parsed now and the simulator definition is written
+        into the generated file. The device server then starts up without parsing the
+        data files and with all its attributes and commands declared statically.
 
     """
-    lines = [
+    if static:
+        lines = _get_static_device_server_lines(sim_data_files)
+    else:
+        lines = _get_device_server_import_lines("get_tango_device_servers") + [
+            "\n\n# File generated on {} by tango-simlib-generator".format(time.ctime()),
+            "\n\ndef main():",
+            "    sim_data_files = {}".format(sim_data_files),
+            "    TangoDeviceServers = get_tango_device_servers(sim_data_files)",
+            "    server_run(",
+            "        TangoDeviceServers, post_init_callback=startup_timer.log_report",
+            "    )",
+            '\nif __name__ == "__main__":',
+            "    main()\n",
+        ]
+    with open(os.path.join(directory, "%s" % server_name), "w") as dserver:
+        dserver.write("\n".join(lines))
+    # Make the script executable
+    os.chmod(os.path.join(directory, "%s" % server_name), 477)
+
+
+def _get_device_server_import_lines(generator_names):
+    # The start-up timer of the device server is started before anything is imported.
+    return [
         "#!/usr/bin/env python",
+        "import time",
+        "",
+        "START_TIME = time.time()",
+        "",
         "from tango.server import server_run",
-        (
-            "from tango_simlib.tango_sim_generator import ("
-            "configure_device_models, get_tango_device_server)"
-        ),
+        "from tango_simlib.tango_sim_generator import ({})".format(generator_names),
+        "from tango_simlib.utilities.startup_timing import startup_timer",
+        "",
+        "startup_timer.reset(START_TIME)",
+        'startup_timer.add_phase("imports", time.time() - START_TIME)',
+    ]
+
+
+def _get_static_device_server_lines(sim_data_files):
+    sim_definition = get_sim_definition(sim_data_files)
+    return _get_device_server_import_lines(
+        "configure_device_models_from_definition, get_tango_device_server"
+    ) + [
         "\n\n# File generated on {} by tango-simlib-generator".format(time.ctime()),
+        "# Simulator definition parsed from the simulator description data files.",
+        "\nSIM_DATA_FILES = {}".format(sim_data_files),
+        "\nSIM_DEFINITION = {}".format(pprint.pformat(sim_definition)),
         "\n\ndef main():",
-        "    sim_data_files = {}".format(sim_data_files),
-        "    models = configure_device_models(sim_data_files)",
-        "    TangoDeviceServers = get_tango_device_server(models, sim_data_files)",
-        "    server_run(TangoDeviceServers)",
+        "    models = configure_device_models_from_definition(SIM_DEFINITION)",
+        "    TangoDeviceServers = get_tango_device_server(",
+        "        models,",
+        "        SIM_DATA_FILES,",
+        '        device_class_name=SIM_DEFINITION["class_name"],',
+        "        static_interface=True,",
+        "    )",
+        "    server_run(",
+        "        TangoDeviceServers, post_init_callback=startup_timer.log_report",
+        "    )",
         '\nif __name__ == "__main__":',
         "    main()\n",
     ]
-    with open(os.path.join(directory, "%s" % server_name), "w") as dserver:
-        dserver.write("\n".join(lines))
-    # Make the script executable
-    os.chmod(os.path.join(directory, "%s" % server_name), 477)
 
 
 def get_device_class(sim_data_files):
@@ -627,18 +1278,37 @@ def get_device_class(sim_data_files):
     if len(sim_data_files) < 1:
         raise Exception("No simulator data file specified.")
 
-    parser_instance = None
-    klass_name = ""
-    precedence_map = {".xmi": 1, ".fgo": 2, ".json": 3}
+    sorted_files = sorted(sim_data_files, key=_get_class_name_precedence)
+    parser_instance = get_parser_instance(sorted_files[0])
+    return _get_device_class_name(parser_instance)
 
-    def get_precedence(file_name):
-        extension = os.path.splitext(file_name)[-1]
-        extension = extension.lower()
-        return precedence_map.get(extension, 100)
 
-    sorted_files = sorted(sim_data_files, key=get_precedence)
-    parser_instance = get_parser_instance(sorted_files[0])
+def _get_device_class_from_parsers(sim_data_files, parser_instances):
+    """Get the device class name from already parsed description files."""
+    if len(sim_data_files) < 1:
+        raise Exception("No simulator data file specified.")
 
+    sorted_parsers = sorted(
+        zip(sim_data_files, parser_instances),
+        key=lambda file_parser: _get_class_name_precedence(file_parser[0]),
+    )
+    return _get_device_class_name(sorted_parsers[0][1])
+
+
+def _get_class_name_precedence(file_name):
+    # The class name of a compiled definition was already resolved when compiling.
+    precedence_map = {
+        precompiled_parser.COMPILED_FILE_EXTENSION: 0,
+        ".xmi": 1,
+        ".fgo": 2,
+        ".json": 3,
+    }
+    extension = os.path.splitext(file_name)[-1]
+    extension = extension.lower()
+    return precedence_map.get(extension, 100)
+
+
+def _get_device_class_name(parser_instance):
     # Since at the current moment the class name of the tango simulator to be
     # generated must be specified in the xmi data file, if no xmi if provided
     # the simulator will be given a default name.
@@ -650,6 +1320,54 @@ def get_device_class(sim_data_files):
     return klass_name
 
 
+def compile_sim_data_files(sim_data_files, output_file_name):
+    """Compile simulator description files to a single binary definition file.
+
+    The generated device servers load the compiled file like any other simulator
+    description file.
+
+    Parameters
+    ----------
+    sim_data_files : list
+        A list of direct paths to either xmi/json/fgo files.
+    output_file_name : str
+        Name of the compiled file, the '.simdef' extension is added if missing.
+
+    Returns
+    -------
+    output_file_name : str
+        Name of the compiled file.
+
+    """
+    if not output_file_name.lower().endswith(precompiled_parser.COMPILED_FILE_EXTENSION):
+        output_file_name += precompiled_parser.COMPILED_FILE_EXTENSION
+    parsers = [get_parser_instance(file_name) for file_name in sim_data_files]
+    klass_name = _get_device_class_from_parsers(sim_data_files, parsers)
+    sim_definition = precompiled_parser.get_compiled_sim_definition(parsers, klass_name)
+    precompiled_parser.write_compiled_sim_definition(sim_definition, output_file_name)
+    return output_file_name
+
+
+def get_compile_argparser():
+    parser = argparse.ArgumentParser(
+        prog="tango-simlib-generator compile",
+        description="Compile simulator description data file(s) to a single binary "
+        "definition file, that can be used in their place.",
+    )
+    parser.add_argument(
+        "--sim-data-file",
+        action="append",
+        required=True,
+        help="Simulator description data files(s) i.e. can specify multiple files",
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Name of the compiled definition file ('.simdef' is added if missing)",
+    )
+    return parser
+
+
 def get_argparser():
     parser = argparse.ArgumentParser(
         description="Generate a tango data driven simulator, handling"
@@ -663,14 +1381,30 @@ def get_argparser():
     )
     required_argument("--directory", help="TANGO server executable path", default="")
     required_argument("--dserver-name", help="TANGO server executable command")
+    parser.add_argument(
+        "--static",
+        action="store_true",
+        help="Parse the data file(s) now and generate a device server with all its "
+        "attributes and commands declared statically, for a faster start-up",
+    )
     return parser
 
 
 def main():
+    # The `compile` sub-command is checked for separately, to keep the command line
+    # of the generator itself unchanged.
+    if sys.argv[1:2] == ["compile"]:
+        opts = get_compile_argparser().parse_args(sys.argv[2:])
+        output_file_name = compile_sim_data_files(opts.sim_data_file, opts.output)
+        print("Compiled simulator definition written to {}".format(output_file_name))
+        return
     arg_parser = get_argparser()
     opts = arg_parser.parse_args()
     generate_device_server(
-        opts.dserver_name, opts.sim_data_file, directory=opts.directory
+        opts.dserver_name,
+        opts.sim_data_file,
+        directory=opts.directory,
+        static=opts.static,
     )
 
 
@@ -31,6 +31,10 @@ class TangoToYAML:
 
     def _build_yaml(self):
         """Build YAML from the parser"""
+        return yaml.dump(self._build_data(), sort_keys=False)
+
+    def _build_data(self):
+        """Build the normalized data that is translated to YAML from the parser"""
         data_dict = [
             {
                 "class": self.parser.device_class_name,
@@ -94,7 +98,7 @@ class TangoToYAML:
         prop_values = sorted(prop_values, key=lambda x: x["name"])
         for prop in prop_values:
             data_dict[0]["meta"]["properties"].append({"name": prop["name"]})
-        return yaml.dump(data_dict, sort_keys=False)
+        return data_dict
 
     def build_yaml_from_file(self, file_loc):
         """Builds YAML from a Tango specification file
@@ -126,3 +130,32 @@ class TangoToYAML:
         """
         self.parser.parse(device_name)
         return self._build_yaml()
+
+    def build_data_from_device(self, device_name):
+        """Interrogates a running Tango device and builds the data that would be
+           translated to YAML, without the serialization.
+
+        Parameters
+        ----------
+        device_name : str
+            Tango device name in the domain/family/member format or the
+            FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member
+
+        Returns
+        -------
+        dict
+            The class and the sorted commands, attributes and properties of the device
+        """
+        self.parser.parse(device_name)
+        return self.build_data()
+
+    def build_data(self):
+        """Builds the data that would be translated to YAML from what the parser
+           parsed last, without parsing again.
+
+        Returns
+        -------
+        dict
+            The class and the sorted commands, attributes and properties
+        """
+        return self._build_data()[0]
@@ -8,20 +8,16 @@
 from __future__ import absolute_import, division, print_function
 
 import argparse
+import json
 import sys
 
-from tango_simlib.tango_yaml_tools.base import TangoToYAML
-from tango_simlib.utilities.fandango_json_parser import FandangoExportDeviceParser as FP
-from tango_simlib.utilities.sim_xmi_parser import XmiParser
-from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
-from tango_simlib.utilities.validate_device import (
-    validate_device_from_path,
-    validate_device_from_url,
-)
+# NOTE: The parsers and the validation module are imported by the sub-command that
+# needs them, since importing tango, requests, etc. dominates the run time of a
+# single invocation of the script.
 
 
 def _validate_device(args):
-    """Validate the conformance of a Tango device against a YAML specification
+    """Validate the conformance of Tango devices against YAML specifications
 
     Parameters
     ----------
@@ -33,24 +29,152 @@ def _validate_device(args):
     tuple
         (The result string, the exit code)
     """
-    result = ""
-    if args.url:
-        result = validate_device_from_url(
-            args.tango_device_name, args.url, args.bidirectional
+    from tango_simlib.utilities.validate_device import (
+        expand_device_names,
+        validate_device_from_path,
+        validate_device_from_url,
+        validate_devices,
+    )
+
+    tango_device_names = args.tango_device_names
+    sources = args.path if args.path else args.url
+    fetcher = _get_specification_fetcher(args)
+    if (
+        not args.json
+        and len(tango_device_names) == 1
+        and len(sources) == 1
+        and not args.binary_report
+        and "*" not in tango_device_names[0]
+        and "*" not in sources[0]
+    ):
+        tango_device_name, source = tango_device_names[0], sources[0]
+        if args.url:
+            result = validate_device_from_url(
+                tango_device_name, source, args.bidirectional, fetcher
+            )
+        else:
+            result = validate_device_from_path(
+                tango_device_name, source, args.bidirectional
+            )
+
+        if result:
+            return (result, 1)
+
+        result = "No differences between device {} and specification {}".format(
+            tango_device_name, source
         )
-    else:
-        result = validate_device_from_path(
-            args.tango_device_name, args.path, args.bidirectional
+        return (result, 0)
+
+    results = validate_devices(
+        expand_device_names(tango_device_names),
+        _read_specifications(args, fetcher),
+        args.bidirectional,
+        max_workers=args.workers,
+    )
+    summary = {"devices": len(results), "passed": 0, "failed": 0, "error": 0}
+    for result in results:
+        summary[result["status"]] += 1
+    exit_code = 0 if summary["passed"] == summary["devices"] else 1
+
+    report = {"bidirectional": args.bidirectional, "summary": summary, "devices": results}
+    if args.binary_report:
+        from tango_simlib.utilities.specification_diff import dump_binary
+
+        with open(args.binary_report, "wb") as report_file:
+            report_file.write(dump_binary(report))
+    if args.json:
+        return (json.dumps(report, indent=2, sort_keys=True), exit_code)
+
+    lines = []
+    for result in results:
+        if result["status"] == "passed":
+            lines.append(
+                "No differences between device {} and specification {}".format(
+                    result["device"], result["specification"]
+                )
+            )
+        elif result["status"] == "failed":
+            lines.append(
+                "Device {} differs from specification {}:".format(
+                    result["device"], result["specification"]
+                )
+            )
+            lines.extend(result["differences"])
+        else:
+            lines.append(
+                "Device {} could not be validated: {}".format(
+                    result["device"], result["error"]
+                )
+            )
+    lines.append(
+        "{devices} devices: {passed} passed, {failed} failed, {error} errors".format(
+            **summary
         )
+    )
+    return ("\n".join(lines), exit_code)
 
-    if result:
-        return (result, 1)
 
-    source = args.path if args.path else args.url
-    result = "No differences between device {} and specification {}".format(
-        args.tango_device_name, source
+def _watch_devices(args):
+    """Report the changes in conformance of Tango devices to YAML specifications as
+    they happen, until interrupted
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed arguments
+    """
+    from tango_simlib.utilities.conformance_watch import ConformanceWatcher, format_event
+    from tango_simlib.utilities.validate_device import expand_device_names
+
+    watcher = ConformanceWatcher(
+        expand_device_names(args.tango_device_names),
+        _read_specifications(args, _get_specification_fetcher(args)),
+        args.bidirectional,
+        max_workers=args.workers,
+    )
+
+    def report(event):
+        if args.json:
+            print(json.dumps(event, sort_keys=True))
+        else:
+            print("\n".join(format_event(event)))
+        sys.stdout.flush()
+
+    try:
+        watcher.watch(report, interval=args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def _get_specification_fetcher(args):
+    """The fetcher of the specifications given by URL, None for the shared one"""
+    if not (args.no_cache or args.cache_dir):
+        return None
+    from tango_simlib.utilities.specification_fetcher import SpecificationFetcher
+
+    return SpecificationFetcher(cache_dir=None if args.no_cache else args.cache_dir)
+
+
+def _read_specifications(args, fetcher):
+    """Read the specifications given by URL or path
+
+    Returns
+    -------
+    list of tuple
+        (source, specification in YAML format) for each specification
+    """
+    from tango_simlib.utilities.validate_device import (
+        expand_specification_paths,
+        read_specification_from_path,
+        read_specification_from_url,
     )
-    return (result, 0)
+
+    if args.url:
+        return [(url, read_specification_from_url(url, fetcher)) for url in args.url]
+    return [
+        (path, read_specification_from_path(path))
+        for path in expand_specification_paths(args.path)
+    ]
 
 
 def _build_yaml(args):
@@ -66,11 +190,21 @@ def _build_yaml(args):
     str
         The YAML string if a valid option was chosen, otherwise an empty string
     """
+    from tango_simlib.tango_yaml_tools.base import TangoToYAML
+
     if "xmi_file" in args:
+        from tango_simlib.utilities.sim_xmi_parser import XmiParser
+
         return TangoToYAML(XmiParser).build_yaml_from_file(args.xmi_file.name)
     if "fandango_file" in args:
+        from tango_simlib.utilities.fandango_json_parser import (
+            FandangoExportDeviceParser as FP,
+        )
+
         return TangoToYAML(FP).build_yaml_from_file(args.fandango_file.name)
     if "tango_device_name" in args:
+        from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
+
         return TangoToYAML(TangoDeviceParser).build_yaml_from_device(
             args.tango_device_name
         )
@@ -125,23 +259,31 @@ def main():
     )
     validate_parser.set_defaults(choice="validate")
     validate_parser.add_argument(
-        "tango_device_name",
+        "tango_device_names",
+        metavar="tango_device_name",
         type=str,
+        nargs="+",
         help=(
             "Tango device name in the domain/family/member format or the "
-            "FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member"
+            "FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member. "
+            "A * wildcard matches the devices exported in the TANGO database"
         ),
     )
     source_group = validate_parser.add_mutually_exclusive_group(required=True)
     source_group.add_argument(
         "--url",
         type=str,
-        help="The URL to a YAML specification file",
+        action="append",
+        help="The URL to a YAML specification file, may be repeated",
     )
     source_group.add_argument(
         "--path",
         type=str,
-        help="The file path to a YAML specification file",
+        action="append",
+        help=(
+            "The file path to a YAML specification file, or a glob pattern, "
+            "may be repeated"
+        ),
     )
 
     validate_parser.add_argument(
@@ -152,9 +294,67 @@ def main():
             "device that is not in the spec is also listed."
         ),
     )
+    validate_parser.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help=(
+            "The maximum number of devices interrogated at the same time "
+            "[default: %(default)s]"
+        ),
+    )
+    cache_group = validate_parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--cache-dir",
+        type=str,
+        help=(
+            "The directory where the specifications downloaded from URLs are cached "
+            "[default: ~/.cache/tango_simlib/specifications]"
+        ),
+    )
+    cache_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not cache the specifications downloaded from URLs",
+    )
+    validate_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Report the result of every device in JSON format",
+    )
+    validate_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "Keep checking the devices, and report the changes in their conformance "
+            "as they happen, until interrupted"
+        ),
+    )
+    validate_parser.add_argument(
+        "--interval",
+        type=float,
+        default=60.0,
+        help=(
+            "The seconds between the checks with --watch, which is the longest a "
+            "change in a device goes unreported [default: %(default)s]"
+        ),
+    )
+    validate_parser.add_argument(
+        "--binary-report",
+        type=str,
+        metavar="FILE",
+        help=(
+            "Also write the report of every device to a file in a compact binary "
+            "format, see tango_simlib.utilities.specification_diff.load_binary"
+        ),
+    )
 
     args = parser.parse_args()
 
+    if args.choice == "validate" and args.watch:
+        _watch_devices(args)
+        return
+
     if args.choice == "validate":
         result, exit_code = _validate_device(args)
         print(result)
@@ -0,0 +1,136 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from tango_simlib import tango_sim_generator
+from tango_simlib.benchmarks import runner, synthetic
+from tango_simlib.utilities.fandango_json_parser import FandangoExportDeviceParser
+from tango_simlib.utilities.sim_xmi_parser import XmiParser
+from tango_simlib.utilities.simdd_json_parser import SimddParser
+
+
+class test_BenchmarkRunner(unittest.TestCase):
+    def test_time_function(self):
+        """Test that a measurement lasts at least the minimum time"""
+        calls = []
+        timing = runner.time_function(lambda: calls.append(1), repeat=3, min_time=0.01)
+        self.assertEqual(len(timing["times"]), 3)
+        self.assertGreater(timing["number"], 1)
+        self.assertGreaterEqual(len(calls), 3 * timing["number"])
+        self.assertEqual(timing["min"], timing["times"][0])
+        self.assertEqual(timing["median"], timing["times"][1])
+
+    def test_run_benchmarks(self):
+        """Test running some benchmarks, which are all registered"""
+        self.assertIn("model.update", runner.load_benchmarks())
+        results = runner.run_benchmarks("model.update", repeat=1, min_time=0.001)
+        self.assertEqual(
+            [(result["name"], result["param"]) for result in results],
+            [("model.update", 10), ("model.update", 100), ("model.update", 1000)],
+        )
+        self.assertTrue(all(result["min"] > 0 for result in results))
+
+    def test_save_and_compare_results(self):
+        """Test that saved results can be compared with new ones"""
+        results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, results_dir)
+        file_name = runner.get_results_file_name(results_dir, "0.8.0+dev.1/abc")
+        self.assertEqual(os.path.basename(file_name), "0.8.0+dev.1_abc.json")
+        baseline = [
+            {"name": "model.update", "param": 10, "min": 1.0},
+            {"name": "model.update", "param": 100, "min": 2.0},
+            {"name": "parsers.XmiParser", "param": "Weather.xmi", "error": "Failed"},
+        ]
+        runner.save_results(baseline, file_name)
+        results = [
+            {"name": "model.update", "param": 10, "min": 1.05},
+            {"name": "model.update", "param": 100, "min": 3.0},
+            {"name": "parsers.XmiParser", "param": "Weather.xmi", "min": 1.0},
+        ]
+        self.assertEqual(
+            runner.compare_results(runner.load_results(file_name), results, 0.1),
+            [
+                ("model.update(10)", 1.0, 1.05, 1.05, False),
+                ("model.update(100)", 2.0, 3.0, 1.5, True),
+            ],
+        )
+
+
+class test_SyntheticFiles(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_synthetic_files(self):
+        """Test that the synthetic files are parsed into the requested interface"""
+        for file_format, parser_class in (
+            ("xmi", XmiParser),
+            ("json", SimddParser),
+            ("fgo", FandangoExportDeviceParser),
+        ):
+            (file_name,) = synthetic.write_sim_data_files(
+                self.output_dir, file_format, 12, 4, num_enum_labels=3, spectrum_size=5
+            )
+            parser = parser_class()
+            parser.parse(file_name)
+            attributes = parser.get_device_attribute_metadata()
+            self.assertEqual(len(attributes), 12, file_format)
+            self.assertEqual(len(parser.get_device_command_metadata()), 4, file_format)
+            self.assertEqual(int(attributes["spectrum3"]["max_dim_x"]), 5, file_format)
+            if file_format != "json":
+                self.assertEqual(
+                    attributes["enum2"]["enum_labels"],
+                    ["LABEL0", "LABEL1", "LABEL2"],
+                    file_format,
+                )
+            models = tango_sim_generator.configure_device_models(
+                [file_name], "test/synthetic/" + file_format
+            )
+            sim_model = list(models.values())[0]
+            self.assertEqual(len(sim_model.sim_quantities), 12, file_format)
+            self.assertEqual(len(sim_model.sim_actions), 4, file_format)
+
+    def test_several_devices(self):
+        """Test describing several devices"""
+        (xmi_file,) = synthetic.write_sim_data_files(
+            self.output_dir, "xmi", 5, num_devices=3
+        )
+        self.assertEqual(
+            list(XmiParser.parse_classes(xmi_file)),
+            ["SyntheticDevice1", "SyntheticDevice2", "SyntheticDevice3"],
+        )
+        (fgo_file,) = synthetic.write_sim_data_files(
+            self.output_dir, "fgo", 5, num_devices=2
+        )
+        self.assertEqual(
+            list(FandangoExportDeviceParser.parse_devices(fgo_file)),
+            ["synthetic/syntheticdevice/1", "synthetic/syntheticdevice/2"],
+        )
+        self.assertEqual(
+            len(
+                synthetic.write_sim_data_files(self.output_dir, "json", 5, num_devices=2)
+            ),
+            2,
+        )
+
+    def test_benchmark_files(self):
+        """Test getting the bundled and synthetic benchmark files"""
+        self.assertTrue(
+            os.path.isfile(synthetic.get_benchmark_file("DishElementMaster.xmi"))
+        )
+        file_name = synthetic.get_benchmark_file("synthetic.fgo*20")
+        self.assertEqual(synthetic.get_benchmark_file("synthetic.fgo*20"), file_name)
+        parser = FandangoExportDeviceParser()
+        parser.parse(file_name)
+        self.assertEqual(len(parser.get_device_attribute_metadata()), 20)
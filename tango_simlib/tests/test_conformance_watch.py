@@ -0,0 +1,185 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import unittest
+
+from collections import Counter
+
+import tango
+import yaml
+
+from builtins import object
+from mock import Mock, patch
+
+from tango_simlib.tango_yaml_tools.base import TangoToYAML
+from tango_simlib.utilities import conformance_watch
+from tango_simlib.utilities.specification_diff import CHANGED, MISSING, Difference
+from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
+
+
+class FakeDeviceProxy(object):
+    """Device proxy of a running Weather device, counting the queries made to it."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.attribute_names = ["temperature"]
+        self.description = "The temperature"
+        self.error = None
+
+    def _query(self, name):
+        if self.error:
+            raise self.error
+        self.queries[name] += 1
+
+    def info(self):
+        self._query("info")
+        return Mock(dev_class="Weather")
+
+    def attribute_list_query_ex(self):
+        self._query("attribute_list_query_ex")
+        attrs = []
+        for name in self.attribute_names:
+            attr = tango.AttributeInfoEx()
+            attr.name = name
+            attr.data_format = tango.AttrDataFormat.SCALAR
+            attr.data_type = int(tango.CmdArgType.DevDouble)
+            attr.description = self.description
+            attr.disp_level = tango.DispLevel.OPERATOR
+            attrs.append(attr)
+        return attrs
+
+    def get_command_config(self):
+        self._query("get_command_config")
+        command = Mock(
+            cmd_name="Reset",
+            in_type=tango.CmdArgType.DevVoid,
+            out_type=tango.CmdArgType.DevVoid,
+            in_type_desc="Uninitialised",
+            out_type_desc="Uninitialised",
+            disp_level=tango.DispLevel.OPERATOR,
+        )
+        return [command]
+
+    def get_property_list(self, _):
+        self._query("get_property_list")
+        return ["Location"]
+
+
+class test_ConformanceWatcher(unittest.TestCase):
+    def setUp(self):
+        self.device_proxy = FakeDeviceProxy()
+        patcher = patch("tango.DeviceProxy", return_value=self.device_proxy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The specification is the interface of the device when it is first seen.
+        specification_yaml = yaml.dump(
+            [TangoToYAML(TangoDeviceParser).build_data_from_device("weather/sim/1")]
+        )
+        self.device_proxy.queries.clear()
+        patcher = patch.object(
+            TangoToYAML, "build_data", autospec=True, side_effect=TangoToYAML.build_data
+        )
+        self.build_data_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.watcher = conformance_watch.ConformanceWatcher(
+            ["weather/sim/1"],
+            [("weather.yaml", specification_yaml)],
+            False,
+        )
+
+    def test_unchanged_devices(self):
+        """Test that an unchanged device is reported once, and cheaply queried"""
+        events = self.watcher.poll()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["status"], "passed")
+        self.assertEqual(events[0]["new"], [])
+        self.assertIsNone(events[0]["groups"])
+        self.assertEqual(sum(self.device_proxy.queries.values()), 4)
+        self.assertEqual(self.build_data_mock.call_count, 1)
+
+        for _ in range(3):
+            self.device_proxy.queries.clear()
+            self.assertEqual(self.watcher.poll(), [])
+            self.assertEqual(
+                self.device_proxy.queries,
+                Counter(
+                    attribute_list_query_ex=1,
+                    get_command_config=1,
+                    get_property_list=1,
+                ),
+            )
+        self.assertEqual(self.build_data_mock.call_count, 1)
+
+    def test_attribute_renamed(self):
+        """Test that a change of the attribute names is reported at the next poll"""
+        self.watcher.poll()
+        self.device_proxy.attribute_names = ["air_temperature"]
+        (event,) = self.watcher.poll()
+        self.assertEqual(event["status"], "failed")
+        self.assertEqual(event["groups"], ["attributes"])
+        self.assertEqual(
+            event["new"],
+            [Difference(MISSING, "attribute", "temperature", None, None, None).to_dict()],
+        )
+
+    def test_drift(self):
+        """Test that a change of configuration is reported at the next poll"""
+        self.watcher.poll()
+        self.device_proxy.description = "The air temperature"
+        (event,) = self.watcher.poll()
+        self.assertEqual(event["status"], "failed")
+        self.assertEqual(event["groups"], ["attributes"])
+        change = Difference(
+            CHANGED,
+            "attribute",
+            "temperature",
+            "description",
+            "The temperature",
+            "The air temperature",
+        )
+        self.assertEqual(event["new"], [change.to_dict()])
+        self.assertEqual(event["resolved"], [])
+        lines = conformance_watch.format_event(event)
+        self.assertTrue(
+            lines[0].endswith(
+                "Device weather/sim/1 differs from specification weather.yaml:"
+            )
+        )
+        self.assertEqual(lines[1:], ["Attribute [temperature] differs:", lines[2]])
+
+        self.device_proxy.description = "The temperature"
+        (event,) = self.watcher.poll()
+        self.assertEqual(event["status"], "passed")
+        self.assertEqual(event["new"], [])
+        self.assertEqual(event["resolved"], [change.to_dict()])
+
+    def test_lost_device(self):
+        """Test that a device that fails is reported once, and interrogated again"""
+        self.watcher.poll()
+        self.device_proxy.error = tango.CommunicationFailed()
+        (event,) = self.watcher.poll()
+        self.assertEqual(event["status"], "error")
+        self.assertIn("could not be validated", conformance_watch.format_event(event)[0])
+        self.assertEqual(self.watcher.poll(), [])
+
+        self.device_proxy.error = None
+        self.device_proxy.queries.clear()
+        (event,) = self.watcher.poll()
+        self.assertEqual(event["status"], "passed")
+        self.assertEqual(self.device_proxy.queries["info"], 1)
+
+    def test_watch(self):
+        """Test that the events are reported as the devices are polled"""
+        events = []
+        with patch("tango_simlib.utilities.conformance_watch.time.sleep") as sleep:
+            self.watcher.watch(events.append, interval=10, iterations=3)
+        self.assertEqual([event["status"] for event in events], ["passed"])
+        self.assertEqual(sleep.call_count, 2)
+        self.assertLessEqual(sleep.call_args[0][0], 10)
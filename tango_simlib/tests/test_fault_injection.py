@@ -0,0 +1,211 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+from future.utils import itervalues
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import pkg_resources
+
+from mock import Mock
+from tango import DevFailed, DeviceProxy
+
+from tango_simlib import tango_sim_generator
+from tango_simlib.fault_injection import FaultInjector
+from tango_simlib.utilities import testutils
+
+
+class test_FaultInjector(unittest.TestCase):
+    def setUp(self):
+        self.sleep = Mock()
+        self.fault_injector = FaultInjector(random.Random(1), sleep=self.sleep)
+
+    def test_no_faults(self):
+        """Test that requests without fault settings are not changed or counted"""
+        self.fault_injector.inject("temperature")
+        self.sleep.assert_not_called()
+        self.assertEqual(self.fault_injector.get_stats(), {})
+
+    def test_latency(self):
+        """Test that the requests are delayed"""
+        self.fault_injector.set_faults(
+            {
+                "temperature": {"latency": {"distribution": "constant", "value": 0.5}},
+                "Reset": {"latency": {"distribution": "uniform", "min": 1, "max": 2}},
+            }
+        )
+        for _ in range(3):
+            self.fault_injector.inject("temperature")
+        self.fault_injector.inject("Reset")
+        delays = [call[0][0] for call in self.sleep.call_args_list]
+        self.assertEqual(delays[:3], [0.5, 0.5, 0.5])
+        self.assertTrue(1 <= delays[3] <= 2)
+        stats = self.fault_injector.get_stats()
+        self.assertEqual(
+            stats["temperature"],
+            {
+                "requests": 3,
+                "delayed": 3,
+                "total_delay": 1.5,
+                "max_delay": 0.5,
+                "errors": 0,
+            },
+        )
+        self.assertEqual(stats["Reset"]["max_delay"], delays[3])
+
+    def test_errors(self):
+        """Test that errors are injected as DevFailed errors"""
+        self.fault_injector.set_faults(
+            {
+                "temperature": {
+                    "error_rate": 1.0,
+                    "error_reason": "SensorFault",
+                    "error_message": "Sensor is broken",
+                }
+            }
+        )
+        with self.assertRaises(DevFailed) as context:
+            self.fault_injector.inject("temperature")
+        self.assertEqual(context.exception.args[0].reason, "SensorFault")
+        self.assertEqual(context.exception.args[0].desc, "Sensor is broken")
+        self.assertEqual(self.fault_injector.get_stats()["temperature"]["errors"], 1)
+
+    def test_error_rate(self):
+        """Test that about the configured share of the requests fail"""
+        self.fault_injector.set_faults({"temperature": {"error_rate": 0.25}})
+        for _ in range(1000):
+            try:
+                self.fault_injector.inject("temperature")
+            except DevFailed:
+                pass
+        stats = self.fault_injector.get_stats()["temperature"]
+        self.assertEqual(stats["requests"], 1000)
+        self.assertTrue(200 < stats["errors"] < 300, stats)
+
+    def test_remove_faults(self):
+        """Test removing the faults of one request or all of them"""
+        self.fault_injector.set_faults(
+            {"temperature": {"error_rate": 1.0}, "pressure": {"error_rate": 1.0}}
+        )
+        self.fault_injector.set_faults({"temperature": None})
+        self.assertEqual(list(self.fault_injector.faults), ["pressure"])
+        with self.assertRaises(DevFailed):
+            self.fault_injector.inject("pressure")
+        self.fault_injector.clear()
+        self.fault_injector.inject("pressure")
+        self.assertEqual(self.fault_injector.faults, {})
+        self.assertEqual(self.fault_injector.get_stats(), {})
+
+    def test_invalid_settings(self):
+        """Test that invalid settings are rejected without changing any settings"""
+        for fault in (
+            {"error_rate": 2},
+            {"error_rate": "often"},
+            {"latency": {"distribution": "poisson", "mean": 1}},
+            {"latency": {"distribution": "uniform", "min": 1}},
+            {"latency": {"distribution": "exponential", "mean": 0}},
+            {"delay": 1},
+            "slow",
+        ):
+            with self.assertRaises(ValueError):
+                self.fault_injector.set_faults(
+                    {"temperature": {"error_rate": 0.5}, "pressure": fault}
+                )
+        self.assertEqual(self.fault_injector.faults, {})
+
+
+class test_SimddFaultInjection(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        simdd_file = pkg_resources.resource_filename(
+            "tango_simlib.tests.config_files", "Weather_SimDD.json"
+        )
+        with open(simdd_file) as simdd:
+            simdd_data = json.load(simdd)
+        self.faults = {
+            "temperature": {
+                "latency": {"distribution": "gaussian", "mean": 0.2, "std_dev": 0.05},
+                "error_rate": 0.1,
+            },
+            "On": {"error_rate": 1, "error_message": "Power supply failed"},
+        }
+        simdd_data["faultInjection"] = [
+            {"fault": dict(fault, name=name)} for name, fault in self.faults.items()
+        ]
+        self.simdd_file = os.path.join(self.temp_dir, "Weather_SimDD.json")
+        with open(self.simdd_file, "w") as simdd:
+            json.dump(simdd_data, simdd)
+
+    def _get_model(self, sim_data_files):
+        models = tango_sim_generator.configure_device_models(
+            sim_data_files, "test/nodb/faults"
+        )
+        return list(itervalues(models))[0]
+
+    def test_faults_configured_from_simdd(self):
+        """Test that the model faults are configured from the SimDD file"""
+        model = self._get_model([self.simdd_file])
+        self.assertEqual(model.fault_injector.faults, self.faults)
+
+    def test_faults_in_compiled_definition(self):
+        """Test that the faults are kept in a compiled simulator definition"""
+        compiled_file = tango_sim_generator.compile_sim_data_files(
+            [self.simdd_file], os.path.join(self.temp_dir, "Weather")
+        )
+        model = self._get_model([compiled_file])
+        self.assertEqual(model.fault_injector.faults, self.faults)
+
+
+class test_DeviceFaultInjection(unittest.TestCase):
+    def setUp(self):
+        simdd_file = pkg_resources.resource_filename(
+            "tango_simlib.tests.config_files", "Weather_SimDD.json"
+        )
+        self.pooled_device = testutils.get_pooled_device(self, [simdd_file])
+
+    def test_delayed_read_does_not_block_server(self):
+        """Test that a delayed read does not hold up the other devices of the server"""
+        sim_control = self.pooled_device.sim_control
+        sim_control.SetFaultInjection(
+            json.dumps(
+                {"temperature": {"latency": {"distribution": "constant", "value": 1.0}}}
+            )
+        )
+        device_access = self.pooled_device.tango_context.get_device_access(
+            self.pooled_device.device_name
+        )
+        delayed_read_times = []
+
+        def read_temperature():
+            start_time = time.time()
+            DeviceProxy(device_access).read_attribute("temperature")
+            delayed_read_times.append(time.time() - start_time)
+
+        reader = threading.Thread(target=read_temperature)
+        reader.start()
+        try:
+            time.sleep(0.2)
+            start_time = time.time()
+            stats = json.loads(sim_control.read_attribute("fault_injection_stats").value)
+            # Takes the model lock.
+            sim_control.GetQuantityAttributes()
+            read_time = time.time() - start_time
+        finally:
+            reader.join()
+        self.assertEqual(stats["temperature"]["delayed"], 1)
+        self.assertGreaterEqual(delayed_read_times[0], 1.0)
+        self.assertLess(read_time, 0.5)
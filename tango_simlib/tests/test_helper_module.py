@@ -0,0 +1,61 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import io
+import json
+import unittest
+
+import pkg_resources
+
+from tango_simlib.utilities import helper_module
+
+JSON_TEXT = u'{"name": "caf\\u00e9", "values": ["a", ["b", {"c": "d"}]], "num": 1.5}'
+
+
+class test_JsonLoadByteified(unittest.TestCase):
+    def test_strings_converted(self):
+        """Test that all the strings are ascii encoded native strings"""
+        data = helper_module.json_loads_byteified(JSON_TEXT)
+        self.assertEqual(
+            data, {"name": "caf?", "values": ["a", ["b", {"c": "d"}]], "num": 1.5}
+        )
+        self.assertIs(type(data["name"]), str)
+        self.assertIs(type(data["values"][1][1]["c"]), str)
+
+    def test_top_level_values(self):
+        """Test that strings in top-level lists and strings are converted"""
+        data = helper_module.json_loads_byteified(u'["x", ["y"]]')
+        self.assertEqual(data, ["x", ["y"]])
+        self.assertIs(type(helper_module.json_loads_byteified(u'"x"')), str)
+
+    def test_fgo_file(self):
+        """Test that an ascii fgo file is loaded the same as by the json module"""
+        fgo_file = pkg_resources.resource_filename(
+            "tango_simlib.tests.config_files", "database2.fgo"
+        )
+        with open(fgo_file) as file_handle:
+            data = helper_module.json_load_byteified(file_handle)
+        with open(fgo_file) as file_handle:
+            expected_data = json.load(file_handle)
+        self.assertEqual(data, expected_data)
+
+    def test_iter_json_documents(self):
+        """Test decoding a stream of JSON documents read in small chunks"""
+        text = u"{}\n1234 {}\n[3]\n".format(JSON_TEXT, JSON_TEXT)
+        documents = list(
+            helper_module.iter_json_load_byteified(io.StringIO(text), chunk_size=3)
+        )
+        expected_document = helper_module.json_loads_byteified(JSON_TEXT)
+        self.assertEqual(documents, [expected_document, 1234, expected_document, [3]])
+
+    def test_iter_json_incomplete_document(self):
+        """Test that an incomplete document raises an error"""
+        with self.assertRaises(ValueError):
+            list(helper_module.iter_json_load_byteified(io.StringIO(u'{"a": [1')))
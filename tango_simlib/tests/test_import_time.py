@@ -0,0 +1,70 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Import time regression tests for the console entry points"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Modules that are slow to import and only needed by some of the sub-commands.
+SLOW_MODULES = ("tango", "requests", "jsonschema", "pkg_resources", "numpy")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{"duration": duration, "modules": sorted(sys.modules)}}))
+"""
+
+
+def import_module(module, repeat=3):
+    """Import a module in a fresh interpreter
+
+    Returns
+    -------
+    tuple
+        (The fastest import time in seconds, the modules loaded by the import)
+    """
+    durations = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", IMPORT_SCRIPT.format(module=module)]
+        )
+        result = json.loads(output.decode().splitlines()[-1])
+        durations.append(result["duration"])
+    return min(durations), set(result["modules"])
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["tango_simlib.tango_yaml_tools.main", "tango_simlib.utilities.validate_device"],
+)
+def test_yaml_tools_do_not_import_slow_modules(module):
+    """The tango-yaml entry point and validation module should load lazily"""
+    _, modules = import_module(module, repeat=1)
+    assert not modules.intersection(SLOW_MODULES), "{} imports {}".format(
+        module, sorted(modules.intersection(SLOW_MODULES))
+    )
+
+
+def test_simdd_parser_does_not_import_validation_modules():
+    """The SimDD schema validation modules are only needed when parsing"""
+    _, modules = import_module("tango_simlib.utilities.simdd_json_parser", repeat=1)
+    assert "jsonschema" not in modules
+    assert "pkg_resources" not in modules
+
+
+def test_yaml_tools_import_time():
+    """The tango-yaml entry point should import faster than tango itself"""
+    main_duration, _ = import_module("tango_simlib.tango_yaml_tools.main")
+    tango_duration, _ = import_module("tango")
+    assert main_duration < tango_duration, (
+        "Importing tango-yaml took {:.3f}s, importing tango took {:.3f}s".format(
+            main_duration, tango_duration
+        )
+    )
@@ -0,0 +1,103 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import unittest
+
+import pkg_resources
+
+from tango import DeviceProxy
+
+from tango_simlib import loadtest
+from tango_simlib.utilities import helper_module
+
+
+class test_LoadTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.xmi_file = pkg_resources.resource_filename(
+            "tango_simlib.tests.config_files", "Weather.xmi"
+        )
+        cls.get_database = helper_module.get_database
+        cls.context = loadtest.SimulatorContext([cls.xmi_file], num_devices=2)
+        cls.context.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.context.stop()
+
+    def run_clients(self, **kwargs):
+        return loadtest.run_clients(
+            self.context.device_names,
+            lambda device_name: DeviceProxy(self.context.get_device_access(device_name)),
+            duration=0.2,
+            **kwargs
+        )
+
+    def test_devices(self):
+        """Test that the simulated devices run without a TANGO database"""
+        self.assertEqual(self.context.device_names, ["loadtest/sim/1", "loadtest/sim/2"])
+        self.assertNotEqual(helper_module.get_database, self.get_database)
+        for device_name in self.context.device_names:
+            device = DeviceProxy(self.context.get_device_access(device_name))
+            self.assertEqual(device.name(), device_name)
+            self.assertEqual(device.read_attribute("temperature").name, "temperature")
+
+    def test_run_clients(self):
+        """Test that the requests are reported per operation and type"""
+        results = self.run_clients(
+            readers=2,
+            writers=1,
+            command_callers=1,
+            attributes=["temperature", "integer1"],
+        )
+        groups = [(result["operation"], result["group"]) for result in results]
+        self.assertEqual(
+            groups,
+            [
+                ("read", "DevDouble SCALAR"),
+                ("read", "DevLong SCALAR"),
+                ("read", "all"),
+                ("write", "DevLong SCALAR"),
+                ("write", "all"),
+                ("command", "DevVoid->DevState"),
+                ("command", "DevVoid->DevString"),
+                ("command", "all"),
+            ],
+        )
+        for result in results:
+            self.assertGreater(result["count"], 0)
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["throughput"], 0)
+            self.assertTrue(0 < result["p50"] <= result["p95"] <= result["p99"])
+            self.assertLessEqual(result["p99"], result["max"])
+        self.assertEqual(len(loadtest.format_results(results)), len(results) + 1)
+
+    def test_group_by_name(self):
+        """Test that the requests can be reported per attribute and command name"""
+        results = self.run_clients(
+            readers=1, command_callers=1, attributes=["temperature"], group_by="name"
+        )
+        self.assertEqual(
+            [(result["operation"], result["group"]) for result in results],
+            [
+                ("read", "temperature"),
+                ("read", "all"),
+                ("command", "State"),
+                ("command", "Status"),
+                ("command", "all"),
+            ],
+        )
+
+    def test_nothing_to_do(self):
+        """Test that clients without requests are refused"""
+        with self.assertRaises(ValueError):
+            self.run_clients(readers=0, writers=1, attributes=["temperature"])
+        with self.assertRaises(ValueError):
+            self.run_clients(group_by="class")
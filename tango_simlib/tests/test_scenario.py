@@ -0,0 +1,143 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import json
+import unittest
+
+from mock import Mock
+
+from tango_simlib import model, quantities
+from tango_simlib.scenario import Scenario
+
+
+class ScenarioModel(model.Model):
+    def setup_sim_quantities(self):
+        self.sim_quantities["temperature"] = quantities.GaussianSlewLimited(
+            mean=20.0,
+            std_dev=1.0,
+            max_slew_rate=1.0,
+            min_bound=-10.0,
+            max_bound=50.0,
+            start_time=self.start_time,
+            meta={},
+        )
+        self.sim_quantities["comms-ok"] = quantities.ConstantQuantity(
+            start_value=True, start_time=self.start_time, meta={}
+        )
+        super(ScenarioModel, self).setup_sim_quantities()
+
+
+class test_Scenario(unittest.TestCase):
+    def setUp(self):
+        self.time_func = Mock(return_value=100.0)
+        self.model = ScenarioModel("scenario_model", time_func=self.time_func)
+        self.storm = Mock()
+        self.model.set_test_sim_action("SetOffStorm", self.storm)
+
+    def test_events_applied_when_due(self):
+        """Test that the events are applied in time order as the clock advances"""
+        scenario = Scenario(
+            [
+                {"time": 2.0, "operation": "resume"},
+                {"time": 1.0, "operation": "set", "quantities": {"temperature": {}}},
+                {"time": 1.0, "operation": "pause"},
+                {"time": 0.5, "operation": "action", "name": "SetOffStorm", "input": 3},
+                {
+                    "time": 1.0,
+                    "operation": "set",
+                    "quantities": {"temperature": {"mean": 30.0, "last_val": 25.0}},
+                },
+            ],
+            start_time=100.0,
+            tango_dev="control device",
+        )
+        self.model.set_scenario(scenario)
+        self.assertEqual(self.model.run_scenario(), 0)
+        self.time_func.return_value = 100.5
+        self.assertEqual(self.model.run_scenario(), 1)
+        self.storm.assert_called_once_with(
+            self.model, tango_dev="control device", data_input=3
+        )
+        self.time_func.return_value = 101.2
+        self.assertEqual(self.model.run_scenario(), 3)
+        temperature = self.model.sim_quantities["temperature"]
+        self.assertEqual(temperature.mean, 30.0)
+        self.assertEqual(temperature.last_val, 25.0)
+        # The quantity is updated at the scheduled time of the event.
+        self.assertEqual(temperature.last_update_time, 101.0)
+        self.assertTrue(self.model.paused)
+        self.assertEqual(scenario.pending_events, 1)
+        self.time_func.return_value = 102.0
+        self.model.update()
+        self.assertFalse(self.model.paused)
+        self.assertEqual(scenario.pending_events, 0)
+
+    def test_failing_event_skipped(self):
+        """Test that an event that raises an error does not stop the scenario"""
+        self.storm.side_effect = RuntimeError("Storm failed")
+        scenario = Scenario(
+            [
+                {"time": 0, "operation": "action", "name": "SetOffStorm"},
+                {"time": 0, "operation": "pause"},
+            ],
+            start_time=100.0,
+        )
+        self.model.set_scenario(scenario)
+        self.assertEqual(self.model.run_scenario(), 2)
+        self.assertTrue(self.model.paused)
+        self.assertEqual(self.model.run_scenario(), 0)
+        self.assertEqual(self.storm.call_count, 1)
+
+    def test_stop_scenario(self):
+        """Test that no more events are applied once the scenario is stopped"""
+        self.model.set_scenario(
+            Scenario([{"time": 1.0, "operation": "pause"}], start_time=100.0)
+        )
+        self.model.set_scenario(None)
+        self.time_func.return_value = 110.0
+        self.assertEqual(self.model.run_scenario(), 0)
+        self.assertFalse(self.model.paused)
+
+    def test_from_json(self):
+        """Test creating a scenario from a JSON document"""
+        scenario = Scenario.from_json(
+            json.dumps({"events": [{"time": 1, "operation": "pause"}]}), 100.0
+        )
+        self.assertEqual(scenario.events, [{"time": 1, "operation": "pause"}])
+        for scenario_json in ("[]", '{"events": {}}', '"events"'):
+            with self.assertRaises(ValueError):
+                Scenario.from_json(scenario_json, 100.0)
+
+    def test_invalid_events(self):
+        """Test that invalid events are rejected"""
+        for event in (
+            {"operation": "pause"},
+            {"time": -1, "operation": "pause"},
+            {"time": True, "operation": "pause"},
+            {"time": 1, "operation": "explode"},
+            {"time": 1, "operation": "action"},
+            {"time": 1, "operation": "set", "quantities": []},
+            "pause",
+        ):
+            with self.assertRaises(ValueError):
+                Scenario([event], 100.0)
+
+    def test_events_not_in_model(self):
+        """Test that a scenario can only refer to the quantities and actions of the
+        model
+        """
+        for event in (
+            {"time": 1, "operation": "action", "name": "StopStorm"},
+            {"time": 1, "operation": "set", "quantities": {"pressure": {}}},
+            {"time": 1, "operation": "set", "quantities": {"comms-ok": {"mean": 1}}},
+        ):
+            with self.assertRaises(ValueError):
+                self.model.set_scenario(Scenario([event], 100.0))
+        self.assertIsNone(self.model.scenario)
@@ -0,0 +1,219 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import multiprocessing
+import threading
+import time
+import unittest
+
+from mock import Mock, patch
+
+from tango_simlib import model, quantities
+from tango_simlib.shared_state import (
+    SharedQuantityState,
+    is_shared_state_supported,
+    shared_memory,
+)
+
+
+class SharedStateModel(model.Model):
+    def setup_sim_quantities(self):
+        self.sim_quantities["temperature"] = quantities.GaussianSlewLimited(
+            mean=20.0,
+            std_dev=1.0,
+            max_slew_rate=1.0,
+            min_bound=-10.0,
+            max_bound=50.0,
+            start_time=self.start_time,
+            meta={},
+        )
+        self.sim_quantities["comms-ok"] = quantities.ConstantQuantity(
+            start_value=True, start_time=self.start_time, meta={}
+        )
+        self.sim_quantities["mode"] = quantities.ConstantQuantity(
+            start_value=2, start_time=self.start_time, meta={}
+        )
+        self.sim_quantities["status"] = quantities.ConstantQuantity(
+            start_value="ready", start_time=self.start_time, meta={}
+        )
+        super(SharedStateModel, self).setup_sim_quantities()
+
+
+def _read_shared_state(name, queue):
+    shared_state = SharedQuantityState.attach(name)
+    queue.put(dict(shared_state))
+    shared_state["temperature"] = (42.0, 200.0)
+    shared_state.close()
+
+
+def _create_shared_state(name, exit_event=None):
+    shared_state = SharedQuantityState.create(name, {"mode": (1, 50.0)})
+    if exit_event is None:
+        # Not unlinked, as if its server crashed.
+        shared_state.close()
+    else:
+        exit_event.wait(10)
+        shared_state.unlink()
+
+
+def _run_process(target, *args):
+    process = multiprocessing.Process(target=target, args=args)
+    process.start()
+    return process
+
+
+@unittest.skipUnless(is_shared_state_supported(), "Needs Python 3.8 or later")
+class test_SharedQuantityState(unittest.TestCase):
+    def setUp(self):
+        self.time_func = Mock(return_value=100.0)
+        self.model = SharedStateModel(
+            "shared_state_model", time_func=self.time_func, min_update_period=0.0
+        )
+        self.addCleanup(self.model.unshare_quantity_state)
+        self.shared_state = self.model.share_quantity_state()
+
+    def _attach(self, name=None):
+        shared_state = SharedQuantityState.attach(name or self.shared_state.name)
+        self.addCleanup(shared_state.close)
+        return shared_state
+
+    def test_model_state_shared(self):
+        """Test that the numeric quantities are shared and kept up to date"""
+        self.assertIs(self.model.quantity_state, self.shared_state)
+        self.assertEqual(
+            self.shared_state.shared_names, ["comms-ok", "mode", "temperature"]
+        )
+        shared_state = self._attach()
+        self.assertEqual(sorted(shared_state), ["comms-ok", "mode", "temperature"])
+        self.assertEqual(shared_state["comms-ok"], (True, 100.0))
+        self.assertEqual(shared_state["mode"], (2, 100.0))
+        self.assertIsInstance(shared_state["mode"][0], int)
+        self.assertEqual(self.model.quantity_state["status"], ("ready", 100.0))
+        self.time_func.return_value = 101.0
+        self.model.update()
+        self.assertEqual(
+            shared_state["temperature"], self.model.quantity_state["temperature"]
+        )
+        self.assertEqual(shared_state["temperature"][1], 101.0)
+
+    def test_share_again(self):
+        """Test that sharing the state again under the same name changes nothing"""
+        self.assertIs(
+            self.model.share_quantity_state(self.shared_state.name), self.shared_state
+        )
+
+    def test_other_process(self):
+        """Test reading and writing the state from another process"""
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_read_shared_state, args=(self.shared_state.name, queue)
+        )
+        process.start()
+        state = queue.get(timeout=10)
+        process.join(10)
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(state["mode"], (2, 100.0))
+        self.assertEqual(self.model.quantity_state["temperature"], (42.0, 200.0))
+
+    def test_consistent_reads(self):
+        """Test that a value is never read with the time of another update"""
+        shared_state = self._attach()
+        stop = threading.Event()
+
+        def write():
+            count = 0
+            while not stop.is_set():
+                count += 1
+                self.shared_state["temperature"] = (float(count), float(count))
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(10000):
+                value, update_time = shared_state["temperature"]
+                self.assertEqual(value, update_time)
+        finally:
+            stop.set()
+            writer.join()
+
+    def test_as_array(self):
+        """Test the zero-copy view of the shared slots"""
+        values = self._attach().as_array()
+        self.assertEqual(list(values["value"]), [1.0, 2.0, 20.0])
+        self.model.quantity_state["mode"] = (3, 102.0)
+        self.assertEqual(values["value"][1], 3.0)
+        self.assertEqual(values["time"][1], 102.0)
+        del values
+
+    def test_unshare(self):
+        """Test moving the state back from shared memory"""
+        name = self.shared_state.name
+        self.model.unshare_quantity_state()
+        self.assertIsInstance(self.model.quantity_state, dict)
+        self.assertEqual(self.model.quantity_state["mode"], (2, 100.0))
+        with self.assertRaises(FileNotFoundError):
+            SharedQuantityState.attach(name)
+
+    def test_unshare_at_exit_registered_once(self):
+        """Test that sharing the state again does not register another cleanup"""
+        with patch("tango_simlib.model.atexit.register") as register:
+            model = SharedStateModel("shared_state_model_2", min_update_period=0.0)
+            self.addCleanup(model.unshare_quantity_state)
+            model.share_quantity_state()
+            model.share_quantity_state("tango_simlib_test_share_again")
+        register.assert_called_once_with(model.unshare_quantity_state)
+
+    def test_stale_segment_replaced(self):
+        """Test that the segment left behind by a crashed server is replaced"""
+        name = "tango_simlib_test_stale"
+        process = _run_process(_create_shared_state, name)
+        process.join(10)
+        self.assertEqual(process.exitcode, 0)
+        shared_state = self.model.share_quantity_state(name)
+        self.assertEqual(shared_state.shared_names, ["comms-ok", "mode", "temperature"])
+        self.assertEqual(self._attach(name)["mode"], (2, 100.0))
+
+    def test_live_segment_kept(self):
+        """Test that the segment of another running owner is not replaced"""
+        name = "tango_simlib_test_live"
+        exit_event = multiprocessing.Event()
+        process = _run_process(_create_shared_state, name, exit_event)
+        self.addCleanup(process.join, 10)
+        self.addCleanup(exit_event.set)
+        shared_state = None
+        while shared_state is None:
+            try:
+                shared_state = self._attach(name)
+            except (FileNotFoundError, ValueError):
+                self.assertTrue(process.is_alive())
+                time.sleep(0.01)
+        with self.assertRaises(FileExistsError):
+            self.model.share_quantity_state(name)
+        self.assertEqual(shared_state["mode"], (1, 50.0))
+        self.assertIsNot(self.model.quantity_state, shared_state)
+
+    def test_own_segment_kept(self):
+        """Test that a segment of another model of this process is not replaced"""
+        model = SharedStateModel("shared_state_model_2", min_update_period=0.0)
+        self.addCleanup(model.unshare_quantity_state)
+        with self.assertRaises(FileExistsError):
+            model.share_quantity_state(self.shared_state.name)
+        self.assertEqual(self._attach()["mode"], (2, 100.0))
+
+    def test_foreign_segment_kept(self):
+        """Test that a segment that is not a quantity state is not replaced"""
+        name = "tango_simlib_test_foreign"
+        foreign = shared_memory.SharedMemory(name=name, create=True, size=64)
+        self.addCleanup(foreign.unlink)
+        self.addCleanup(foreign.close)
+        foreign.buf[:8] = b"NOTSTATE"
+        with self.assertRaises(FileExistsError):
+            self.model.share_quantity_state(name)
+        self.assertEqual(bytes(foreign.buf[:8]), b"NOTSTATE")
@@ -9,6 +9,7 @@ from future import standard_library
 
 standard_library.install_aliases()  # noqa: E402
 
+import json
 import os
 import subprocess
 import time
@@ -18,7 +19,7 @@ from functools import partial
 import pkg_resources
 
 from mock import Mock, patch
-from tango import AttrDataFormat, DeviceProxy, DevState
+from tango import AttrDataFormat, DeviceProxy, DevFailed, DevState
 from tango.test_context import DeviceTestContext
 from tango_simlib import model, quantities, tango_sim_generator
 from tango_simlib.utilities import helper_module
@@ -292,6 +293,79 @@ class test_SimControl(unittest.TestCase):
         # have changed.
         self._compare_models(self.test_model, expected_model)
 
+    def test_get_quantity_attributes(self):
+        quantity_attributes = json.loads(self.device.GetQuantityAttributes())
+        self.assertEqual(quantity_attributes, self._quants_before_dict(self.test_model))
+
+    def test_set_quantity_attributes(self):
+        expected_model = FixtureModel(
+            "random_test3_name", time_func=lambda: self.test_model.start_time
+        )
+        new_values = {
+            "relative-humidity": {"mean": 600.0, "max_bound": 1000.0},
+            "wind-speed": {"last_val": 62.0, "std_dev": 200.0},
+        }
+        for quantity_name, attributes in new_values.items():
+            for attr, new_val in attributes.items():
+                setattr(expected_model.sim_quantities[quantity_name], attr, new_val)
+        wind_speed = expected_model.sim_quantities["wind-speed"]
+        wind_speed.last_update_time = self.mock_time.return_value
+        self.device.SetQuantityAttributes(json.dumps(new_values))
+        self.assertEqual(
+            json.loads(self.device.GetQuantityAttributes()),
+            self._quants_before_dict(expected_model),
+        )
+
+    def test_model_snapshot(self):
+        self.addCleanup(setattr, self.test_model, "paused", False)
+        quants_before = self._quants_before_dict(self.test_model)
+        self.device.TakeModelSnapshot()
+        self.device.SetQuantityAttributes(
+            json.dumps({"relative-humidity": {"mean": 600.0, "last_val": 500.0}})
+        )
+        self.device.pause_active = True
+        self.device.SetFaultInjection(json.dumps({"temperature": {"error_rate": 0.5}}))
+        self.device.RestoreModelSnapshot()
+        self.assertEqual(self._quants_before_dict(self.test_model), quants_before)
+        self.assertFalse(self.device.pause_active)
+        self.assertEqual(json.loads(self.device.fault_injection_settings), {})
+
+    def test_load_scenario(self):
+        self.addCleanup(setattr, self.test_model, "paused", False)
+        scenario = {
+            "events": [
+                {
+                    "time": 0,
+                    "operation": "set",
+                    "quantities": {"relative-humidity": {"mean": 600.0}},
+                },
+                {"time": 0, "operation": "pause"},
+            ]
+        }
+        self.device.LoadScenario(json.dumps(scenario))
+        timeout = time.time() + 5.0
+        while self.device.scenario_events_pending and time.time() < timeout:
+            time.sleep(0.01)
+        self.assertEqual(self.device.scenario_events_pending, 0)
+        self.assertEqual(self.test_model.sim_quantities["relative-humidity"].mean, 600.0)
+        self.assertTrue(self.device.pause_active)
+
+    def test_load_invalid_scenario(self):
+        scenario = {"events": [{"time": 0, "operation": "action", "name": "Unknown"}]}
+        with self.assertRaises(DevFailed):
+            self.device.LoadScenario(json.dumps(scenario))
+        self.assertEqual(self.device.scenario_events_pending, 0)
+
+    def test_set_quantity_attributes_is_atomic(self):
+        quants_before = self._quants_before_dict(self.test_model)
+        for new_values in (
+            {"relative-humidity": {"mean": 600.0}, "unknown": {"mean": 1.0}},
+            {"relative-humidity": {"mean": 600.0}, "wind-speed": {"unknown": 1.0}},
+        ):
+            with self.assertRaises(DevFailed):
+                self.device.SetQuantityAttributes(json.dumps(new_values))
+        self.assertEqual(self._quants_before_dict(self.test_model), quants_before)
+
 
 EXPECTED_COMMAND_LIST = frozenset(
     [
@@ -387,7 +461,9 @@ class test_TangoSimGenDeviceIntegration(ClassCleanupUnittestMixin, unittest.Test
         device_commands = self.sim_control_device.get_command_list()
         self.assertEqual(
             EXPECTED_COMMAND_LIST,
-            set(device_commands) - helper_module.DEFAULT_TANGO_DEVICE_COMMANDS,
+            set(device_commands)
+            - helper_module.DEFAULT_TANGO_DEVICE_COMMANDS
+            - helper_module.SIM_CONTROL_ADDITIONAL_IMPLEMENTED_COMMANDS,
         )
         self.assertEqual(
             set(self.sim_device.get_command_list()) & EXPECTED_COMMAND_LIST,
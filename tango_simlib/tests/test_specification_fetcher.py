@@ -0,0 +1,151 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import shutil
+import tempfile
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import requests
+
+from tango_simlib.utilities.specification_fetcher import SpecificationFetcher
+from tango_simlib.utilities.validate_device import read_specification_from_url
+
+SPECIFICATION = """
+class: Weather
+meta:
+    attributes:
+    commands:
+    properties:
+"""
+
+
+class SpecificationServer(ThreadingMixIn, HTTPServer):
+    """Serves one specification file, recording the requests for it."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), SpecificationRequestHandler)
+        self.specification = SPECIFICATION
+        self.etag = '"1"'
+        self.requests = []
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/weather.yaml".format(self.server_address[1])
+
+
+class SpecificationRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers.items()))
+        if self.path != "/weather.yaml":
+            self.send_error(404)
+            return
+        if self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.server.specification.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/yaml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Last-Modified", "Wed, 01 Jul 2020 00:00:00 GMT")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class test_SpecificationFetcher(unittest.TestCase):
+    def setUp(self):
+        self.server = SpecificationServer()
+        server_thread = threading.Thread(target=self.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_fetch_once(self):
+        """Test that a URL is downloaded once however many threads ask for it"""
+        fetcher = SpecificationFetcher(cache_dir=self.cache_dir)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(fetcher.fetch(self.server.url))
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [SPECIFICATION] * 8)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(
+            read_specification_from_url(self.server.url, fetcher), SPECIFICATION
+        )
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_revalidation(self):
+        """Test that a cached download is only downloaded again when it changed"""
+        self.assertEqual(
+            SpecificationFetcher(cache_dir=self.cache_dir).fetch(self.server.url),
+            SPECIFICATION,
+        )
+        self.assertNotIn("If-None-Match", self.server.requests[-1])
+
+        self.server.specification = "Served instead of the cached specification"
+        self.assertEqual(
+            SpecificationFetcher(cache_dir=self.cache_dir).fetch(self.server.url),
+            SPECIFICATION,
+        )
+        self.assertEqual(self.server.requests[-1]["If-None-Match"], '"1"')
+        self.assertEqual(
+            self.server.requests[-1]["If-Modified-Since"], "Wed, 01 Jul 2020 00:00:00 GMT"
+        )
+
+        self.server.etag = '"2"'
+        self.assertEqual(
+            SpecificationFetcher(cache_dir=self.cache_dir).fetch(self.server.url),
+            self.server.specification,
+        )
+        self.assertEqual(
+            SpecificationFetcher(cache_dir=self.cache_dir).fetch(self.server.url),
+            self.server.specification,
+        )
+        self.assertEqual(self.server.requests[-1]["If-None-Match"], '"2"')
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_no_cache(self):
+        """Test that without a cache every fetcher downloads the URL"""
+        for _ in range(2):
+            self.assertEqual(
+                SpecificationFetcher(cache_dir=None).fetch(self.server.url),
+                SPECIFICATION,
+            )
+            self.assertNotIn("If-None-Match", self.server.requests[-1])
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_error(self):
+        """Test that errors are raised and not cached"""
+        fetcher = SpecificationFetcher(cache_dir=self.cache_dir)
+        url = self.server.url.replace("weather", "missing")
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                fetcher.fetch(url)
+        self.assertEqual(len(self.server.requests), 2)
@@ -0,0 +1,73 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import json
+import unittest
+
+import mock
+
+from tango_simlib.utilities.startup_timing import StartupTimer
+
+
+class test_StartupTimer(unittest.TestCase):
+    def setUp(self):
+        self.clock = mock.Mock(return_value=10.0)
+        self.timer = StartupTimer(clock=self.clock)
+
+    def test_phases(self):
+        """Test that repeated phases are accumulated in the order they first ran"""
+        self.timer.add_phase("imports", 1.5)
+        for duration in (0.25, 0.5):
+            self.clock.side_effect = [20.0, 20.0 + duration]
+            with self.timer.phase("parse"):
+                pass
+        self.assertEqual(
+            self.timer.get_report(),
+            {
+                "phases": [
+                    {"name": "imports", "duration": 1.5, "count": 1},
+                    {"name": "parse", "duration": 0.75, "count": 2},
+                ],
+                "first_read": None,
+            },
+        )
+
+    def test_phase_raising_error(self):
+        """Test that a phase is recorded when the code it times raises an error"""
+        self.clock.side_effect = [20.0, 21.0]
+        with self.assertRaises(ValueError):
+            with self.timer.phase("parse"):
+                raise ValueError()
+        self.assertEqual(
+            self.timer.get_report()["phases"],
+            [{"name": "parse", "duration": 1.0, "count": 1}],
+        )
+
+    def test_first_read(self):
+        """Test that only the first read is recorded and the report is logged"""
+        logger = mock.Mock()
+        self.clock.return_value = 12.5
+        with mock.patch.object(self.timer, "log_report") as log_report:
+            self.assertTrue(self.timer.record_first_read())
+            self.clock.return_value = 13.0
+            self.assertFalse(self.timer.record_first_read())
+        log_report.assert_called_once_with()
+        self.assertEqual(self.timer.get_report()["first_read"], 2.5)
+        self.timer.log_report(logger=logger)
+        _, report = logger.info.call_args[0]
+        self.assertEqual(json.loads(report), self.timer.get_report())
+
+    def test_reset(self):
+        """Test that resetting the timer discards the recorded phases"""
+        self.timer.add_phase("imports", 1.5)
+        self.timer.record_first_read()
+        self.timer.reset(start_time=5.0)
+        self.assertEqual(self.timer.start_time, 5.0)
+        self.assertEqual(self.timer.get_report(), {"phases": [], "first_read": None})
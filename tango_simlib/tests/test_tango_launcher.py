@@ -0,0 +1,115 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import mock
+import unittest
+
+import tango
+
+from tango_simlib import tango_launcher
+
+
+class test_ShardDevices(unittest.TestCase):
+    def test_shards_are_balanced(self):
+        """Test that the devices are spread evenly over the shards"""
+        names = ["sim/dev/{}".format(i) for i in range(10)]
+        shards = tango_launcher.shard_devices(names, {}, 4)
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(sorted(len(shard) for shard in shards), [2, 2, 3, 3])
+        self.assertEqual(sorted(sum(shards, [])), sorted(names))
+
+    def test_no_empty_shards(self):
+        """Test that there are not more shards than devices"""
+        shards = tango_launcher.shard_devices(["sim/dev/1", "sim/dev/2"], {}, 8)
+        self.assertEqual(shards, [["sim/dev/1"], ["sim/dev/2"]])
+
+    def test_model_key_devices_kept_together(self):
+        """Test that a device is in the same shard as its 'model_key' device"""
+        names = ["sim/dev/1", "control/dev/1", "sim/dev/2", "control/dev/2"]
+        device_properties = tango_launcher.get_device_properties(
+            [
+                "control/dev/1:model_key:sim/dev/1",
+                "control/dev/2:model_key:sim/dev/2",
+            ],
+            names,
+        )
+        shards = tango_launcher.shard_devices(names, device_properties, 2)
+        self.assertEqual(
+            sorted(shards),
+            [["sim/dev/1", "control/dev/1"], ["sim/dev/2", "control/dev/2"]],
+        )
+
+
+class test_WaitUntilReady(unittest.TestCase):
+    def setUp(self):
+        self.process = mock.Mock()
+        self.process.poll.return_value = None
+        self.worker = tango_launcher.FarmWorker(
+            "instance-0", 10000, ["sim/dev/1"], self.process
+        )
+
+    def test_ready(self):
+        """Test that waiting returns once the devices respond"""
+        with mock.patch.object(tango_launcher.tango, "DeviceProxy") as device_proxy:
+            device_proxy.return_value.ping.side_effect = [tango.DevFailed(), 100]
+            tango_launcher.wait_until_ready([self.worker], 5, poll_period=0)
+        self.assertEqual(device_proxy.return_value.ping.call_count, 2)
+        # The proxy is created once and reused.
+        device_proxy.assert_called_once_with("sim/dev/1")
+
+    def test_process_exited(self):
+        """Test that an error is raised if a server process exits"""
+        self.process.poll.return_value = 1
+        with self.assertRaises(RuntimeError):
+            tango_launcher.wait_until_ready([self.worker], 5, poll_period=0)
+
+    def test_process_restarted(self):
+        """Test that a server process that exits is restarted a limited number of times"""
+        self.process.poll.return_value = 1
+        restarted_process = mock.Mock()
+        restarted_process.poll.return_value = None
+        restart = mock.Mock(
+            return_value=self.worker._replace(port=10001, process=restarted_process)
+        )
+        workers = [self.worker]
+        with mock.patch.object(tango_launcher.tango, "DeviceProxy"):
+            tango_launcher.wait_until_ready(workers, 5, poll_period=0, restart=restart)
+        restart.assert_called_once_with(self.worker)
+        self.assertEqual(workers, [restart.return_value])
+
+        restart.return_value = self.worker
+        restart.reset_mock()
+        with self.assertRaises(RuntimeError):
+            tango_launcher.wait_until_ready(
+                [self.worker], 5, poll_period=0, restart=restart
+            )
+        self.assertEqual(restart.call_count, tango_launcher.MAX_SERVER_STARTS - 1)
+
+    def test_timeout(self):
+        """Test that an error is raised if the devices are not ready in time"""
+        with mock.patch.object(tango_launcher.tango, "DeviceProxy") as device_proxy:
+            device_proxy.return_value.ping.side_effect = tango.DevFailed()
+            with self.assertRaises(RuntimeError):
+                tango_launcher.wait_until_ready([self.worker], 0, poll_period=0)
+
+
+class test_StartServer(unittest.TestCase):
+    def test_port_allocated_on_start(self):
+        """Test that a server process is given a free port when it is started"""
+        worker = tango_launcher.FarmWorker("instance-0", None, ["sim/dev/1"], None)
+        with mock.patch.object(
+            tango_launcher, "get_port", return_value=10002
+        ), mock.patch.object(tango_launcher.subprocess, "Popen") as popen:
+            worker = tango_launcher.start_server("weather.py", worker)
+        self.assertEqual(worker.port, 10002)
+        self.assertIs(worker.process, popen.return_value)
+        self.assertEqual(
+            popen.call_args[0][0][-3:], ["instance-0", "-ORBendPoint", "giop:tcp::10002"]
+        )
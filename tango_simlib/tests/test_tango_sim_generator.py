@@ -11,9 +11,12 @@ from future import standard_library
 standard_library.install_aliases()  # noqa: E402
 from future.utils import itervalues
 
+import json
+import os
 import time
 import logging
 import unittest
+import threading
 import shutil
 import tempfile
 import subprocess
@@ -22,13 +25,17 @@ import pkg_resources
 import tango
 
 from builtins import object
-from mock import Mock
+from mock import Mock, patch
 
 from tango import Database
+from tango.test_context import MultiDeviceTestContext
 from tango_simlib import tango_sim_generator
+from tango_simlib.scenario import Scenario
+from tango_simlib.shared_state import SharedQuantityState, is_shared_state_supported
 from tango_simlib.tests import test_sim_test_interface
 from tango_simlib.utilities import (
     helper_module,
+    precompiled_parser,
     sim_xmi_parser,
     fandango_json_parser,
     simdd_json_parser,
@@ -55,6 +62,7 @@ class BaseTest(object):
         server_name = None
         data_descr_file = None
         sim_file_parser = None
+        static_interface = False
 
         @classmethod
         def setUpClassWithCleanup(cls):
@@ -74,7 +82,10 @@ class BaseTest(object):
             database_filename = "%s/%s_tango.db" % (cls.temp_dir, cls.server_name)
             sim_test_device_prop = dict(model_key=device_name)
             tango_sim_generator.generate_device_server(
-                cls.server_name, cls.data_descr_file, cls.temp_dir
+                cls.server_name,
+                cls.data_descr_file,
+                cls.temp_dir,
+                static=cls.static_interface,
             )
             helper_module.append_device_to_db_file(
                 cls.server_name,
@@ -152,6 +163,23 @@ class BaseTest(object):
             num_added_properties = final_count - initial_count
             self.assertEquals(num_expected_properties, num_added_properties)
 
+        def test_unchanged_device_properties_not_rewritten(self):
+            """Testing that only changed device properties are written to the tangoDB"""
+            device_name = self.sim_device.name()
+            properties = {"testProperty1": "value1", "testProperty2": ["1", "2"]}
+            changed = helper_module.put_device_properties(
+                self.db_instance, device_name, properties
+            )
+            self.assertEqual(changed, properties)
+            changed = helper_module.put_device_properties(
+                self.db_instance, device_name, properties
+            )
+            self.assertEqual(changed, {})
+            changed = helper_module.put_device_properties(
+                self.db_instance, device_name, dict(properties, testProperty1="value2")
+            )
+            self.assertEqual(changed, {"testProperty1": "value2"})
+
         def test_sim_control_attribute_list(self):
             """Testing whether the attributes quantities in the model are added to
             the TANGO sim device controller
@@ -176,6 +204,49 @@ class BaseTest(object):
             setattr(self.sim_control_device, "last_val", input_value)
             self.assertEqual(self.sim_device.temperature, input_value)
 
+        def test_fault_injection(self):
+            """Testing that errors set on the sim control device are injected in the
+            attribute reads of the device
+            """
+            attribute_names = set(self.sim_device.get_attribute_list())
+            attribute_names -= helper_module.DEFAULT_TANGO_DEVICE_ATTRIBUTES
+            attribute_name = sorted(attribute_names)[0]
+            self.addCleanup(self.sim_control_device.ClearFaultInjection)
+            self.sim_control_device.SetFaultInjection(
+                json.dumps({attribute_name: {"error_rate": 1}})
+            )
+            with self.assertRaises(tango.DevFailed) as context:
+                self.sim_device.read_attribute(attribute_name)
+            self.assertEqual(context.exception.args[0].reason, "InjectedFault")
+            stats = json.loads(self.sim_control_device.fault_injection_stats)
+            self.assertEqual(stats[attribute_name]["errors"], 1)
+            self.sim_control_device.SetFaultInjection(json.dumps({attribute_name: None}))
+            self.sim_device.read_attribute(attribute_name)
+
+        def test_startup_timing_report(self):
+            """Testing that the device reports the duration of its start-up phases"""
+            attribute_names = set(self.sim_device.get_attribute_list())
+            attribute_names -= helper_module.DEFAULT_TANGO_DEVICE_ATTRIBUTES
+            self.sim_device.read_attribute(sorted(attribute_names)[0])
+            report = json.loads(self.sim_device.StartupTimingReport)
+            phase_names = [phase["name"] for phase in report["phases"]]
+            self.assertEqual(phase_names[0], "imports")
+            for phase_name in (
+                "populate_model_quantities",
+                "populate_model_actions",
+                "static_attributes",
+                "write_device_properties",
+            ):
+                self.assertIn(phase_name, phase_names)
+            if not self.static_interface:
+                file_name = os.path.basename(self.data_descr_file[0])
+                self.assertIn("parse:{}".format(file_name), phase_names)
+                self.assertIn("dynamic_attributes", phase_names)
+            for phase in report["phases"]:
+                self.assertGreaterEqual(phase["duration"], 0)
+                self.assertGreaterEqual(phase["count"], 1)
+            self.assertGreater(report["first_read"], 0)
+
 
 class test_XmiFile(BaseTest.TangoSimGenDeviceIntegration):
     @classmethod
@@ -237,6 +308,12 @@ class test_XmiFile(BaseTest.TangoSimGenDeviceIntegration):
         )
 
 
+class test_StaticXmiFile(test_XmiFile):
+    """Run the XMI file tests against a device server generated in static mode."""
+
+    static_interface = True
+
+
 class test_FandangoFile(BaseTest.TangoSimGenDeviceIntegration):
     @classmethod
     def setUpClassWithCleanup(cls):
@@ -255,7 +332,9 @@ class test_FandangoFile(BaseTest.TangoSimGenDeviceIntegration):
         # test that the attributes from the running simulated device match the attributes
         # from in the fandango generated file
         device_attributes = set(self.sim_device.get_attribute_list())
-        extra_attr_from_device = set(["NumAttributesNotAdded", "AttributesNotAdded"])
+        extra_attr_from_device = set(
+            ["NumAttributesNotAdded", "AttributesNotAdded", "StartupTimingReport"]
+        )
         remaining_device_attrs = device_attributes - extra_attr_from_device
         not_added_attr = self.sim_device.read_attribute("AttributesNotAdded")
         not_added_attr_names = not_added_attr.value
@@ -341,6 +420,498 @@ class test_JsonFile(BaseTest.TangoSimGenDeviceIntegration):
         )
 
 
+class test_StaticJsonFile(test_JsonFile):
+    """Run the SimDD file tests against a device server generated in static mode."""
+
+    static_interface = True
+
+
+class test_SimDefinition(unittest.TestCase):
+    """Test configuring device models from a precompiled simulator definition."""
+
+    def setUp(self):
+        super(test_SimDefinition, self).setUp()
+        self.data_descr_files = [
+            pkg_resources.resource_filename("tango_simlib.tests.config_files", file_name)
+            for file_name in ("Weather.xmi", "Weather_SimDD.json")
+        ]
+
+    def test_models_match_parsed_files(self):
+        """Test that the models are the same as the ones configured from the files."""
+        sim_definition = tango_sim_generator.get_sim_definition(self.data_descr_files)
+        self.assertEqual(sim_definition["class_name"], "Weather")
+        # The definition is written into the generated device server as a literal.
+        sim_definition = eval(repr(sim_definition))
+        expected_model = list(
+            itervalues(
+                tango_sim_generator.configure_device_models(
+                    self.data_descr_files, "test/nodb/expected"
+                )
+            )
+        )[0]
+        model = list(
+            itervalues(
+                tango_sim_generator.configure_device_models_from_definition(
+                    sim_definition, "test/nodb/precompiled"
+                )
+            )
+        )[0]
+        self.assertEqual(
+            set(model.sim_quantities.keys()), set(expected_model.sim_quantities.keys())
+        )
+        for quantity_name, quantity in model.sim_quantities.items():
+            expected_quantity = expected_model.sim_quantities[quantity_name]
+            self.assertEqual(type(quantity), type(expected_quantity))
+            self.assertEqual(quantity.meta, expected_quantity.meta)
+        self.assertEqual(model.sim_actions_meta, expected_model.sim_actions_meta)
+        self.assertEqual(model.sim_properties, expected_model.sim_properties)
+
+
+class test_CompiledSimDefinition(unittest.TestCase):
+    """Test compiling simulator description files to a binary definition file."""
+
+    def setUp(self):
+        super(test_CompiledSimDefinition, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.data_descr_files = [
+            pkg_resources.resource_filename("tango_simlib.tests.config_files", file_name)
+            for file_name in ("Weather.xmi", "Weather_SimDD.json")
+        ]
+        self.compiled_file = tango_sim_generator.compile_sim_data_files(
+            self.data_descr_files, os.path.join(self.temp_dir, "Weather")
+        )
+
+    def test_models_match_parsed_files(self):
+        """Test that the models are the same as the ones configured from the files."""
+        self.assertTrue(self.compiled_file.endswith(".simdef"))
+        self.assertEqual(
+            tango_sim_generator.get_device_class([self.compiled_file]), "Weather"
+        )
+        expected_model = list(
+            itervalues(
+                tango_sim_generator.configure_device_models(
+                    self.data_descr_files, "test/nodb/expected"
+                )
+            )
+        )[0]
+        model = list(
+            itervalues(
+                tango_sim_generator.configure_device_models(
+                    [self.compiled_file], "test/nodb/compiled"
+                )
+            )
+        )[0]
+        self.assertEqual(
+            set(model.sim_quantities.keys()), set(expected_model.sim_quantities.keys())
+        )
+        numeric_properties = precompiled_parser.NUMERIC_ATTRIBUTE_PROPERTIES
+        for quantity_name, quantity in model.sim_quantities.items():
+            expected_quantity = expected_model.sim_quantities[quantity_name]
+            self.assertEqual(type(quantity), type(expected_quantity))
+            self.assertEqual(set(quantity.meta), set(expected_quantity.meta))
+            for key, value in quantity.meta.items():
+                expected_value = expected_quantity.meta[key]
+                if key in numeric_properties and expected_value != "":
+                    # The numeric properties are stored as numbers.
+                    self.assertNotIsInstance(value, str)
+                    self.assertEqual(value, float(expected_value))
+                else:
+                    self.assertEqual(value, expected_value)
+        self.assertEqual(model.sim_actions_meta, expected_model.sim_actions_meta)
+        self.assertEqual(model.sim_properties, expected_model.sim_properties)
+
+    def test_parse(self):
+        """Test that the parser loads both groups of properties of a compiled file"""
+        # Only the XMI files have class properties of their own.
+        compiled_file = tango_sim_generator.compile_sim_data_files(
+            self.data_descr_files[:1], os.path.join(self.temp_dir, "Weather_xmi")
+        )
+        parser = precompiled_parser.PrecompiledParser()
+        parser.parse(compiled_file)
+        self.assertEqual(parser.data_description_file_name, compiled_file)
+        self.assertEqual(parser.device_class_name, "Weather")
+        xmi_parser = tango_sim_generator.get_parser_instance(self.data_descr_files[0])
+        for property_group in ("deviceProperties", "classProperties"):
+            self.assertEqual(
+                set(parser.get_device_properties_metadata(property_group)),
+                set(xmi_parser.get_device_properties_metadata(property_group)),
+            )
+        self.assertNotEqual(
+            parser.get_device_properties_metadata("deviceProperties"),
+            parser.get_device_properties_metadata("classProperties"),
+        )
+
+    def test_unsupported_version(self):
+        """Test that a compiled file with another format version is rejected"""
+        with open(self.compiled_file, "r+b") as compiled_file:
+            compiled_file.seek(len(precompiled_parser.COMPILED_FILE_MAGIC))
+            compiled_file.write(b"\xff\xff")
+        with self.assertRaises(ValueError):
+            precompiled_parser.read_compiled_sim_definition(self.compiled_file)
+
+    def test_not_a_compiled_file(self):
+        """Test that other files are rejected"""
+        with self.assertRaises(ValueError):
+            precompiled_parser.read_compiled_sim_definition(self.data_descr_files[0])
+
+
+class test_ReloadDeviceModel(unittest.TestCase):
+    """Test applying changes of a simulator description file to a running model."""
+
+    def setUp(self):
+        super(test_ReloadDeviceModel, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        original_file = pkg_resources.resource_filename(
+            "tango_simlib.tests.config_files", "Weather_SimDD.json"
+        )
+        self.sim_data_file = os.path.join(self.temp_dir, "Weather_SimDD.json")
+        shutil.copy(original_file, self.sim_data_file)
+        with open(self.sim_data_file) as sim_data_file:
+            self.sim_data = json.load(sim_data_file)
+        self.model = list(
+            itervalues(
+                tango_sim_generator.configure_device_models(
+                    [self.sim_data_file], "test/nodb/reload"
+                )
+            )
+        )[0]
+
+    def _write_sim_data(self):
+        with open(self.sim_data_file, "w") as sim_data_file:
+            json.dump(self.sim_data, sim_data_file)
+
+    def test_unchanged_file(self):
+        """Test that nothing is changed if the file content is the same"""
+        quantities = dict(self.model.sim_quantities)
+        changes = tango_sim_generator.reload_device_model(
+            self.model, [self.sim_data_file]
+        )
+        self.assertFalse(any(changes.values()))
+        self.assertEqual(quantities, self.model.sim_quantities)
+
+    def test_changed_quantities_and_actions(self):
+        """Test that only the changed items are replaced, keeping quantity values"""
+        attributes = self.sim_data["dynamicAttributes"]
+        temperature = attributes[0]["basicAttributeData"]
+        temperature["dataSimulationParameters"]["mean"] = 30
+        removed_attribute = attributes.pop()["basicAttributeData"]["name"]
+        self.sim_data["commands"] = [
+            command
+            for command in self.sim_data["commands"]
+            if command["basicCommandData"]["name"] != "On"
+        ]
+        self._write_sim_data()
+
+        insolation = self.model.sim_quantities["insolation"]
+        self.model.sim_quantities["temperature"].set_val(40.0, self.model.time_func())
+        changes = tango_sim_generator.reload_device_model(
+            self.model, [self.sim_data_file]
+        )
+
+        self.assertEqual(changes["quantities_changed"], ["temperature"])
+        self.assertEqual(changes["quantities_removed"], [removed_attribute])
+        self.assertEqual(changes["actions_removed"], ["On"])
+        self.assertEqual(changes["quantities_added"], [])
+        self.assertNotIn(removed_attribute, self.model.sim_quantities)
+        self.assertNotIn("On", self.model.sim_actions)
+        self.assertIs(self.model.sim_quantities["insolation"], insolation)
+        temperature = self.model.sim_quantities["temperature"]
+        self.assertEqual(temperature.mean, 30.0)
+        self.assertEqual(temperature.last_val, 40.0)
+        self.assertEqual(self.model.quantity_state["temperature"][0], 40.0)
+        # The action handlers act on the running model.
+        self.model.sim_actions["SetTemperature"](data_input=10.0)
+        self.assertEqual(self.model.sim_quantities["temperature"].last_val, 10.0)
+
+    def test_reload_while_scenario_running(self):
+        """Test that the model is not updated while it is reloaded"""
+        attributes = self.sim_data["dynamicAttributes"]
+        removed_attribute = attributes.pop()
+        self._write_sim_data()
+        with self.model.update_lock:
+            reload_thread = threading.Thread(
+                target=tango_sim_generator.reload_device_model,
+                args=(self.model, [self.sim_data_file]),
+            )
+            reload_thread.start()
+            reload_thread.join(0.2)
+            # The reload waits for the update to finish.
+            self.assertTrue(reload_thread.is_alive())
+            self.assertIn("input-comms-ok", self.model.sim_quantities)
+        reload_thread.join(10)
+        self.assertNotIn("input-comms-ok", self.model.sim_quantities)
+
+        # A scenario keeps changing the model while attributes are removed and added.
+        start_time = self.model.time_func()
+        self.model.set_scenario(
+            Scenario(
+                [
+                    {
+                        "time": index * 0.001,
+                        "operation": "set",
+                        "quantities": {"temperature": {"mean": 20.0 + index % 5}},
+                    }
+                    for index in range(1000)
+                ],
+                start_time=start_time,
+            )
+        )
+        self.model.min_update_period = 0.0
+        self.model.logger = Mock()
+        errors = []
+        stop = threading.Event()
+
+        def run_scenario():
+            while not stop.is_set():
+                try:
+                    self.model.update()
+                except Exception as exc:
+                    errors.append(exc)
+
+        scenario_thread = threading.Thread(target=run_scenario)
+        scenario_thread.start()
+        try:
+            for _ in range(10):
+                attributes.append(removed_attribute)
+                self._write_sim_data()
+                tango_sim_generator.reload_device_model(self.model, [self.sim_data_file])
+                attributes.pop()
+                self._write_sim_data()
+                tango_sim_generator.reload_device_model(self.model, [self.sim_data_file])
+        finally:
+            stop.set()
+            scenario_thread.join()
+        self.assertEqual(errors, [])
+        self.model.logger.exception.assert_not_called()
+
+    @unittest.skipUnless(is_shared_state_supported(), "Needs Python 3.8 or later")
+    def test_reload_shared_quantity_state(self):
+        """Test that shared quantities can be removed and added again"""
+        self.addCleanup(self.model.unshare_quantity_state)
+        shared_state = self.model.share_quantity_state()
+        self.assertTrue(shared_state.is_shared("input-comms-ok"))
+        comms_ok_state = shared_state["input-comms-ok"]
+        attributes = self.sim_data["dynamicAttributes"]
+        removed_attribute = attributes.pop()
+        self._write_sim_data()
+        changes = tango_sim_generator.reload_device_model(
+            self.model, [self.sim_data_file]
+        )
+        self.assertEqual(changes["quantities_removed"], ["input-comms-ok"])
+        self.assertNotIn("input-comms-ok", self.model.sim_quantities)
+        self.assertIs(self.model.quantity_state, shared_state)
+        # The other processes still read the last value of the removed quantity.
+        reader = SharedQuantityState.attach(shared_state.name)
+        self.addCleanup(reader.close)
+        self.assertEqual(reader["input-comms-ok"], comms_ok_state)
+
+        attributes.append(removed_attribute)
+        self._write_sim_data()
+        changes = tango_sim_generator.reload_device_model(
+            self.model, [self.sim_data_file]
+        )
+        self.assertEqual(changes["quantities_added"], ["input-comms-ok"])
+        self.assertTrue(shared_state.is_shared("input-comms-ok"))
+        self.model.quantity_state["input-comms-ok"] = (True, 10.0)
+        self.assertEqual(reader["input-comms-ok"], (True, 10.0))
+
+
+class test_MultiDeviceFiles(unittest.TestCase):
+    """Test parsing description files that define several devices."""
+
+    def setUp(self):
+        super(test_MultiDeviceFiles, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def _config_file(self, file_name):
+        return pkg_resources.resource_filename(
+            "tango_simlib.tests.config_files", file_name
+        )
+
+    def _assert_parsers_equal(self, parser, expected_parser):
+        self.assertEqual(parser.device_class_name, expected_parser.device_class_name)
+        self.assertEqual(
+            parser.get_device_attribute_metadata(),
+            expected_parser.get_device_attribute_metadata(),
+        )
+        self.assertEqual(
+            parser.get_device_command_metadata(),
+            expected_parser.get_device_command_metadata(),
+        )
+        self.assertEqual(
+            parser.get_device_properties_metadata("deviceProperties"),
+            expected_parser.get_device_properties_metadata("deviceProperties"),
+        )
+
+    def _write_fgo_export(self, fgo_files):
+        multi_device_file = os.path.join(self.temp_dir, "devices.fgo")
+        with open(multi_device_file, "w") as export_file:
+            for device_name, fgo_file in zip(["sys/database/2", "sim/fgo/1"], fgo_files):
+                with open(fgo_file) as device_file:
+                    device_data = json.load(device_file)
+                device_data["name"] = device_name
+                export_file.write(json.dumps(device_data) + "\n")
+        return multi_device_file
+
+    def test_fgo_export(self):
+        """Test that each device of a fgo export gets a model of its own"""
+        fgo_files = [
+            self._config_file(file_name)
+            for file_name in ("database2.fgo", "Spectrum_Image.fgo")
+        ]
+        multi_device_file = self._write_fgo_export(fgo_files)
+
+        parsers = tango_sim_generator.get_device_parsers(multi_device_file)
+        self.assertEqual(list(parsers.keys()), ["sys/database/2", "sim/fgo/1"])
+        for parser, fgo_file in zip(parsers.values(), fgo_files):
+            self._assert_parsers_equal(
+                parser, tango_sim_generator.get_parser_instance(fgo_file)
+            )
+
+        models = tango_sim_generator.configure_multi_device_models(multi_device_file)
+        self.assertEqual(set(models.keys()), set(["DataBase", "FgoDevice"]))
+        self.assertEqual(list(models["DataBase"].keys()), ["sys/database/2"])
+        for class_models, fgo_file in zip(
+            (models["DataBase"], models["FgoDevice"]), fgo_files
+        ):
+            model = list(itervalues(class_models))[0]
+            expected_parser = tango_sim_generator.get_parser_instance(fgo_file)
+            self.assertEqual(
+                set(model.sim_quantities.keys()),
+                set(expected_parser.get_device_attribute_metadata().keys()),
+            )
+
+        models = tango_sim_generator.configure_multi_device_models(
+            multi_device_file, device_names=["sim/fgo/1"]
+        )
+        self.assertEqual(list(models.keys()), ["FgoDevice"])
+        with self.assertRaises(ValueError):
+            tango_sim_generator.configure_multi_device_models(
+                multi_device_file, device_names=["sim/fgo/2"]
+            )
+
+        models = tango_sim_generator.configure_device_models([multi_device_file])
+        self.assertEqual(sorted(models.keys()), ["sim/fgo/1", "sys/database/2"])
+
+    def test_multi_device_server(self):
+        """Test a device server of the devices of a fgo export"""
+        multi_device_file = self._write_fgo_export(
+            [
+                self._config_file(file_name)
+                for file_name in ("database2.fgo", "Spectrum_Image.fgo")
+            ]
+        )
+        tango_classes = tango_sim_generator.get_tango_device_servers([multi_device_file])
+        self.assertEqual(
+            [tango_class.TangoClassName for tango_class in tango_classes],
+            ["DataBase", "DataBaseSimControl", "FgoDevice", "FgoDeviceSimControl"],
+        )
+        tango_context = MultiDeviceTestContext(
+            [
+                {"class": tango_classes[0], "devices": [{"name": "sys/database/2"}]},
+                {"class": tango_classes[2], "devices": [{"name": "sim/fgo/1"}]},
+            ],
+            process=True,
+        )
+        with patch("tango_simlib.utilities.helper_module.get_database"):
+            tango_context.start()
+        self.addCleanup(tango_context.stop)
+        models = tango_sim_generator.configure_multi_device_models(multi_device_file)
+        for device_class, class_models in models.items():
+            ((device_name, model),) = class_models.items()
+            device = tango_context.get_device(device_name)
+            self.assertEqual(device.info().dev_class, device_class)
+            self.assertTrue(
+                set(model.sim_quantities).issubset(device.get_attribute_list())
+            )
+
+    def test_xmi_classes(self):
+        """Test that all the classes of a xmi file are parsed from one read"""
+        xmi_files = [self._config_file(f) for f in ("Weather.xmi", "multidevice.xmi")]
+        with open(xmi_files[0]) as xmi_file:
+            weather_xmi = xmi_file.read()
+        with open(xmi_files[1]) as xmi_file:
+            multidevice_xmi = xmi_file.read()
+        classes_start = multidevice_xmi.index("  <classes")
+        classes_end = multidevice_xmi.index("</pogoDsl")
+        classes_element = multidevice_xmi[classes_start:classes_end]
+        multi_class_file = os.path.join(self.temp_dir, "classes.xmi")
+        with open(multi_class_file, "w") as xmi_file:
+            xmi_file.write(
+                weather_xmi.replace("</pogoDsl", classes_element + "</pogoDsl")
+            )
+
+        parsers = tango_sim_generator.get_device_parsers(multi_class_file)
+        self.assertEqual(list(parsers.keys()), ["Weather", "MultiDeviceModel"])
+        for parser, xmi_file in zip(parsers.values(), xmi_files):
+            self._assert_parsers_equal(
+                parser, tango_sim_generator.get_parser_instance(xmi_file)
+            )
+
+
+class test_AttributeDefaultProperties(unittest.TestCase):
+    """Test the precomputed attribute default properties of a device class."""
+
+    def test_templates_match_attributes(self):
+        """Test that the template of each attribute has the attribute's properties."""
+        data_descr_file = pkg_resources.resource_filename(
+            "tango_simlib.tests.config_files", "Weather.xmi"
+        )
+        model = list(
+            itervalues(
+                tango_sim_generator.configure_device_models(
+                    [data_descr_file], "test/nodb/templates"
+                )
+            )
+        )[0]
+        templates = tango_sim_generator.get_attribute_default_properties_templates(
+            model
+        )
+        self.assertEqual(set(templates.keys()), set(model.sim_quantities.keys()))
+        for quantity_name, quantity in model.sim_quantities.items():
+            self.assertEqual(templates[quantity_name].label, quantity.meta["label"])
+            self.assertEqual(templates[quantity_name].unit, quantity.meta["unit"])
+            self.assertEqual(
+                templates[quantity_name].description, quantity.meta["description"]
+            )
+
+    def test_templates_are_shared(self):
+        """Test that attributes with the same common properties share a template."""
+        meta = {"unit": "V", "format": "%6.2f", "max_alarm": "10"}
+        model = Mock(
+            sim_quantities={
+                "channel1": Mock(meta=dict(meta, name="channel1")),
+                "channel2": Mock(meta=dict(meta, name="channel2")),
+                "channel3": Mock(meta=dict(meta, name="channel3", unit="mV")),
+                "channel4": Mock(
+                    meta=dict(
+                        meta,
+                        name="channel4",
+                        label="Channel 4",
+                        description="Voltage of channel 4",
+                    )
+                ),
+            }
+        )
+        templates = tango_sim_generator.get_attribute_default_properties_templates(
+            model
+        )
+        self.assertIs(templates["channel1"], templates["channel2"])
+        self.assertIsNot(templates["channel1"], templates["channel3"])
+        self.assertEqual(templates["channel1"].unit, "V")
+        self.assertEqual(templates["channel3"].unit, "mV")
+        # A copy of the common properties, with the specific ones set.
+        self.assertIsNot(templates["channel4"], templates["channel1"])
+        self.assertEqual(templates["channel4"].unit, "V")
+        self.assertEqual(templates["channel4"].max_alarm, "10")
+        self.assertEqual(templates["channel4"].label, "Channel 4")
+        self.assertEqual(templates["channel4"].description, "Voltage of channel 4")
+        self.assertEqual(templates["channel1"].label, "")
+
+
 class test_TangoSimGenerator(BaseTest.TangoSimGenDeviceIntegration):
     @classmethod
     def setUpClassWithCleanup(cls):
@@ -0,0 +1,174 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import json
+import unittest
+
+import pkg_resources
+
+from builtins import object
+from mock import patch
+from tango import DevState, Except
+
+from tango_simlib.utilities import testutils
+
+
+class test_DeviceTestContextPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.sim_data_files = [
+            pkg_resources.resource_filename(
+                "tango_simlib.tests.config_files", "Weather_SimDD.json"
+            )
+        ]
+        cls.pool = testutils.DeviceTestContextPool()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def acquire(self, **kwargs):
+        device = self.pool.acquire(self.sim_data_files, **kwargs)
+        self.addCleanup(self.pool.release, device)
+        return device
+
+    def test_devices_are_reused(self):
+        """Test that a released device is handed out again"""
+        device = self.pool.acquire(self.sim_data_files)
+        self.assertEqual(device.device.name(), "test/nodb/tangodeviceserver")
+        self.assertEqual(device.sim_control.name(), "test/nodb/tangodeviceservercontrol")
+        self.pool.release(device)
+        self.assertIs(self.acquire(), device)
+
+    def test_devices_in_use(self):
+        """Test that a device in use is not handed out again"""
+        device = self.acquire()
+        other_device = self.acquire()
+        self.assertIsNot(other_device, device)
+        self.assertEqual(other_device.device.name(), device.device.name())
+        renamed_device = self.acquire(device_name="test/pool/1")
+        self.assertEqual(renamed_device.device.name(), "test/pool/1")
+        for pooled_device in (device, other_device, renamed_device):
+            self.assertEqual(pooled_device.device.State(), DevState.ON)
+
+    def test_release_resets_device(self):
+        """Test that a released device is put back in its start-up state"""
+        device = self.pool.acquire(self.sim_data_files)
+        temperature = json.loads(device.sim_control.GetQuantityAttributes())[
+            "temperature"
+        ]
+        device.sim_control.SetQuantityAttributes(
+            json.dumps({"temperature": {"last_val": 100.0, "mean": 90.0}})
+        )
+        device.sim_control.pause_active = True
+        device.sim_control.SetFaultInjection(
+            json.dumps({"pressure": {"error_rate": 1.0}})
+        )
+        device.device.Off()
+        self.assertEqual(device.device.State(), DevState.OFF)
+        self.pool.release(device)
+
+        device = self.acquire()
+        self.assertEqual(
+            json.loads(device.sim_control.GetQuantityAttributes())["temperature"],
+            temperature,
+        )
+        self.assertFalse(device.sim_control.pause_active)
+        self.assertEqual(json.loads(device.sim_control.fault_injection_settings), {})
+        self.assertEqual(device.device.State(), DevState.ON)
+
+
+class FakeDeviceProxy(object):
+    """Device proxy that polls attributes as requested, failing the first request."""
+
+    def __init__(self):
+        self.poll_periods = {}
+        self.num_failures = 1
+
+    def polling_status(self):
+        return [
+            "Polled attribute name = {}\nPolling period (mS) = {}\n"
+            "Polling ring buffer depth = 10".format(attr, period)
+            for attr, period in self.poll_periods.items()
+        ]
+
+    def poll_attribute(self, attr, period):
+        if self.num_failures:
+            self.num_failures -= 1
+            Except.throw_exception("API_CommandFailed", "Busy", "poll_attribute")
+        self.poll_periods[attr] = period
+
+    def stop_poll_attribute(self, attr):
+        del self.poll_periods[attr]
+
+
+class test_AttributesPolling(unittest.TestCase):
+    def setUp(self):
+        self.pooled_device = testutils.get_pooled_device(
+            self,
+            [
+                pkg_resources.resource_filename(
+                    "tango_simlib.tests.config_files", "Weather_SimDD.json"
+                )
+            ],
+        )
+
+    def test_set_attributes_polling(self):
+        """Test setting the polling of a simulated device in one call"""
+        device = self.pooled_device.device
+        restore_polling = testutils.set_attributes_polling(
+            self,
+            device,
+            None,
+            {"temperature": 500, "wind-speed": 700},
+            sim_control=self.pooled_device.sim_control,
+        )
+        self.assertEqual(
+            testutils.get_attributes_polling(device),
+            {"temperature": 500, "wind-speed": 700},
+        )
+        testutils.set_attributes_polling(
+            self,
+            device,
+            None,
+            {"temperature": 0, "pressure": 900},
+            sim_control=self.pooled_device.sim_control,
+        )
+        self.assertEqual(
+            testutils.get_attributes_polling(device),
+            {"wind-speed": 700, "pressure": 900},
+        )
+        restore_polling()
+        self.assertEqual(testutils.get_attributes_polling(device), {"pressure": 900})
+
+    def test_set_attributes_polling_per_attribute(self):
+        """Test setting the polling of a device with a call per attribute"""
+        device = self.pooled_device.device
+        restore_polling = testutils.set_attributes_polling(
+            self, device, None, {"temperature": 500, "pressure": 700}
+        )
+        self.assertEqual(
+            testutils.get_attributes_polling(device),
+            {"temperature": 500, "pressure": 700},
+        )
+        restore_polling()
+        self.assertEqual(testutils.get_attributes_polling(device), {})
+
+    def test_retry(self):
+        """Test that only failed requests are retried, after a delay"""
+        device = FakeDeviceProxy()
+        with patch("tango_simlib.utilities.testutils.time.sleep") as sleep:
+            testutils.apply_attributes_polling(device, {"temperature": 500})
+        self.assertEqual(device.poll_periods, {"temperature": 500})
+        sleep.assert_called_once_with(testutils.POLLING_RETRY_DELAY)
+        with patch("tango_simlib.utilities.testutils.time.sleep") as sleep:
+            testutils.apply_attributes_polling(device, {"temperature": 0})
+        self.assertEqual(device.poll_periods, {})
+        sleep.assert_not_called()
@@ -0,0 +1,206 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import unittest
+
+import numpy as np
+
+from mock import Mock, patch
+
+from tango_simlib import model, quantities
+from tango_simlib.update_engine import UpdateEngine
+
+
+class Counter(quantities.Quantity):
+    def next_val(self, t):
+        self.last_val += 1
+        self.last_update_time = t
+        return self.last_val
+
+
+class EngineModel(model.Model):
+    def setup_sim_quantities(self):
+        self.sim_quantities["temperature"] = quantities.GaussianSlewLimited(
+            mean=30.0,
+            std_dev=0.0,
+            max_slew_rate=1.0,
+            start_time=self.start_time,
+            meta={},
+        )
+        self.sim_quantities["humidity"] = quantities.GaussianSlewLimited(
+            mean=80.0,
+            std_dev=0.0,
+            max_bound=60.0,
+            start_time=self.start_time,
+            meta={},
+        )
+        self.sim_quantities["spectrum"] = quantities.ConstantQuantity(
+            start_value=[1, 2, 3], start_time=self.start_time, meta={}
+        )
+        self.sim_quantities["count"] = Counter(
+            start_value=0, start_time=self.start_time, meta={}
+        )
+        super(EngineModel, self).setup_sim_quantities()
+
+
+class test_UpdateEngine(unittest.TestCase):
+    def setUp(self):
+        self.time_func = Mock(return_value=100.0)
+        self.engine = UpdateEngine(np.random.RandomState(1))
+        self.models = [
+            EngineModel(
+                "engine_model_{}".format(index),
+                time_func=self.time_func,
+                min_update_period=0.5,
+            )
+            for index in range(3)
+        ]
+        for sim_model in self.models:
+            sim_model.sim_quantities["temperature"].last_val = 20.0
+            self.engine.add_model(sim_model)
+
+    def test_models_stepped_together(self):
+        """Test that updating one model steps all the models of the engine"""
+        self.assertEqual(self.engine.models, self.models)
+        self.time_func.return_value = 102.0
+        self.models[0].update()
+        for sim_model in self.models:
+            self.assertEqual(sim_model.last_update_time, 102.0)
+            temperature = sim_model.sim_quantities["temperature"]
+            # Slew limited to 1 per second.
+            self.assertEqual(temperature.last_val, 22.0)
+            self.assertEqual(temperature.last_update_time, 102.0)
+            self.assertEqual(sim_model.quantity_state["temperature"], (22.0, 102.0))
+            # Clipped to the maximum bound.
+            self.assertEqual(sim_model.quantity_state["humidity"], (60.0, 102.0))
+            self.assertEqual(sim_model.quantity_state["spectrum"], ([1, 2, 3], 102.0))
+            self.assertEqual(sim_model.quantity_state["count"], (1, 102.0))
+
+    def test_same_values_as_model_update(self):
+        """Test that the engine steps the quantities like Model.update does"""
+        own_model = EngineModel(
+            "own_model", time_func=self.time_func, min_update_period=0.5
+        )
+        own_model.sim_quantities["temperature"].last_val = 20.0
+        for sim_time in (100.5, 101.0, 104.0):
+            self.time_func.return_value = sim_time
+            own_model.update()
+            self.engine.tick()
+            self.assertEqual(own_model.quantity_state, self.models[0].quantity_state)
+
+    def test_not_due_models(self):
+        """Test that paused or recently updated models are not stepped"""
+        self.models[1].paused = True
+        self.time_func.return_value = 100.2
+        self.assertEqual(self.engine.tick(), 0)
+        self.time_func.return_value = 101.0
+        self.assertEqual(self.engine.tick(), 2)
+        self.assertEqual(self.models[1].quantity_state["count"], (0, 100.0))
+
+    def test_overrides_run_around_the_pass(self):
+        """Test that the post-update overrides see all the models stepped"""
+        calls = []
+
+        def pre_update(sim_model, sim_time, dt):
+            calls.append(("pre", sim_model.name, dt))
+
+        def post_update(sim_model, sim_time, dt):
+            calls.append(
+                ("post", sim_model.name, self.models[-1].quantity_state["count"][0])
+            )
+
+        for sim_model in self.models:
+            sim_model.override_pre_updates.append(pre_update)
+            sim_model.override_post_updates.append(post_update)
+        self.time_func.return_value = 101.0
+        self.engine.tick()
+        names = [sim_model.name for sim_model in self.models]
+        self.assertEqual(
+            calls,
+            [("pre", name, 1.0) for name in names]
+            + [("post", name, 1) for name in names],
+        )
+
+    def test_remove_model(self):
+        """Test that a removed model is stepped on its own again"""
+        self.engine.remove_model(self.models[0])
+        self.assertEqual(self.engine.models, self.models[1:])
+        self.time_func.return_value = 101.0
+        self.models[0].update()
+        self.assertEqual(self.models[0].last_update_time, 101.0)
+        self.assertEqual(self.models[1].last_update_time, 100.0)
+
+    def test_model_replaced(self):
+        """Test that a model replaces the model of the same name"""
+        new_model = EngineModel("engine_model_1", time_func=self.time_func)
+        self.engine.add_model(new_model)
+        self.assertEqual(self.engine.models, [self.models[0], new_model, self.models[2]])
+        self.assertIsNone(self.models[1].update_engine)
+
+    def test_layout_kept(self):
+        """Test that the quantities are only gathered again when they change"""
+        self.time_func.return_value = 101.0
+        self.engine.tick()
+        layout = self.engine._layout
+        # Values set directly are still read at every tick.
+        self.models[0].sim_quantities["temperature"].set_val(10.0, 101.0)
+        self.time_func.return_value = 102.0
+        self.engine.tick()
+        self.assertIs(self.engine._layout, layout)
+        self.assertEqual(self.models[0].quantity_state["temperature"], (11.0, 102.0))
+
+        self.models[1].set_quantity_attributes({"humidity": {"max_bound": 70.0}})
+        self.assertIsNone(self.engine._layout)
+        self.time_func.return_value = 103.0
+        self.engine.tick()
+        self.assertEqual(self.models[1].quantity_state["humidity"], (70.0, 103.0))
+        self.assertEqual(self.models[0].quantity_state["humidity"], (60.0, 103.0))
+
+    def test_settings_set_directly(self):
+        """Test that settings set directly, e.g. by an override, are used at once"""
+        self.time_func.return_value = 101.0
+        self.engine.tick()
+        humidity = self.models[0].sim_quantities["humidity"]
+        humidity.mean = 40.0
+        humidity.max_slew_rate = 5.0
+        self.time_func.return_value = 102.0
+        self.engine.tick()
+        self.assertEqual(self.models[0].quantity_state["humidity"], (55.0, 102.0))
+        self.assertEqual(self.models[1].quantity_state["humidity"], (60.0, 102.0))
+        humidity.max_bound = 45.0
+        self.time_func.return_value = 103.0
+        self.engine.tick()
+        self.assertEqual(self.models[0].quantity_state["humidity"], (45.0, 103.0))
+
+    def test_quantities_replaced(self):
+        """Test that the quantities of a reloaded model are stepped"""
+        self.time_func.return_value = 101.0
+        self.engine.tick()
+        new_model = EngineModel("new_model", time_func=self.time_func)
+        new_model.sim_quantities["pressure"] = quantities.GaussianSlewLimited(
+            mean=500.0, std_dev=0.0, start_time=100.0, meta={"unit": "mbar"}
+        )
+        self.models[0].update_from_model(new_model)
+        self.time_func.return_value = 102.0
+        self.engine.tick()
+        self.assertEqual(self.models[0].quantity_state["pressure"], (500.0, 102.0))
+
+    def test_array_values(self):
+        """Test that a Gaussian quantity with an array value is stepped on its own"""
+        self.models[0].sim_quantities["temperature"].set_val([20.0, 21.0], 100.0)
+        self.time_func.return_value = 101.0
+        with patch.object(self.models[0].logger, "exception") as log_exception:
+            self.assertEqual(self.engine.tick(), 3)
+        # Stepped, and failing, like in Model.update.
+        log_exception.assert_called_once_with(
+            "Exception in update loop of quantity %s", "temperature"
+        )
+        self.assertEqual(self.models[0].quantity_state["humidity"], (60.0, 101.0))
+        self.assertEqual(self.models[1].quantity_state["temperature"], (21.0, 101.0))
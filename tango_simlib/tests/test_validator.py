@@ -1,9 +1,35 @@
 """Various tests for the validation logic"""
 from __future__ import absolute_import, division, print_function
 
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
 import yaml
 
-from tango_simlib.utilities.validate_device import compare_data, MINIMAL_SPEC_FORMAT
+from mock import patch
+
+from tango_simlib.tango_yaml_tools.main import _validate_device
+from tango_simlib.utilities.specification_diff import (
+    CHANGED,
+    Difference,
+    EXTRA,
+    MISSING,
+    dump_binary,
+    format_differences,
+    load_binary,
+)
+from tango_simlib.utilities.validate_device import (
+    compare_data,
+    expand_specification_paths,
+    get_difference_records,
+    get_differences,
+    load_specification,
+    validate_devices,
+    MINIMAL_SPEC_FORMAT,
+)
 
 YAML_A = """
 class: DishMaster_A
@@ -424,3 +450,148 @@ def test_invalid_spec():
             assert str(err) == "`name` field is required for all {}".format(key)
         else:
             assert 0, "AssertionError not raised for invalid spec format"
+
+
+def test_load_specification():
+    """Test that a specification is parsed once and not changed by comparisons"""
+    spec_yaml = MINIMAL_SPEC_FORMAT.replace("class:", "class: DishMaster_B")
+    specification_data = load_specification(spec_yaml)
+    assert specification_data == {
+        "class": "DishMaster_B",
+        "meta": {"attributes": [], "commands": [], "properties": []},
+    }
+    assert load_specification(str(spec_yaml)) is specification_data
+
+    tango_device_data = yaml.safe_load(YAML_B)
+    assert get_differences(spec_yaml, tango_device_data, False) == []
+    assert len(get_differences(spec_yaml, tango_device_data, True)) == 3
+    assert load_specification(spec_yaml) == {
+        "class": "DishMaster_B",
+        "meta": {"attributes": [], "commands": [], "properties": []},
+    }
+
+
+def test_difference_records():
+    """Test the typed records that the validation messages are built from"""
+    records = get_difference_records(YAML_A, yaml.safe_load(YAML_B), True)
+    assert "\n".join(format_differences(records)) == compare_data(YAML_A, YAML_B, True)
+    assert records[0] == Difference(
+        "class_changed", "class", None, None, "DishMaster_A", "DishMaster_B"
+    )
+    assert Difference(MISSING, "command", "ClearTaskHistory_A", None, None, None) in (
+        records
+    )
+    assert Difference(EXTRA, "command", "ClearTaskHistory_B", None, None, None) in (
+        records
+    )
+    assert (
+        Difference(
+            CHANGED, "command", "Capture", "disp_level", "OPERATOR_A", "OPERATOR_B"
+        )
+        in records
+    )
+    assert not [record for record in records if record.name == "OtherCommand"]
+    assert not [
+        record
+        for record in get_difference_records(YAML_A, yaml.safe_load(YAML_B), False)
+        if record.kind == EXTRA
+    ]
+
+    records_data = [record.to_dict() for record in records]
+    assert json.loads(json.dumps(records_data)) == records_data
+    assert [Difference.from_dict(record) for record in records_data] == records
+    assert load_binary(dump_binary(records)) == records_data
+    try:
+        load_binary(b"not a report")
+    except ValueError:
+        pass
+    else:
+        assert 0, "ValueError not raised for invalid binary report"
+
+
+def get_device_data(tango_device_name):
+    """Describe devices of the class DishMaster_A as YAML_A and others as YAML_B"""
+    if tango_device_name.startswith("error"):
+        raise RuntimeError("Device {} is not exported".format(tango_device_name))
+    return yaml.safe_load(YAML_A if tango_device_name.startswith("a/") else YAML_B)
+
+
+@patch("tango_simlib.utilities.validate_device.get_device_data", get_device_data)
+def test_validate_devices():
+    """Test validating many devices against the specification of their class"""
+    results = validate_devices(
+        ["a/dish/1", "b/dish/1", "error/dish/1", "a/dish/2"],
+        [("a.yaml", YAML_A), ("b.yaml", YAML_B)],
+        True,
+        max_workers=2,
+    )
+    assert [result["device"] for result in results] == [
+        "a/dish/1",
+        "b/dish/1",
+        "error/dish/1",
+        "a/dish/2",
+    ]
+    for result in results[:2] + results[3:]:
+        assert result["status"] == "passed"
+        assert result["differences"] == []
+        assert result["error"] is None
+    assert results[0]["specification"] == "a.yaml"
+    assert results[1]["specification"] == "b.yaml"
+    assert results[2]["status"] == "error"
+    assert results[2]["error"] == "Device error/dish/1 is not exported"
+
+    # A single specification is used for every device
+    results = validate_devices(["a/dish/1", "b/dish/1"], [("a.yaml", YAML_A)], True)
+    assert [result["status"] for result in results] == ["passed", "failed"]
+    assert results[1]["specification"] == "a.yaml"
+    assert "\n".join(results[1]["differences"]) == compare_data(YAML_A, YAML_B, True)
+
+    # Devices of a class without specification are reported
+    results = validate_devices(
+        ["b/dish/1"], [("a.yaml", YAML_A), ("c.yaml", YAML_A.replace("_A", "_C"))], True
+    )
+    assert results[0]["status"] == "error"
+    assert results[0]["error"] == "No specification for class DishMaster_B"
+
+
+@patch("tango_simlib.utilities.validate_device.get_device_data", get_device_data)
+def test_validate_command():
+    """Test the combined report of the validate command"""
+    spec_dir = tempfile.mkdtemp()
+    try:
+        for name, spec in [("a.yaml", YAML_A), ("b.yaml", YAML_B)]:
+            with open(os.path.join(spec_dir, name), "w") as spec_file:
+                spec_file.write(spec)
+        spec_paths = [os.path.join(spec_dir, "a.yaml"), os.path.join(spec_dir, "b.yaml")]
+        assert expand_specification_paths([os.path.join(spec_dir, "*.yaml")]) == (
+            spec_paths
+        )
+
+        args = argparse.Namespace(
+            tango_device_names=["a/dish/1", "b/dish/1", "error/dish/1"],
+            path=[os.path.join(spec_dir, "*.yaml")],
+            url=None,
+            bidirectional=False,
+            workers=4,
+            cache_dir=None,
+            no_cache=False,
+            json=True,
+            binary_report=os.path.join(spec_dir, "report.bin"),
+        )
+        result, exit_code = _validate_device(args)
+        assert exit_code == 1
+        report = json.loads(result)
+        with open(args.binary_report, "rb") as report_file:
+            assert load_binary(report_file.read()) == report
+        assert report["summary"] == {"devices": 3, "passed": 2, "failed": 0, "error": 1}
+        assert [device["specification"] for device in report["devices"]] == (
+            spec_paths + [None]
+        )
+
+        args.tango_device_names = ["a/dish/1", "b/dish/1"]
+        args.json = False
+        result, exit_code = _validate_device(args)
+        assert exit_code == 0
+        assert result.splitlines()[-1] == "2 devices: 2 passed, 0 failed, 0 errors"
+    finally:
+        shutil.rmtree(spec_dir)
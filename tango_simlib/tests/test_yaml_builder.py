@@ -14,7 +14,9 @@ from pathlib import Path
 import yaml
 import tango
 
+from tango_simlib.tango_yaml_tools.base import TangoToYAML
 from tango_simlib.tango_yaml_tools.main import _build_yaml
+from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
 
 CONF_FILE_PATH = Path.joinpath(Path(__file__).parent, "config_files")
 
@@ -271,3 +273,7 @@ def test_tango_device_builder():
             {"name": "PropA"},
             {"name": "PropB"},
         ], "Properties config mismatch. properties: {}.".format(properties)
+
+        # The data compared during validation is the same, without the YAML round-trip
+        tango_data = TangoToYAML(TangoDeviceParser).build_data_from_device("a/b/c")
+        assert tango_data == parsed_yaml[0]
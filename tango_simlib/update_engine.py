@@ -0,0 +1,304 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Step the models of all the devices of a server together.
+
+A server simulating many similar devices, e.g. one per receptor, otherwise steps each
+device model on its own, with a Python call per quantity. The :class:`UpdateEngine`
+computes the next values of the :class:`quantities.GaussianSlewLimited` quantities of
+all its models with a few numpy operations per tick.
+
+"""
+
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import logging
+import numbers
+import threading
+import time
+from builtins import object
+
+import numpy as np
+
+from tango_simlib.quantities import ConstantQuantity, GaussianSlewLimited
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+# The GaussianSlewLimited settings read into arrays at each tick, in column order.
+GAUSSIAN_SETTINGS = ("mean", "std_dev", "max_slew_rate", "min_bound", "max_bound")
+
+
+class UpdateEngine(object):
+    """Step several models in one pass.
+
+    A model is added with :meth:`add_model`, after which its :meth:`model.Model.update`
+    calls :meth:`tick`, so all the models of the engine are stepped whenever one of
+    them is, e.g. when any of the devices is read.
+
+    The quantities stay the reference for the values and settings, so the simulator
+    controller, scenarios and overrides work as before, even when they set them
+    directly. The quantities are sorted by how they are stepped once, and again only
+    after the models or their quantities change, see :meth:`invalidate`. Each tick
+    reads the settings and last values of the Gaussian quantities into an array,
+    computes all their next values at once and writes them back. The constant
+    quantities are not recomputed and the other quantity types, and Gaussian
+    quantities with array values, are stepped with their own `next_val` method.
+
+    Parameters
+    ----------
+    random_state : numpy.random.RandomState instance
+        Source of the Gaussian values.
+
+    """
+
+    def __init__(self, random_state=None):
+        self.random_state = random_state or np.random.RandomState()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        # Ordered by name, see `models`.
+        self._models = []
+        # The quantities of the models gathered for the ticks, see `_get_layout`.
+        self._layout = None
+
+    @property
+    def models(self):
+        """The models stepped by the engine, ordered by name."""
+        return list(self._models)
+
+    def add_model(self, model):
+        """Step `model` with the other models of the engine.
+
+        It replaces a model of the same name, as in the model registry.
+
+        """
+        with self._lock:
+            models = []
+            for other_model in self._models:
+                if other_model.name != model.name:
+                    models.append(other_model)
+                elif other_model is not model:
+                    other_model.update_engine = None
+            models.append(model)
+            self._models = sorted(models, key=lambda model: model.name)
+            model.update_engine = self
+            self._layout = None
+
+    def remove_model(self, model):
+        """Step `model` on its own again."""
+        with self._lock:
+            if model.update_engine is self:
+                model.update_engine = None
+                self._models = [
+                    other_model
+                    for other_model in self._models
+                    if other_model is not model
+                ]
+                self._layout = None
+
+    def invalidate(self):
+        """Gather the quantities of the models again at the next tick.
+
+        Called by the models when their quantities are replaced or their settings
+        change, see :meth:`model.Model.set_quantity_attributes`.
+
+        """
+        self._layout = None
+
+    def tick(self):
+        """Step all the models of the engine that are due for an update.
+
+        The pre-update overrides of all the models run first, then the quantities of
+        all the models are stepped, then the post-update overrides run.
+
+        Returns
+        -------
+        num_updated : int
+            Number of models updated.
+
+        """
+        # Ticks from several devices at once would only step the models once anyway.
+        with self._lock:
+            locked_models = []
+            due_models = []
+            try:
+                # Always locked in name order, so that ticks cannot deadlock.
+                for index, model in enumerate(self._models):
+                    model.update_lock.acquire()
+                    locked_models.append(model)
+                    update_times = model.start_update()
+                    if update_times is not None:
+                        due_models.append((index, model, update_times))
+                if due_models:
+                    self._step_quantities(due_models)
+                for _, model, (sim_time, dt) in due_models:
+                    model.finish_update(sim_time, dt)
+            finally:
+                for model in reversed(locked_models):
+                    model.update_lock.release()
+        return len(due_models)
+
+    def _get_layout(self):
+        """The quantities of the models, by how they are stepped.
+
+        Returns
+        -------
+        layout : dict
+            "gaussians": the (model index, name, quantity) of the Gaussian quantities
+            with scalar values, "model_indices": their model indices as an array, and
+            "constants" and "others": the (name, quantity) of the constant and other
+            quantities of each model.
+
+        """
+        layout = self._layout
+        if layout is not None:
+            return layout
+        gaussians = []
+        constants = []
+        others = []
+        for index, model in enumerate(self._models):
+            constants.append([])
+            others.append([])
+            for name, quantity in model.sim_quantities.items():
+                quantity_type = type(quantity)
+                if quantity_type is GaussianSlewLimited and all(
+                    isinstance(getattr(quantity, attribute), numbers.Real)
+                    for attribute in GAUSSIAN_SETTINGS + ("last_val",)
+                ):
+                    gaussians.append((index, name, quantity))
+                elif quantity_type is ConstantQuantity:
+                    constants[index].append((name, quantity))
+                else:
+                    others[index].append((name, quantity))
+        layout = self._layout = {
+            "gaussians": gaussians,
+            "model_indices": np.array([index for index, _, _ in gaussians], dtype=int),
+            "constants": constants,
+            "others": others,
+        }
+        return layout
+
+    def _step_quantities(self, due_models):
+        layout = self._get_layout()
+        is_due = np.zeros(len(self._models), dtype=bool)
+        sim_times = np.zeros(len(self._models))
+        for index, _, (sim_time, _) in due_models:
+            is_due[index] = True
+            sim_times[index] = sim_time
+        # The settings and last values are read each tick, as attribute writes,
+        # scenario actions and overrides set them directly, e.g. with
+        # `quantities.Quantity.set_val`.
+        try:
+            rows, settings, last_values = self._get_gaussian_state(layout, is_due)
+        except (TypeError, ValueError):
+            # A Gaussian quantity was given an array value, it is stepped on its own.
+            self._layout = None
+            layout = self._get_layout()
+            rows, settings, last_values = self._get_gaussian_state(layout, is_due)
+
+        for index, model, (sim_time, _) in due_models:
+            state = model._sim_state
+            for name, quantity in layout["constants"][index]:
+                state[name] = (quantity.last_val, sim_time)
+            for name, quantity in layout["others"][index]:
+                try:
+                    state[name] = (quantity.next_val(sim_time), sim_time)
+                except Exception:
+                    model.logger.exception(
+                        "Exception in update loop of quantity %s", name
+                    )
+        if not len(rows):
+            return
+        model_indices = layout["model_indices"][rows]
+        gaussian_times = sim_times[model_indices]
+        values = self._get_gaussian_values(settings, last_values, gaussian_times)
+        states = {index: model._sim_state for index, model, _ in due_models}
+        gaussians = layout["gaussians"]
+        for row, value, sim_time in zip(
+            rows.tolist(), values.tolist(), gaussian_times.tolist()
+        ):
+            index, name, quantity = gaussians[row]
+            quantity.last_val = value
+            quantity.last_update_time = sim_time
+            states[index][name] = (value, sim_time)
+
+    def _get_gaussian_state(self, layout, is_due):
+        """The rows of the Gaussian quantities of the due models, and their state.
+
+        Returns
+        -------
+        rows : numpy.ndarray
+            Indices into the "gaussians" of `layout`.
+        settings : numpy.ndarray
+            The GAUSSIAN_SETTINGS of each row.
+        last_values : numpy.ndarray
+            The last value and update time of each row.
+
+        """
+        rows = np.flatnonzero(is_due[layout["model_indices"]])
+        gaussians = layout["gaussians"]
+        state = np.array(
+            [
+                (
+                    quantity.mean,
+                    quantity.std_dev,
+                    quantity.max_slew_rate,
+                    quantity.min_bound,
+                    quantity.max_bound,
+                    quantity.last_val,
+                    quantity.last_update_time,
+                )
+                for _, _, quantity in (gaussians[row] for row in rows.tolist())
+            ],
+            dtype=float,
+        ).reshape(len(rows), len(GAUSSIAN_SETTINGS) + 2)
+        num_settings = len(GAUSSIAN_SETTINGS)
+        return rows, state[:, :num_settings], state[:, num_settings:]
+
+    def _get_gaussian_values(self, settings, last_values, sim_times):
+        """Vectorised version of :meth:`quantities.GaussianSlewLimited.next_val`."""
+        mean, std_dev, max_slew_rate, min_bound, max_bound = settings.T
+        last_val, last_time = last_values.T
+        new_val = mean + std_dev * self.random_state.standard_normal(len(mean))
+        delta = new_val - last_val
+        # fmin ignores the NaN of an infinite slew rate over no time, like min does.
+        max_slew = max_slew_rate * (sim_times - last_time)
+        val = last_val + np.sign(delta) * np.fmin(np.abs(delta), max_slew)
+        return np.maximum(np.minimum(val, max_bound), min_bound)
+
+    def start(self, period):
+        """Tick the engine in a background thread every `period` seconds."""
+        self.stop()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(period,), name="UpdateEngine"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread started by :meth:`start`."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, period):
+        next_tick = time.time()
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                MODULE_LOGGER.exception("Exception in update engine tick")
+            next_tick += period
+            self._stop.wait(max(0.0, next_tick - time.time()))
+
+
+# The engine of the generated device servers, see the `shared_update_engine` device
+# property of the generated device class.
+update_engine = UpdateEngine()
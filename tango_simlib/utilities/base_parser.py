@@ -33,6 +33,7 @@ class Parser(with_metaclass(abc.ABCMeta, object)):
         self._device_attributes = {}
         self._device_commands = {}
         self._device_properties = {}
+        self._device_fault_injection = {}
 
     @abc.abstractmethod
     def parse(self, data_file):
@@ -53,3 +54,18 @@ class Parser(with_metaclass(abc.ABCMeta, object)):
     @abc.abstractmethod
     def get_device_cmd_override_metadata(self):
         pass
+
+    def get_device_fault_injection_metadata(self):
+        """Returns the latency and error injection settings of the device.
+
+        Only the SimDD files describe faults.
+
+        e.g.
+            {
+                '<attribute-or-command-name>': {
+                    'latency': {'distribution': 'uniform', 'min': 0.1, 'max': 0.5},
+                    'error_rate': 0.01,
+                }
+            }
+        """
+        return self._device_fault_injection
@@ -0,0 +1,306 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""
+This module keeps checking the conformance of running Tango devices against their
+specifications, and reports when it changes.
+
+The devices are interrogated in full once, and their proxies kept open. After that
+each poll queries the interface elements that can change while a device runs, with
+one query per group: the configuration of all the attributes, the commands and the
+property names. A fingerprint of each group of elements is kept, so that a device
+is only validated again when one of its groups changed.
+"""
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from tango_simlib.tango_yaml_tools.base import TangoToYAML
+from tango_simlib.utilities.specification_diff import Difference, format_differences
+from tango_simlib.utilities.validate_device import (
+    DEFAULT_MAX_WORKERS,
+    get_error_result,
+    get_validation_result,
+    index_specifications,
+)
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+# The interface elements that can change while a device runs.
+INTERFACE_GROUPS = ("attributes", "commands", "properties")
+# Seconds between the polls of the devices.
+DEFAULT_INTERVAL = 60.0
+
+
+def get_fingerprint(data):
+    """A fingerprint of parsed interface data, which changes when the data does.
+
+    Parameters
+    ----------
+    data : dict
+        E.g. the attributes parsed from a device, by name
+
+    Returns
+    -------
+    str
+
+    """
+    return hashlib.sha1(
+        json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class WatchedDevice(object):
+    """A device whose proxy is kept open, with the fingerprints of its interface.
+
+    Parameters
+    ----------
+    tango_device_name : str
+        Tango device name in the domain/family/member format or the
+        FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member
+
+    """
+
+    def __init__(self, tango_device_name):
+        self.name = tango_device_name
+        self.result = None
+        self.fingerprints = {}
+        self._builder = None
+
+    @property
+    def connected(self):
+        return self._builder is not None
+
+    def connect(self):
+        """Interrogate the device in full and keep its proxy open."""
+        # Only import tango when a device is accessed.
+        from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
+
+        builder = TangoToYAML(TangoDeviceParser)
+        builder.parser.parse(self.name)
+        self._builder = builder
+        self.fingerprints = {
+            group: get_fingerprint(builder.parser.data_dict["meta"][group])
+            for group in INTERFACE_GROUPS
+        }
+
+    def disconnect(self):
+        """Drop the proxy, so that the device is interrogated in full again."""
+        self._builder = None
+
+    def refresh(self):
+        """Query the interface elements of the device again.
+
+        Each group is fetched with one query: `attribute_list_query_ex` for the
+        configuration of all the attributes, `get_command_config` for the commands
+        and `get_property_list` for the property names.
+
+        Returns
+        -------
+        list of str
+            The INTERFACE_GROUPS that changed since they were last queried
+
+        """
+        parser = self._builder.parser
+        changed_groups = []
+        for group in INTERFACE_GROUPS:
+            getattr(parser, "parse_" + group)()
+            fingerprint = get_fingerprint(parser.data_dict["meta"][group])
+            if fingerprint != self.fingerprints[group]:
+                self.fingerprints[group] = fingerprint
+                changed_groups.append(group)
+        return changed_groups
+
+    def get_data(self):
+        """The specification of the device as last queried, see `get_device_data`."""
+        return self._builder.build_data()
+
+    def update(self, result, groups):
+        """Record a new validation result of the device.
+
+        Parameters
+        ----------
+        result : dict
+            The validation result, see `validate_devices`
+        groups : list of str
+            The interface groups that changed, None after a full interrogation
+
+        Returns
+        -------
+        dict or None
+            The event to report, the result with the keys "groups", "time", "new"
+            and "resolved" (the difference records that appeared and disappeared)
+            added, or None if the conformance of the device did not change
+
+        """
+        previous = self.result
+        self.result = result
+        previous_records = previous["records"] if previous else []
+        new = [record for record in result["records"] if record not in previous_records]
+        resolved = [
+            record for record in previous_records if record not in result["records"]
+        ]
+        if (
+            previous
+            and previous["status"] == result["status"]
+            and previous["error"] == result["error"]
+            and not new
+            and not resolved
+        ):
+            return None
+        event = dict(
+            result, groups=groups, time=time.time(), new=new, resolved=resolved
+        )
+        return event
+
+
+class ConformanceWatcher(object):
+    """Keep checking the conformance of Tango devices against their specifications.
+
+    Parameters
+    ----------
+    tango_device_names : list of str
+        Tango device names in the domain/family/member format or the
+        FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member
+    specifications : list of tuple
+        (source, specification in YAML format) for each specification. When there is
+        more than one, each device is checked against the specification of its class.
+    bidirectional : bool
+        Whether to include details on the device that is not in the specification
+    max_workers : int
+        The maximum number of devices queried at the same time
+
+    """
+
+    def __init__(
+        self,
+        tango_device_names,
+        specifications,
+        bidirectional,
+        max_workers=DEFAULT_MAX_WORKERS,
+    ):
+        self.specifications_by_class = index_specifications(specifications)
+        self.bidirectional = bidirectional
+        self.max_workers = max_workers
+        self.devices = [WatchedDevice(name) for name in tango_device_names]
+
+    def poll(self):
+        """Check every device once.
+
+        Devices that are not connected yet, or that failed, are interrogated in full.
+        For the others the interface elements are queried again, see
+        `WatchedDevice.refresh`, and they are only validated again if some changed.
+
+        Returns
+        -------
+        list of dict
+            The events of the devices whose conformance changed, see
+            `WatchedDevice.update`. The first poll reports every device.
+
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            events = list(executor.map(self._check, self.devices))
+        return [event for event in events if event]
+
+    def _check(self, device):
+        changed_groups = None
+        try:
+            if device.connected:
+                changed_groups = device.refresh()
+                if not changed_groups:
+                    return None
+            else:
+                device.connect()
+            result = get_validation_result(
+                device.name,
+                device.get_data(),
+                self.specifications_by_class,
+                self.bidirectional,
+            )
+        except Exception as exc:
+            MODULE_LOGGER.debug("Checking device %s failed", device.name, exc_info=True)
+            device.disconnect()
+            result = get_error_result(device.name, exc)
+        return device.update(result, changed_groups)
+
+    def watch(self, report, interval=DEFAULT_INTERVAL, iterations=None):
+        """Poll the devices at an interval, reporting the events as they happen.
+
+        Parameters
+        ----------
+        report : callable
+            Called with each event, see `WatchedDevice.update`
+        interval : float
+            Seconds between the starts of the polls
+        iterations : int
+            The number of polls, by default until interrupted
+
+        """
+        iteration = 0
+        while iterations is None or iteration < iterations:
+            start_time = time.time()
+            for event in self.poll():
+                report(event)
+            iteration += 1
+            if iterations is None or iteration < iterations:
+                time.sleep(max(0.0, interval - (time.time() - start_time)))
+
+
+def format_event(event):
+    """Describe an event of `ConformanceWatcher` in human readable messages.
+
+    Parameters
+    ----------
+    event : dict
+
+    Returns
+    -------
+    list of str
+
+    """
+    prefix = time.strftime("[%Y-%m-%d %H:%M:%S] ", time.localtime(event["time"]))
+    if event["status"] == "error":
+        return [
+            prefix
+            + "Device {} could not be validated: {}".format(
+                event["device"], event["error"]
+            )
+        ]
+    lines = []
+    if event["status"] == "passed":
+        lines.append(
+            prefix
+            + "No differences between device {} and specification {}".format(
+                event["device"], event["specification"]
+            )
+        )
+    elif event["new"]:
+        lines.append(
+            prefix
+            + "Device {} differs from specification {}:".format(
+                event["device"], event["specification"]
+            )
+        )
+        lines.extend(
+            format_differences([Difference.from_dict(record) for record in event["new"]])
+        )
+    if event["resolved"] and event["status"] == "failed":
+        lines.append(
+            prefix
+            + "Device {} no longer differs from specification {}:".format(
+                event["device"], event["specification"]
+            )
+        )
+        lines.extend(
+            format_differences(
+                [Difference.from_dict(record) for record in event["resolved"]]
+            )
+        )
+    return lines
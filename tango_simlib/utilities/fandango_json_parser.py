@@ -20,12 +20,18 @@ standard_library.install_aliases()  # noqa: E402
 import json
 import logging
 
+from collections import OrderedDict
+
 from tango import AttrDataFormat, CmdArgType
 from tango_simlib.utilities.base_parser import Parser
-from tango_simlib.utilities.helper_module import json_load_byteified
+from tango_simlib.utilities.helper_module import (
+    iter_json_load_byteified,
+    json_load_byteified,
+)
 
 MODULE_LOGGER = logging.getLogger(__name__)
 
+DEVICE_EXPORT_KEYS = frozenset(["attributes", "commands", "dev_class"])
 CMD_PROP_MAP = {
     "name": "name",
     "in_type": "dtype_in",
@@ -35,6 +41,35 @@ CMD_PROP_MAP = {
 }
 
 
+def iter_fgo_device_data(file_handle):
+    """Iterate over the devices exported to a fandango export file.
+
+    A file may contain a single device export, a list of device exports, a dict of
+    device exports keyed by device name, or a sequence of any of these documents
+    (e.g. one device export per line).
+
+    Parameters
+    ----------
+    file_handle: file object
+
+    Yields
+    ------
+    device_data: dict
+        The decoded export of a device.
+
+    """
+    for document in iter_json_load_byteified(file_handle):
+        if isinstance(document, list):
+            for device_data in document:
+                yield device_data
+        elif DEVICE_EXPORT_KEYS.intersection(document):
+            yield document
+        else:
+            for device_name, device_data in document.items():
+                device_data.setdefault("name", device_name)
+                yield device_data
+
+
 class FandangoExportDeviceParser(Parser):
     def __init__(self):
         super(FandangoExportDeviceParser, self).__init__()
@@ -45,7 +80,60 @@ class FandangoExportDeviceParser(Parser):
         self.data_description_file_name = json_file
         with open(json_file) as dev_data_file:
             device_data = json_load_byteified(dev_data_file)
+        self.parse_device_data(device_data)
+
+    @classmethod
+    def parse_devices(cls, json_file):
+        """Parse all the devices exported to a file.
+
+        The file is decoded one JSON document at a time, see `iter_fgo_device_data`
+        for the supported layouts.
+
+        Parameters
+        ----------
+        json_file: str
+            Name of the fandango export file.
+
+        Returns
+        -------
+        parsers: collections.OrderedDict
+            Device name -> FandangoExportDeviceParser instance, in file order.
 
+        Raises
+        ------
+        ValueError
+            If a device has no name or is exported more than once.
+
+        """
+        parsers = OrderedDict()
+        with open(json_file) as dev_data_file:
+            for device_data in iter_fgo_device_data(dev_data_file):
+                device_name = device_data.get("name")
+                if not device_name:
+                    raise ValueError(
+                        "A device exported to {} has no name.".format(json_file)
+                    )
+                if device_name in parsers:
+                    raise ValueError(
+                        "Device {} is exported more than once to {}.".format(
+                            device_name, json_file
+                        )
+                    )
+                parser = cls()
+                parser.data_description_file_name = json_file
+                parser.parse_device_data(device_data)
+                parsers[device_name] = parser
+        return parsers
+
+    def parse_device_data(self, device_data):
+        """Read the data of a single exported device.
+
+        Parameters
+        ----------
+        device_data: dict
+            The decoded export of a device.
+
+        """
         for data_component, elements in device_data.items():
             if data_component == "attributes":
                 self.preprocess_attribute_types(elements)
@@ -14,6 +14,7 @@ import os
 import socket
 import sys
 
+from future.utils import text_type
 from tango import Database
 from tango.server import command
 from tango_simlib.compat import ensure_native_ascii_str
@@ -22,7 +23,13 @@ MODULE_LOGGER = logging.getLogger(__name__)
 
 DEFAULT_TANGO_DEVICE_COMMANDS = frozenset(["State", "Status", "Init"])
 DEFAULT_TANGO_DEVICE_ATTRIBUTES = frozenset(
-    ["State", "Status", "AttributesNotAdded", "NumAttributesNotAdded"]
+    [
+        "State",
+        "Status",
+        "AttributesNotAdded",
+        "NumAttributesNotAdded",
+        "StartupTimingReport",
+    ]
 )
 SIM_CONTROL_ADDITIONAL_IMPLEMENTED_ATTR = set(
     [
@@ -30,6 +37,22 @@ SIM_CONTROL_ADDITIONAL_IMPLEMENTED_ATTR = set(
         "State",  # Tango library attribute
         "attribute_name",  # Attribute indentifier for attribute to be controlled
         "pause_active",  # Flag for pausing the model updates
+        "scenario_events_pending",  # Number of scenario events still to be applied
+        "fault_injection_settings",  # Latency and error injection settings
+        "fault_injection_stats",  # Latency and error injection statistics
+    ]
+)
+SIM_CONTROL_ADDITIONAL_IMPLEMENTED_COMMANDS = frozenset(
+    [
+        "GetQuantityAttributes",
+        "SetQuantityAttributes",
+        "LoadScenario",
+        "StopScenario",
+        "SetFaultInjection",
+        "ClearFaultInjection",
+        "TakeModelSnapshot",
+        "RestoreModelSnapshot",
+        "SetAttributesPolling",
     ]
 )
 
@@ -107,6 +130,50 @@ def get_database():
     return Database()
 
 
+def _as_db_property_value(value):
+    """Convert a property value to the list of strings that the TANGO DB holds."""
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [str(value)]
+
+
+def put_device_properties(db, device_name, properties):
+    """Write the device properties that differ from the database in a single call.
+
+    Parameters
+    ----------
+    db : tango.Database
+        Tango database instance
+    device_name : str
+        A TANGO device name
+    properties : dict
+        Property name -> property value (a single value or a sequence of values).
+
+    Returns
+    -------
+    changed_properties : dict
+        The properties that were written to the database.
+
+    """
+    if not properties:
+        return {}
+    current_properties = db.get_device_property(device_name, list(properties))
+    changed_properties = {}
+    for prop_name, prop_value in properties.items():
+        current_value = list(current_properties.get(prop_name, []))
+        if current_value != _as_db_property_value(prop_value):
+            changed_properties[prop_name] = prop_value
+    if changed_properties:
+        db.put_device_property(device_name, changed_properties)
+    MODULE_LOGGER.debug(
+        "Device %s: %d of %d properties written to the database.",
+        device_name,
+        len(changed_properties),
+        len(properties),
+    )
+    return changed_properties
+
+
 def append_device_to_db_file(
     server, instance, device, db_file_name, tangoclass=None, properties={}
 ):
@@ -143,9 +210,44 @@ def get_host_address():
 
 def generate_cmd_handler(model, action_name, action_handler):
     def cmd_handler(tango_device, input_parameters=None):
+        model.fault_injector.inject(action_name)
+        return action_handler(tango_dev=tango_device, data_input=input_parameters)
+
+    cmd_handler.__name__ = action_name
+    return command(f=cmd_handler, **_get_command_parameters(model, action_name))
+
+
+def generate_static_cmd_handler(model, action_name):
+    """Generate a command handler that can be declared on the device class.
+
+    Unlike :func:`generate_cmd_handler` the handler is not bound to a specific action
+    handler, it looks up the action on the model of the device it is called on. This
+    allows the command to be shared by all the devices of a class.
+
+    Parameters
+    ----------
+    model : model.Model instance
+        Any model of the device class, used for the command metadata.
+    action_name : str
+        Name of the model action and TANGO command.
+
+    Returns
+    -------
+    cmd_handler : function
+        A TANGO command handler.
+
+    """
+
+    def cmd_handler(tango_device, input_parameters=None):
+        tango_device.model.fault_injector.inject(action_name)
+        action_handler = tango_device.model.sim_actions[action_name]
         return action_handler(tango_dev=tango_device, data_input=input_parameters)
 
     cmd_handler.__name__ = action_name
+    return command(f=cmd_handler, **_get_command_parameters(model, action_name))
+
+
+def _get_command_parameters(model, action_name):
     cmd_info_copy = model.sim_actions_meta[action_name].copy()
     # Delete all the keys that are not part of the Tango command parameters.
     cmd_info_copy.pop("name")
@@ -165,41 +267,95 @@ def generate_cmd_handler(model, action_name, action_handler):
         command(f=None, dtype_in=None, dformat_in=None, doc_in="",
                 dtype_out=None, dformat_out=None, doc_out="", green_mode=None)
     """
-    return command(f=cmd_handler, **cmd_info_copy)
+    return cmd_info_copy
 
 
 # JSON `load` and `loads` equivalents, that force all strings to be returned
 # as byte strings, rather than unicode.  This is critical for fields that will
 # be used by TANGO, as it breaks with unicode strings.
 # Solution from:  https://stackoverflow.com/a/33571117
+# The strings are converted while decoding, by the `object_pairs_hook`, so that the
+# decoded data is only walked once.
 
 
 def json_load_byteified(file_handle):
     """Similar to json.load(), but forces str instead of unicode strings."""
-    return _byteify(json.load(file_handle, object_hook=_byteify), ignore_dicts=True)
+    return _byteify_value(json.load(file_handle, object_pairs_hook=_byteify_pairs))
 
 
 def json_loads_byteified(json_text):
     """Similar to json.loads(), but forces str instead of unicode strings."""
-    return _byteify(json.loads(json_text, object_hook=_byteify), ignore_dicts=True)
-
-
-def _byteify(data, ignore_dicts=False):
-    # If this is a unicode string, return its string representation.
-    try:
-        return ensure_native_ascii_str(data)
-    except TypeError:
-        pass
-    # if this is a list of values, return list of byteified values
-    if isinstance(data, list):
-        return [_byteify(item, ignore_dicts=True) for item in data]
-    # if this is a dictionary, return dictionary of byteified keys and values
-    # but only if we haven't already byteified it
-    if isinstance(data, dict) and not ignore_dicts:
-        return {
-            _byteify(key, ignore_dicts=True): _byteify(value, ignore_dicts=True)
-            for key, value in data.items()
-        }
-
-    # if it's anything else, return it in its original form
-    return data
+    return _byteify_value(json.loads(json_text, object_pairs_hook=_byteify_pairs))
+
+
+def iter_json_load_byteified(file_handle, chunk_size=1 << 16):
+    """Decode a stream of JSON documents, forcing str instead of unicode strings.
+
+    The documents may be separated by whitespace (e.g. one document per line), so
+    a large export of several devices can be processed one document at a time.
+
+    Parameters
+    ----------
+    file_handle : file object
+        Text file opened for reading.
+    chunk_size : int
+        Number of characters read from the file at a time.
+
+    Yields
+    ------
+    document : object
+        The decoded JSON documents, in file order.
+
+    """
+    decoder = json.JSONDecoder(object_pairs_hook=_byteify_pairs)
+    buffer_ = ""
+    end_of_file = False
+    while True:
+        buffer_ = buffer_.lstrip()
+        if buffer_:
+            try:
+                document, index = decoder.raw_decode(buffer_)
+            except ValueError:
+                # The document is not complete yet.
+                if end_of_file:
+                    raise
+            else:
+                # A number at the end of the buffer may continue in the next chunk.
+                if index < len(buffer_) or end_of_file:
+                    yield _byteify_value(document)
+                    buffer_ = buffer_[index:]
+                    continue
+        elif end_of_file:
+            return
+        # Read at least as much as is buffered, so that a large document is not
+        # decoded from the start once per chunk.
+        chunk = file_handle.read(max(chunk_size, len(buffer_)))
+        end_of_file = not chunk
+        buffer_ += chunk
+
+
+if hasattr(str, "isascii"):
+
+    def _native_str(value):
+        # Most strings are ASCII already and need no conversion.
+        return value if value.isascii() else ensure_native_ascii_str(value)
+
+
+else:
+    _native_str = ensure_native_ascii_str
+
+
+def _byteify_value(value):
+    if isinstance(value, text_type):
+        return _native_str(value)
+    # The items of a list are not passed to the `object_pairs_hook`, the JSON
+    # objects in it are already converted.
+    if isinstance(value, list):
+        for index, item in enumerate(value):
+            if isinstance(item, (text_type, list)):
+                value[index] = _byteify_value(item)
+    return value
+
+
+def _byteify_pairs(pairs):
+    return {_native_str(key): _byteify_value(value) for key, value in pairs}
@@ -0,0 +1,561 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""
+This module captures the output of the simulator description file parsers in a
+plain data structure (the simulator definition) and restores parser instances from
+it, so that a simulator can be configured without re-reading the original files.
+
+A simulator definition can also be compiled to a flat binary file (`.simdef`), with
+the data of all the description files merged and the simulation parameters stored as
+numbers.
+"""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import io
+import logging
+import struct
+
+import tango
+
+from builtins import range
+from future.utils import integer_types, string_types
+
+from tango_simlib.utilities.base_parser import Parser
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+SIM_DEFINITION_VERSION = 1
+# TANGO enumeration types that the parsers place in the metadata dicts. They are
+# stored by name in the simulator definition.
+TANGO_ENUM_TYPES = {
+    "AttrDataFormat": tango.AttrDataFormat,
+    "AttrQuality": tango.AttrQuality,
+    "AttrWriteType": tango.AttrWriteType,
+    "CmdArgType": tango.CmdArgType,
+    "DispLevel": tango.DispLevel,
+}
+TANGO_ENUM_KEY = "__tango_enum__"
+
+COMPILED_FILE_EXTENSION = ".simdef"
+COMPILED_FILE_MAGIC = b"TSIMDEF\x00"
+COMPILED_FORMAT_VERSION = 1
+# The attribute properties that are only used as numbers by the models. The other
+# properties are passed on to TANGO as they are.
+NUMERIC_ATTRIBUTE_PROPERTIES = frozenset(
+    [
+        "max_bound",
+        "max_dim_x",
+        "max_dim_y",
+        "max_slew_rate",
+        "mean",
+        "min_bound",
+        "std_dev",
+        "update_period",
+    ]
+)
+
+try:
+    from sys import intern
+except ImportError:
+    # `intern` is a builtin function in Python 2.
+    pass
+
+
+def encode_tango_types(value):
+    """Replace TANGO enumeration values with plain, serialisable placeholders.
+
+    Parameters
+    ----------
+    value : object
+        Parsed metadata, e.g. a dict of attribute properties.
+
+    Returns
+    -------
+    encoded_value : object
+        A copy of `value` where every TANGO enum is replaced by a dict of the form
+        {'__tango_enum__': 'CmdArgType', 'name': 'DevDouble'}.
+
+    """
+    if isinstance(value, dict):
+        return {key: encode_tango_types(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(encode_tango_types(item) for item in value)
+    for enum_name, enum_type in TANGO_ENUM_TYPES.items():
+        if isinstance(value, enum_type):
+            return {TANGO_ENUM_KEY: enum_name, "name": str(value)}
+    return value
+
+
+def decode_tango_types(value):
+    """Restore the TANGO enumeration values replaced by :func:`encode_tango_types`.
+
+    Parameters
+    ----------
+    value : object
+        Encoded metadata.
+
+    Returns
+    -------
+    decoded_value : object
+        A new copy of `value` with the TANGO enum values restored.
+
+    """
+    if isinstance(value, dict):
+        if TANGO_ENUM_KEY in value:
+            enum_type = TANGO_ENUM_TYPES[value[TANGO_ENUM_KEY]]
+            return getattr(enum_type, value["name"])
+        return {key: decode_tango_types(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(decode_tango_types(item) for item in value)
+    return value
+
+
+def get_parser_definition(parser_instance):
+    """Capture everything a parser instance provides to configure a device model.
+
+    Parameters
+    ----------
+    parser_instance : Parser instance
+        A parser that has already parsed its simulator description file.
+
+    Returns
+    -------
+    section : dict
+        The parsed data in a serialisable form.
+
+    """
+    section = {
+        "data_description_file_name": parser_instance.data_description_file_name,
+        "device_class_name": parser_instance.device_class_name,
+        "attributes": parser_instance.get_device_attribute_metadata(),
+        "commands": parser_instance.get_device_command_metadata(),
+        "device_properties": parser_instance.get_device_properties_metadata(
+            "deviceProperties"
+        ),
+        "class_properties": parser_instance.get_device_properties_metadata(
+            "classProperties"
+        ),
+        "cmd_overrides": parser_instance.get_device_cmd_override_metadata(),
+        "fault_injection": parser_instance.get_device_fault_injection_metadata(),
+    }
+    return encode_tango_types(section)
+
+
+def get_sim_definition(parser_instances, device_class_name):
+    """Build a simulator definition from a list of parser instances.
+
+    Parameters
+    ----------
+    parser_instances : list
+        Parser instances, in the order their data should be applied to the models.
+    device_class_name : str
+        TANGO device class name of the simulator.
+
+    Returns
+    -------
+    sim_definition : dict
+        A plain data structure that can be written out as a Python literal.
+
+    """
+    return {
+        "version": SIM_DEFINITION_VERSION,
+        "class_name": device_class_name,
+        "sections": [
+            get_parser_definition(parser_instance) for parser_instance in parser_instances
+        ],
+    }
+
+
+def get_parser_instances(sim_definition):
+    """Restore the parser instances captured in a simulator definition.
+
+    Parameters
+    ----------
+    sim_definition : dict
+        Simulator definition as returned by :func:`get_sim_definition`.
+
+    Returns
+    -------
+    parser_instances : list
+        A list of :class:`PrecompiledParser` instances, one per section.
+
+    """
+    version = sim_definition.get("version")
+    if version != SIM_DEFINITION_VERSION:
+        raise ValueError(
+            "Unsupported simulator definition version {}, expected {}.".format(
+                version, SIM_DEFINITION_VERSION
+            )
+        )
+    parser_instances = []
+    for section in sim_definition["sections"]:
+        parser_instance = PrecompiledParser()
+        parser_instance.load_section(section)
+        parser_instances.append(parser_instance)
+    return parser_instances
+
+
+class PrecompiledParser(Parser):
+    """Provides parsed simulator description data from a simulator definition.
+
+    Attributes
+    ----------
+    data_description_file_name: str
+        The file the data was originally parsed from.
+
+    device_class_name: str
+
+    """
+
+    def __init__(self):
+        super(PrecompiledParser, self).__init__()
+        self._device_override_class = {}
+
+    def parse(self, data_file):
+        """Load a compiled simulator definition file.
+
+        Parameters
+        ----------
+        data_file : str
+            Name of a file written by :func:`write_compiled_sim_definition`, with a
+            single section.
+
+        """
+        sim_definition = read_compiled_sim_definition(data_file)
+        sections = sim_definition["sections"]
+        if len(sections) != 1:
+            raise ValueError(
+                "Expected a single section in {}, found {}.".format(
+                    data_file, len(sections)
+                )
+            )
+        self.load_section(sections[0])
+        self.data_description_file_name = data_file
+
+    def load_section(self, section):
+        """Load the parsed data of one simulator description file.
+
+        Parameters
+        ----------
+        section : dict
+            A section of a simulator definition, see :func:`get_parser_definition`.
+
+        """
+        section = decode_tango_types(section)
+        self.data_description_file_name = section["data_description_file_name"]
+        self.device_class_name = section["device_class_name"]
+        self._device_attributes = section["attributes"]
+        self._device_commands = section["commands"]
+        self._device_properties = section["device_properties"]
+        # Not in the definitions generated before the class properties were kept.
+        self._device_class_properties = section.get("class_properties", {})
+        self._device_override_class = section["cmd_overrides"]
+        # Not in the definitions generated before fault injection was added.
+        self._device_fault_injection = section.get("fault_injection", {})
+
+    def get_device_attribute_metadata(self):
+        return self._device_attributes
+
+    def get_device_command_metadata(self):
+        return self._device_commands
+
+    def get_device_properties_metadata(self, property_group):
+        if property_group == "classProperties":
+            return self._device_class_properties
+        return self._device_properties
+
+    def get_device_cmd_override_metadata(self):
+        return self._device_override_class
+
+
+def get_compiled_sim_definition(parser_instances, device_class_name):
+    """Build a simulator definition with the data of all the parsers merged.
+
+    The data is merged the same way as when the models are populated from several
+    parsers, so the definition only has one section.
+
+    Parameters
+    ----------
+    parser_instances : list
+        Parser instances, in the order their data should be applied to the models.
+    device_class_name : str
+        TANGO device class name of the simulator.
+
+    Returns
+    -------
+    sim_definition : dict
+
+    """
+    sim_definition = get_sim_definition(parser_instances, device_class_name)
+    sections = sim_definition["sections"]
+    attributes = {}
+    for section in sections:
+        for attr_name, attr_props in section["attributes"].items():
+            if attr_name in attributes:
+                # Optional parameters without a value do not replace the values of
+                # the previous files.
+                attributes[attr_name].update(
+                    (key, value) for key, value in attr_props.items() if value
+                )
+            else:
+                attributes[attr_name] = dict(attr_props)
+    for attr_props in attributes.values():
+        for key in NUMERIC_ATTRIBUTE_PROPERTIES.intersection(attr_props):
+            attr_props[key] = _to_number(attr_props[key])
+
+    merged_section = {
+        "data_description_file_name": ",".join(
+            section["data_description_file_name"] for section in sections
+        ),
+        "device_class_name": device_class_name,
+        "attributes": attributes,
+    }
+    for key in (
+        "commands",
+        "device_properties",
+        "class_properties",
+        "cmd_overrides",
+        "fault_injection",
+    ):
+        merged_section[key] = {}
+        for section in sections:
+            merged_section[key].update(section[key])
+    sim_definition["sections"] = [merged_section]
+    return sim_definition
+
+
+def _to_number(value):
+    if isinstance(value, (bool, int, float)) or not value:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def write_compiled_sim_definition(sim_definition, file_name):
+    """Write a simulator definition to a compiled (binary) file.
+
+    The file starts with a magic string and the format version, followed by a table
+    of all the distinct strings and the definition, which refers to the strings by
+    their index.
+
+    Parameters
+    ----------
+    sim_definition : dict
+        Simulator definition as returned by :func:`get_compiled_sim_definition`,
+        with the TANGO enumeration values encoded.
+    file_name : str
+        Name of the file to write, usually with a '.simdef' extension.
+
+    """
+    with open(file_name, "wb") as compiled_file:
+        compiled_file.write(COMPILED_FILE_MAGIC)
+        compiled_file.write(struct.pack(">H", COMPILED_FORMAT_VERSION))
+        compiled_file.write(encode_compiled(sim_definition))
+
+
+def read_compiled_sim_definition(file_name):
+    """Read a simulator definition from a compiled file.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of a file written by :func:`write_compiled_sim_definition`.
+
+    Returns
+    -------
+    sim_definition : dict
+
+    Raises
+    ------
+    ValueError
+        If the file is not a compiled simulator definition or if its format version
+        is not supported.
+
+    """
+    with open(file_name, "rb") as compiled_file:
+        data = compiled_file.read()
+    magic_length = len(COMPILED_FILE_MAGIC)
+    if data[:magic_length] != COMPILED_FILE_MAGIC:
+        raise ValueError(
+            "{} is not a compiled simulator definition file.".format(file_name)
+        )
+    (version,) = struct.unpack_from(">H", data, magic_length)
+    if version != COMPILED_FORMAT_VERSION:
+        raise ValueError(
+            "Unsupported compiled simulator definition format version {} in {}, "
+            "expected {}.".format(version, file_name, COMPILED_FORMAT_VERSION)
+        )
+    return decode_compiled(data, magic_length + 2)
+
+
+def encode_compiled(value):
+    """Encode plain data in the compiled format, without the header.
+
+    Parameters
+    ----------
+    value : object
+        None, bools, numbers, strings and lists and dicts of them.
+
+    Returns
+    -------
+    data : bytes
+        A table of all the distinct strings, followed by the value, which refers to
+        the strings by their index.
+
+    """
+    encoder = _DefinitionEncoder()
+    payload = encoder.encode(value)
+    output = io.BytesIO()
+    output.write(struct.pack(">I", len(encoder.strings)))
+    for string in encoder.strings:
+        data = string.encode("utf-8")
+        output.write(struct.pack(">I", len(data)))
+        output.write(data)
+    output.write(payload)
+    return output.getvalue()
+
+
+def decode_compiled(data, offset=0):
+    """Decode plain data encoded by :func:`encode_compiled`.
+
+    Parameters
+    ----------
+    data : bytes
+    offset : int
+        The position of the encoded data in `data`.
+
+    Returns
+    -------
+    value : object
+
+    """
+    return _DefinitionDecoder(data, offset).decode()
+
+
+def load_compiled_parser(file_name):
+    """Load the parser instance of a compiled simulator definition file.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of a compiled simulator definition file.
+
+    Returns
+    -------
+    parser_instance : PrecompiledParser instance
+
+    """
+    parser_instance = PrecompiledParser()
+    parser_instance.parse(file_name)
+    return parser_instance
+
+
+# Value type tags of the compiled format.
+_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STRING, _LIST, _DICT = range(8)
+
+
+class _DefinitionEncoder(object):
+    def __init__(self):
+        self.strings = []
+        self._string_indices = {}
+
+    def _string_index(self, string):
+        try:
+            return self._string_indices[string]
+        except KeyError:
+            index = self._string_indices[string] = len(self.strings)
+            self.strings.append(string)
+            return index
+
+    def encode(self, value):
+        output = io.BytesIO()
+        self._encode(value, output)
+        return output.getvalue()
+
+    def _encode(self, value, output):
+        if value is None:
+            output.write(struct.pack(">B", _NONE))
+        elif value is True:
+            output.write(struct.pack(">B", _TRUE))
+        elif value is False:
+            output.write(struct.pack(">B", _FALSE))
+        elif isinstance(value, integer_types):
+            output.write(struct.pack(">Bq", _INT, value))
+        elif isinstance(value, float):
+            output.write(struct.pack(">Bd", _FLOAT, value))
+        elif isinstance(value, string_types):
+            output.write(struct.pack(">BI", _STRING, self._string_index(value)))
+        elif isinstance(value, (list, tuple)):
+            output.write(struct.pack(">BI", _LIST, len(value)))
+            for item in value:
+                self._encode(item, output)
+        elif isinstance(value, dict):
+            output.write(struct.pack(">BI", _DICT, len(value)))
+            for key, item in value.items():
+                output.write(struct.pack(">I", self._string_index(key)))
+                self._encode(item, output)
+        else:
+            raise TypeError(
+                "Cannot compile value {!r} of type {}".format(value, type(value))
+            )
+
+
+class _DefinitionDecoder(object):
+    def __init__(self, data, offset):
+        self._data = data
+        (num_strings,) = struct.unpack_from(">I", data, offset)
+        offset += 4
+        self._strings = []
+        for _ in range(num_strings):
+            (length,) = struct.unpack_from(">I", data, offset)
+            start = offset + 4
+            offset = start + length
+            string = data[start:offset].decode("utf-8")
+            self._strings.append(intern(str(string)))
+        self._offset = offset
+
+    def decode(self):
+        return self._decode()
+
+    def _unpack(self, fmt):
+        values = struct.unpack_from(fmt, self._data, self._offset)
+        self._offset += struct.calcsize(fmt)
+        return values
+
+    def _decode(self):
+        (tag,) = self._unpack(">B")
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            return self._unpack(">q")[0]
+        if tag == _FLOAT:
+            return self._unpack(">d")[0]
+        if tag == _STRING:
+            return self._strings[self._unpack(">I")[0]]
+        if tag == _LIST:
+            (length,) = self._unpack(">I")
+            return [self._decode() for _ in range(length)]
+        if tag == _DICT:
+            (length,) = self._unpack(">I")
+            value = {}
+            for _ in range(length):
+                key = self._strings[self._unpack(">I")[0]]
+                value[key] = self._decode()
+            return value
+        raise ValueError("Invalid compiled simulator definition value tag {}".format(tag))
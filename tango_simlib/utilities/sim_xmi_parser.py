@@ -15,6 +15,8 @@ standard_library.install_aliases()  # noqa: E402
 import logging
 import xml.etree.ElementTree as ET
 
+from collections import OrderedDict
+
 from future.utils import itervalues
 from tango import AttrDataFormat, CmdArgType, DevBoolean, DevEnum, DevString
 from tango_simlib.utilities.base_parser import Parser
@@ -128,6 +130,37 @@ class XmiParser(Parser):
 
         """
         self.data_description_file_name = sim_xmi_file
+        tree = self._read_xmi_tree(sim_xmi_file)
+        self._parse_device_class(tree, tree.getroot().find("classes"))
+
+    @classmethod
+    def parse_classes(cls, sim_xmi_file):
+        """Parse all the device classes described in a xmi file.
+
+        The file is only read once, however many `classes` elements it contains.
+
+        Parameters
+        ----------
+        sim_xmi_file: str
+            Name of simulator descrition data file
+
+        Returns
+        -------
+        parsers: collections.OrderedDict
+            Device class name -> XmiParser instance, in file order.
+
+        """
+        tree = cls._read_xmi_tree(sim_xmi_file)
+        parsers = OrderedDict()
+        for device_class in tree.getroot().findall("classes"):
+            parser = cls()
+            parser.data_description_file_name = sim_xmi_file
+            parser._parse_device_class(tree, device_class)
+            parsers[parser.device_class_name] = parser
+        return parsers
+
+    @staticmethod
+    def _read_xmi_tree(sim_xmi_file):
         tree = ET.parse(sim_xmi_file)
 
         # ensure all unicode attribute values are converted to byte strings
@@ -135,10 +168,10 @@ class XmiParser(Parser):
         for child in tree.findall(".//"):
             for key, value in child.attrib.items():
                 child.attrib[key] = ensure_native_ascii_str(value)
+        return tree
 
+    def _parse_device_class(self, tree, device_class):
         self._tree = tree
-        root = tree.getroot()
-        device_class = root.find("classes")
         self.device_class_name = device_class.attrib["name"]
         for class_description_data in device_class:
             if class_description_data.tag in ["description"]:
@@ -322,7 +355,7 @@ class XmiParser(Parser):
         )
         if str(attribute_data["dynamicAttributes"]["dataType"]) == "DevEnum":
             enum_labels = []
-            for child in description_data.getchildren():
+            for child in list(description_data):
                 if child.tag == "enumLabels":
                     enum_labels.append(child.text)
             attribute_data["dynamicAttributes"]["enum_labels"] = enum_labels
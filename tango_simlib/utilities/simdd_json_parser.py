@@ -13,12 +13,12 @@ standard_library.install_aliases()  # noqa: E402
 
 import json
 import logging
-import pkg_resources
+import os
 
-from jsonschema import validate
 from tango import AttrDataFormat, CmdArgType
 from tango_simlib.utilities import helper_module
 from tango_simlib.utilities.base_parser import Parser
+from tango_simlib.utilities.startup_timing import startup_timer
 
 MODULE_LOGGER = logging.getLogger(__name__)
 EXPECTED_SIMULATION_PARAMETERS = {
@@ -67,6 +67,10 @@ class SimddParser(Parser):
         and values must be the corresponding data value.
 
         """
+        # These are slow to import and only needed when a file is parsed.
+        import pkg_resources
+        from jsonschema import validate
+
         simdd_schema_file = pkg_resources.resource_filename(
             "tango_simlib.utilities", "SimDD.schema"
         )
@@ -75,7 +79,10 @@ class SimddParser(Parser):
         self.data_description_file_name = simdd_json_file
         with open(simdd_json_file) as simdd_file:
             device_data = json.load(simdd_file)
-        validate(device_data, schema_data)
+        with startup_timer.phase(
+            "validate:{}".format(os.path.basename(simdd_json_file))
+        ):
+            validate(device_data, schema_data)
         for data_component, elements in device_data.items():
             if data_component == "class_name":
                 self.device_class_name = str(elements)
@@ -99,6 +106,10 @@ class SimddParser(Parser):
                     elements, data_component
                 )
                 self._device_override_class.update(device_prop_info)
+            elif data_component == "faultInjection":
+                for element_data in elements:
+                    fault = dict(element_data["fault"])
+                    self._device_fault_injection[str(fault.pop("name"))] = fault
 
     def get_device_data_components_dict(self, elements, element_type):
         """Extract description data from the simdd json element.
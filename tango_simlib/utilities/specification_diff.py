@@ -0,0 +1,358 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""
+This module compares a device specification with the specification built from a
+device, producing typed difference records that can be aggregated without parsing
+the human readable messages, and serialised as JSON or in a compact binary format.
+"""
+from __future__ import absolute_import, division, print_function
+
+import struct
+
+from collections import namedtuple
+
+# The kinds of difference records.
+CLASS_CHANGED = "class_changed"
+MISSING = "missing"
+EXTRA = "extra"
+MISSING_KEY = "missing_key"
+EXTRA_KEY = "extra_key"
+CHANGED = "changed"
+
+# The messages describing the differences, which name the missing and extra elements
+# or keys together.
+_MESSAGES = {
+    MISSING: "{type_str} differs, [{names}] specified but missing in device",
+    EXTRA: "{type_str} differs, [{names}] present in device but not specified",
+    MISSING_KEY: (
+        "{type_str} [{name}] differs, specification has keys [{keys}] but it's "
+        "not in device"
+    ),
+    EXTRA_KEY: (
+        "{type_str} [{name}] differs, device has keys [{keys}] but it's "
+        "not in the specification"
+    ),
+}
+_PROPERTY_MESSAGES = {
+    MISSING: "Property [{names}] differs, specified but missing in device",
+    EXTRA: "Property [{names}] differs, present in device but not specified",
+}
+
+BINARY_MAGIC = b"TSIMDIFF"
+BINARY_FORMAT_VERSION = 1
+
+
+class Difference(namedtuple("Difference", "kind element name key specification device")):
+    """A difference between a specification and a device.
+
+    Attributes
+    ----------
+    kind : str
+        One of CLASS_CHANGED, MISSING (specified but missing in the device), EXTRA
+        (present in the device but not specified), MISSING_KEY, EXTRA_KEY (the
+        same for a key of a command or attribute) or CHANGED (a key with different
+        values).
+    element : str
+        "class", "command", "attribute" or "property".
+    name : str
+        The name of the command, attribute or property, None for the class.
+    key : str
+        The key of the command or attribute, None unless the kind is MISSING_KEY,
+        EXTRA_KEY or CHANGED.
+    specification : object
+        The value in the specification, for the kinds CLASS_CHANGED and CHANGED.
+    device : object
+        The value on the device, for the kinds CLASS_CHANGED and CHANGED.
+
+    """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """The difference as a plain dict, e.g. for JSON."""
+        return dict(zip(self._fields, self))
+
+    @classmethod
+    def from_dict(cls, difference):
+        return cls(**difference)
+
+
+def diff_specifications(specification_data, tango_device_data, bidirectional):
+    """Compare a specification with the specification built from a device.
+
+    Parameters
+    ----------
+    specification_data : dict
+        The specification, with lists for its commands, attributes and properties
+    tango_device_data : dict
+        The specification built from the device
+    bidirectional : bool
+        Whether to include details on the device that is not in the specification
+
+    Returns
+    -------
+    differences : list of Difference
+        The differences, in the order in which they are reported
+
+    """
+    differences = []
+    if specification_data["class"]:
+        if tango_device_data["class"] != specification_data["class"]:
+            differences.append(
+                Difference(
+                    CLASS_CHANGED,
+                    "class",
+                    None,
+                    None,
+                    specification_data["class"],
+                    tango_device_data["class"],
+                )
+            )
+    for element, type_str in [("command", "commands"), ("attribute", "attributes")]:
+        differences.extend(
+            diff_elements(
+                specification_data["meta"][type_str],
+                tango_device_data["meta"][type_str],
+                element,
+                bidirectional,
+            )
+        )
+    differences.extend(
+        diff_names(
+            specification_data["meta"]["properties"],
+            tango_device_data["meta"]["properties"],
+            "property",
+            bidirectional,
+        )
+    )
+    return differences
+
+
+def diff_names(spec_data, dev_data, element, bidirectional):
+    """Compare which commands, attributes or properties are present, by name.
+
+    Parameters
+    ----------
+    spec_data : list of dict
+        The elements of the specification, each with a "name"
+    dev_data : list of dict
+        The elements of the device, each with a "name"
+    element : str
+        "command", "attribute" or "property"
+    bidirectional : bool
+        Whether to include the elements of the device that are not specified
+
+    Returns
+    -------
+    differences : list of Difference
+
+    """
+    spec_names = {item["name"] for item in spec_data}
+    dev_names = {item["name"] for item in dev_data}
+    differences = [
+        Difference(MISSING, element, name, None, None, None)
+        for name in sorted(spec_names.difference(dev_names))
+    ]
+    if bidirectional:
+        differences.extend(
+            Difference(EXTRA, element, name, None, None, None)
+            for name in sorted(dev_names.difference(spec_names))
+        )
+    return differences
+
+
+def diff_elements(spec_data, dev_data, element, bidirectional):
+    """Compare the commands or attributes of a specification and a device.
+
+    Both sides are indexed by name, and the elements on both sides are compared
+    key by key.
+
+    Parameters
+    ----------
+    spec_data : list of dict
+        The elements of the specification, each with a "name"
+    dev_data : list of dict
+        The elements of the device, each with a "name"
+    element : str
+        "command" or "attribute"
+    bidirectional : bool
+        Whether to include details on the device that is not in the specification
+
+    Returns
+    -------
+    differences : list of Difference
+
+    """
+    differences = diff_names(spec_data, dev_data, element, bidirectional)
+    dev_by_name = {item["name"]: item for item in dev_data}
+    for spec in sorted(spec_data, key=lambda item: item["name"]):
+        dev = dev_by_name.get(spec["name"])
+        if dev is not None:
+            differences.extend(diff_element(spec, dev, element, bidirectional))
+    return differences
+
+
+def diff_element(spec, dev, element, bidirectional):
+    """Compare a single command or attribute.
+
+    Parameters
+    ----------
+    spec : dict
+        The command or attribute of the specification
+    dev : dict
+        The command or attribute of the device, with the same name
+    element : str
+        "command" or "attribute"
+    bidirectional : bool
+        Whether to include the keys of the device that are not specified
+
+    Returns
+    -------
+    differences : list of Difference
+
+    """
+    if spec == dev:
+        return []
+    name = spec["name"]
+    differences = [
+        Difference(MISSING_KEY, element, name, key, None, None)
+        for key in sorted(set(spec).difference(dev))
+    ]
+    if bidirectional:
+        differences.extend(
+            Difference(EXTRA_KEY, element, name, key, None, None)
+            for key in sorted(set(dev).difference(spec))
+        )
+    differences.extend(
+        Difference(CHANGED, element, name, key, spec[key], dev[key])
+        for key in sorted(set(spec).intersection(dev))
+        if spec[key] != dev[key]
+    )
+    return differences
+
+
+def format_differences(differences):
+    """Describe differences in human readable messages.
+
+    Consecutive missing or extra elements, and missing or extra keys of the same
+    element, are described in a single message.
+
+    Parameters
+    ----------
+    differences : list of Difference
+
+    Returns
+    -------
+    issues : list of str
+        The messages describing the differences
+
+    """
+    issues = []
+    group = []
+    for difference in differences:
+        if group and not _same_group(group[0], difference):
+            issues.extend(_format_group(group))
+            group = []
+        group.append(difference)
+    if group:
+        issues.extend(_format_group(group))
+    return issues
+
+
+def _same_group(first, difference):
+    if difference.kind != first.kind or difference.element != first.element:
+        return False
+    if first.kind in (MISSING, EXTRA):
+        return True
+    if first.kind in (MISSING_KEY, EXTRA_KEY):
+        return difference.name == first.name
+    return False
+
+
+def _format_group(group):
+    first = group[0]
+    type_str = first.element.capitalize()
+    if first.kind == CLASS_CHANGED:
+        return [
+            "\nClass differs, specified '{}', but device has '{}'".format(
+                first.specification, first.device
+            )
+        ]
+    if first.kind == CHANGED:
+        return [
+            "{} [{}] differs:".format(type_str, first.name),
+            "\t{}:\n\t\tspecification: {}\n\t\tdevice: {}".format(
+                first.key, first.specification, first.device
+            ),
+        ]
+    if first.kind in (MISSING, EXTRA):
+        names = ",".join(difference.name for difference in group)
+        if first.element == "property":
+            return [_PROPERTY_MESSAGES[first.kind].format(names=names)]
+        return [_MESSAGES[first.kind].format(type_str=type_str, names=names)]
+    keys = ",".join(difference.key for difference in group)
+    return [_MESSAGES[first.kind].format(type_str=type_str, name=first.name, keys=keys)]
+
+
+def dump_binary(report):
+    """Serialise differences, or a report containing them, in a compact format.
+
+    The data starts with a magic string and the format version, followed by a table
+    of all the distinct strings and the report, which refers to the strings by
+    their index. Names and keys that recur across many devices are thus stored once.
+
+    Parameters
+    ----------
+    report : object
+        A list of Difference records, or plain data (dicts, lists, strings, numbers)
+        containing the records as dicts, e.g. the report of many validations.
+
+    Returns
+    -------
+    data : bytes
+
+    """
+    # The compiled format of the precompiled parser imports tango, which is only
+    # needed when it is used.
+    from tango_simlib.utilities.precompiled_parser import encode_compiled
+
+    if isinstance(report, list) and all(isinstance(item, Difference) for item in report):
+        report = [difference.to_dict() for difference in report]
+    return (
+        BINARY_MAGIC + struct.pack(">H", BINARY_FORMAT_VERSION) + encode_compiled(report)
+    )
+
+
+def load_binary(data):
+    """Deserialise data written by :func:`dump_binary`.
+
+    Parameters
+    ----------
+    data : bytes
+
+    Returns
+    -------
+    report : object
+        The serialised report, with the difference records as dicts.
+
+    Raises
+    ------
+    ValueError
+        If the data is not in the binary format or its version is not supported.
+
+    """
+    from tango_simlib.utilities.precompiled_parser import decode_compiled
+
+    magic_length = len(BINARY_MAGIC)
+    if data[:magic_length] != BINARY_MAGIC:
+        raise ValueError("The data is not a binary specification difference report.")
+    (version,) = struct.unpack_from(">H", data, magic_length)
+    if version != BINARY_FORMAT_VERSION:
+        raise ValueError(
+            "Unsupported binary specification difference format version {}, "
+            "expected {}.".format(version, BINARY_FORMAT_VERSION)
+        )
+    return decode_compiled(data, magic_length + 2)
@@ -0,0 +1,183 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Download of the specification files that devices are validated against."""
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "tango_simlib",
+    "specifications",
+)
+# Seconds to wait for the server to respond.
+DEFAULT_TIMEOUT = 30.0
+# The number of connections kept open to each host.
+DEFAULT_POOL_SIZE = 16
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+class SpecificationFetcher(object):
+    """Download specification files over HTTP, once per URL.
+
+    Every URL is downloaded at most once for the lifetime of the fetcher, however
+    many threads ask for it, over a pool of connections kept open between requests.
+    The downloads are also kept in an on-disk cache, and a cached file is only
+    downloaded again when the server reports that it changed since, by its
+    ``ETag`` or ``Last-Modified`` header.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The directory of the on-disk cache, or None to not use one.
+    session : requests.Session
+        The session to download with, by default a new one.
+    timeout : float
+        Seconds to wait for the server to respond.
+
+    """
+
+    def __init__(
+        self, cache_dir=DEFAULT_CACHE_DIR, session=None, timeout=DEFAULT_TIMEOUT
+    ):
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=DEFAULT_POOL_SIZE, pool_maxsize=DEFAULT_POOL_SIZE
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self._specifications = {}
+        self._url_locks = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, url):
+        """Get the content of a specification file.
+
+        Parameters
+        ----------
+        url : str
+            The URL to the specification file
+
+        Returns
+        -------
+        str
+            The specification in YAML format
+
+        Raises
+        ------
+        requests.HTTPError
+            If the server responds with an error
+
+        """
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            if url not in self._specifications:
+                self._specifications[url] = self._download(url)
+            return self._specifications[url]
+
+    def _download(self, url):
+        """Download a specification file, unless the cached copy is still current"""
+        cached = self._read_cache(url)
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+        response = self.session.get(
+            url, headers=headers, allow_redirects=True, timeout=self.timeout
+        )
+        if cached and response.status_code == 304:
+            MODULE_LOGGER.debug("Specification %s not modified, using the cache", url)
+            return cached["text"]
+        response.raise_for_status()
+        self._write_cache(
+            url,
+            {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "text": response.text,
+            },
+        )
+        return response.text
+
+    def _get_cache_path(self, url):
+        return os.path.join(
+            self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json"
+        )
+
+    def _read_cache(self, url):
+        """The cached download of the URL, or None if there is none"""
+        if not self.cache_dir:
+            return None
+        try:
+            with io.open(self._get_cache_path(url), "r", encoding="utf-8") as cache_file:
+                cached = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return None
+        # Guard against a hash collision.
+        if cached.get("url") != url:
+            return None
+        return cached
+
+    def _write_cache(self, url, cached):
+        """Cache a download, replacing the cached file in one step"""
+        if not self.cache_dir:
+            return
+        if not os.path.isdir(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                # Created in the meantime, or it cannot be; the latter fails below.
+                pass
+        path = None
+        try:
+            handle, path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(handle, "wb") as cache_file:
+                cache_file.write(json.dumps(cached).encode("utf-8"))
+            os.rename(path, self._get_cache_path(url))
+        except (IOError, OSError):
+            MODULE_LOGGER.warning(
+                "Could not cache specification %s in %s",
+                url,
+                self.cache_dir,
+                exc_info=True,
+            )
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+def get_specification_fetcher():
+    """The fetcher shared by the validations, with the default on-disk cache.
+
+    Returns
+    -------
+    SpecificationFetcher
+
+    """
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = SpecificationFetcher()
+        return _default_fetcher
@@ -0,0 +1,118 @@
+#########################################################################################
+# Copyright 2020 SKA South Africa (http://ska.ac.za/)                                   #
+#                                                                                       #
+# BSD license - see LICENSE.txt for details                                             #
+#########################################################################################
+"""Timing of the start-up phases of the simulator device servers."""
+from __future__ import absolute_import, division, print_function
+from future import standard_library
+
+standard_library.install_aliases()  # noqa: E402
+
+import json
+import logging
+import time
+from builtins import object
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MODULE_LOGGER = logging.getLogger(__name__)
+
+
+class StartupTimer(object):
+    """Record how long each start-up phase of a device server takes.
+
+    A phase that runs more than once (e.g. once per device or per description file)
+    is reported once, with the total duration and the number of times it ran. The
+    duration of a phase includes the phases that ran inside it.
+
+    Parameters
+    ----------
+    start_time : float
+        Time at which the start-up began, by default when the timer is created.
+    clock : callable
+        Function returning the current time in seconds.
+
+    """
+
+    def __init__(self, start_time=None, clock=time.time):
+        self.clock = clock
+        self.reset(start_time)
+
+    def reset(self, start_time=None):
+        """Discard all the recorded phases and restart the timer."""
+        self.start_time = self.clock() if start_time is None else start_time
+        self.first_read_time = None
+        self._phases = OrderedDict()
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager timing the code it wraps as the phase `name`."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add_phase(name, self.clock() - start)
+
+    def add_phase(self, name, duration):
+        """Record that the phase `name` ran for `duration` seconds."""
+        phase = self._phases.get(name)
+        if phase is None:
+            self._phases[name] = [duration, 1]
+        else:
+            phase[0] += duration
+            phase[1] += 1
+
+    def record_first_read(self):
+        """Record the time of the first attribute read served by the device server.
+
+        The full report is logged the first time this is called.
+
+        Returns
+        -------
+        recorded : bool
+            False if the first read was already recorded.
+
+        """
+        if self.first_read_time is not None:
+            return False
+        self.first_read_time = self.clock()
+        self.log_report()
+        return True
+
+    def get_report(self):
+        """Get the start-up timing report.
+
+        Returns
+        -------
+        report : dict
+            phases : list
+                The phases in the order they first ran, each a dict with the phase
+                `name`, the total `duration` in seconds and the `count` of runs.
+            first_read : float or None
+                Seconds from the start until the first attribute read was served,
+                None if no attribute was read yet.
+
+        """
+        first_read = None
+        if self.first_read_time is not None:
+            first_read = self.first_read_time - self.start_time
+        return {
+            "phases": [
+                {"name": name, "duration": duration, "count": count}
+                for name, (duration, count) in self._phases.items()
+            ],
+            "first_read": first_read,
+        }
+
+    def get_report_json(self):
+        """Get the start-up timing report as a JSON string."""
+        return json.dumps(self.get_report())
+
+    def log_report(self, logger=MODULE_LOGGER):
+        """Log the start-up timing report as one JSON formatted line."""
+        logger.info("Start-up timing report: %s", self.get_report_json())
+
+
+# The start-up timer of the device server running in this process.
+startup_timer = StartupTimer()
@@ -36,7 +36,16 @@ class TangoDeviceParser(Parser):
         """
         self.device_proxy = tango.DeviceProxy(tango_device_name)
         self.device_class_name = self.device_proxy.info().dev_class
+        self.parse_attributes()
+        self.parse_commands()
+        self.parse_properties()
 
+    def parse_attributes(self):
+        """Extract the attribute configuration from the device, replacing the
+        attributes extracted before.
+        """
+        assert self.device_proxy, "`parse` needs to be called first"
+        self.data_dict["meta"]["attributes"] = {}
         for attribute in self.device_proxy.attribute_list_query_ex():
             attr_data = {
                 "name": attribute.name,
@@ -61,6 +70,12 @@ class TangoDeviceParser(Parser):
             }
             self.data_dict["meta"]["attributes"][attribute.name] = attr_data
 
+    def parse_commands(self):
+        """Extract the commands from the device, replacing the commands extracted
+        before.
+        """
+        assert self.device_proxy, "`parse` needs to be called first"
+        self.data_dict["meta"]["commands"] = {}
         for command in self.device_proxy.get_command_config():
             self.data_dict["meta"]["commands"][command.cmd_name] = {
                 "name": command.cmd_name,
@@ -71,6 +86,12 @@ class TangoDeviceParser(Parser):
                 "disp_level": command.disp_level.name,
             }
 
+    def parse_properties(self):
+        """Extract the property names from the device, replacing the properties
+        extracted before.
+        """
+        assert self.device_proxy, "`parse` needs to be called first"
+        self.data_dict["meta"]["properties"] = {}
         for prop in self.device_proxy.get_property_list("*"):
             self.data_dict["meta"]["properties"][prop] = {"name": prop}
 
@@ -8,19 +8,35 @@ from future import standard_library
 
 standard_library.install_aliases()  # noqa: E402
 
+import atexit
 import errno
+import json
 import logging
 import mock
 import os
 import shutil
 import sys
 import tempfile
+import threading
 import time
 
 from builtins import object
 
+from tango import DevFailed
+from tango.test_context import MultiDeviceTestContext
+
+from tango_simlib import tango_sim_generator
+
 LOGGER = logging.getLogger(__name__)
 
+# Polling: time to wait for the new periods, initial delay before retrying to set
+# them after a failure and period at which the polling status is queried [seconds].
+POLLING_TIMEOUT = 5.0
+POLLING_RETRY_DELAY = 0.05
+POLLING_STATUS_PERIOD = 0.01
+
+DEFAULT_POOLED_DEVICE_NAME = "test/nodb/tangodeviceserver"
+
 
 def cleanup_tempfile(test_instance, unlink=False, *mkstemp_args, **mkstemp_kwargs):
     """Return filename of a new tempfile and add cleanup callback to test_instance.
@@ -74,7 +90,131 @@ def cleanup_tempdir(test_instance, *mkdtemp_args, **mkdtemp_kwargs):
     return dirname
 
 
-def set_attributes_polling(test_case, device_proxy, device_server, poll_periods):
+def get_attributes_polling(device_proxy):
+    """Get the polling periods of all the polled attributes of a device in one call.
+
+    Parameters
+    ----------
+    device_proxy : PyTango.DeviceProxy instance
+        The Tango device proxy instance
+
+    Returns
+    -------
+    poll_periods : dict
+        Lower case attribute name -> polling period in milliseconds.
+
+    """
+    poll_periods = {}
+    for status in device_proxy.polling_status():
+        fields = dict(
+            line.split(" = ", 1) for line in status.splitlines() if " = " in line
+        )
+        if "Polled attribute name" in fields:
+            poll_periods[fields["Polled attribute name"].lower()] = int(
+                fields["Polling period (mS)"]
+            )
+    return poll_periods
+
+
+def apply_attributes_polling(
+    device_proxy,
+    poll_periods,
+    device_server=None,
+    sim_control=None,
+    timeout=POLLING_TIMEOUT,
+):
+    """Set the polling periods of many attributes and wait until they are applied.
+
+    The periods are set in one call by the device if it is a generated simulator,
+    i.e. if `device_server` is a simulator device instance or `sim_control` is
+    given, otherwise with a call per attribute. The polling status of the device is
+    then queried until it shows the new periods. Failed calls are retried with an
+    increasing delay.
+
+    Parameters
+    ----------
+    device_proxy : PyTango.DeviceProxy instance
+        The Tango device proxy instance
+    poll_periods : dict {"attribute_name" : poll_period}
+        `poll_period` in milliseconds as per Tango APIs, 0 or falsy to disable polling.
+    device_server : PyTango.Device instance
+        The instance of the device class `device_proxy` is talking to, if it runs
+        in this process.
+    sim_control : PyTango.DeviceProxy instance
+        The SimControl device of the simulated device, if `device_server` is not
+        given.
+    timeout : float
+        Time after which the polling should be applied [seconds].
+
+    Raises
+    ------
+    RuntimeError
+        If the polling status does not show the new periods in time.
+
+    """
+    deadline = time.time() + timeout
+    retry_delay = POLLING_RETRY_DELAY
+    pending = _get_pending_polling(device_proxy, poll_periods)
+    while pending:
+        try:
+            _set_attributes_polling(device_proxy, pending, device_server, sim_control)
+        except DevFailed:
+            if time.time() + retry_delay > deadline:
+                raise
+            LOGGER.warning(
+                "Retrying to set the polling of attributes %s in %s s",
+                sorted(pending),
+                retry_delay,
+                exc_info=True,
+            )
+            time.sleep(retry_delay)
+            retry_delay *= 2
+            pending = _get_pending_polling(device_proxy, pending)
+            continue
+        # The polling thread applies the periods asynchronously.
+        pending = _get_pending_polling(device_proxy, pending)
+        while pending and time.time() < deadline:
+            time.sleep(POLLING_STATUS_PERIOD)
+            pending = _get_pending_polling(device_proxy, pending)
+        if pending:
+            raise RuntimeError(
+                "Polling of attributes {} not applied after {} s".format(
+                    sorted(pending), timeout
+                )
+            )
+
+
+def _get_pending_polling(device_proxy, poll_periods):
+    """The polling periods that the device does not have yet."""
+    current_periods = get_attributes_polling(device_proxy)
+    return {
+        attr: period
+        for attr, period in poll_periods.items()
+        if current_periods.get(attr.lower(), 0) != (period or 0)
+    }
+
+
+def _set_attributes_polling(device_proxy, poll_periods, device_server, sim_control):
+    if hasattr(device_server, "set_attributes_polling"):
+        device_server.set_attributes_polling(poll_periods)
+    elif sim_control is not None:
+        sim_control.SetAttributesPolling(json.dumps(poll_periods))
+    else:
+        for attr, period in poll_periods.items():
+            if period:
+                device_proxy.poll_attribute(attr, period)
+            elif device_server is not None:
+                # TODO (NM 2016-04-11) check if this is still needed after upgrade to
+                # Tango 9.x For some reason it only works if the device_proxy is used
+                # to set polling, but the device_server is used to clear the polling.
+                device_server.stop_poll_attribute(attr)
+            else:
+                device_proxy.stop_poll_attribute(attr)
+
+
+def set_attributes_polling(
+    test_case, device_proxy, device_server, poll_periods, sim_control=None
+):
     """Set attribute polling and restore after test
 
     Parameters
@@ -84,9 +224,13 @@ def set_attributes_polling(test_case, device_proxy, device_server, poll_periods)
     device_proxy : PyTango.DeviceProxy instance
         The Tango device proxy instance
     device_server : PyTango.Device instance
-        The instance of the device class `device_proxy` is talking to
+        The instance of the device class `device_proxy` is talking to, or None if it
+        does not run in this process.
     poll_periods : dict {"attribute_name" : poll_period}
         `poll_poriod` in milliseconds as per Tango APIs, 0 or falsy to disable polling.
+    sim_control : PyTango.DeviceProxy instance
+        The SimControl device of the simulated device, see
+        :func:`apply_attributes_polling`.
 
     Returns
     -------
@@ -97,69 +241,17 @@ def set_attributes_polling(test_case, device_proxy, device_server, poll_periods)
         test.
 
     """
-    # TODO (NM 2016-04-11) check if this is still needed after upgrade to Tango 9.x For
-    # some reason it only works if the device_proxy is used to set polling, but the
-    # device_server is used to clear the polling. If polling is cleared using device_proxy
-    # it seem to be impossible to restore the polling afterwards.
-    attributes = poll_periods.keys()
+    current_periods = get_attributes_polling(device_proxy)
     initial_polling = {
-        attr: device_proxy.get_attribute_poll_period(attr) for attr in attributes
+        attr: current_periods.get(attr.lower(), 0) for attr in poll_periods
     }
-    retry_time = 0.5
-
-    for attr in attributes:
-        initial_period = initial_polling[attr]
-        new_period = poll_periods[attr]
-        # Disable polling for attributes with poll_period of zero / falsy
-        # zero initial_period implies no polling currently configed
-        if not new_period and initial_period != 0:
-            LOGGER.debug("not setting polling for {}".format(attr))
-            device_server.stop_poll_attribute(attr)
-        else:
-            # Set the polling
-            LOGGER.debug("setting polling for {}".format(attr))
-            try:
-                device_proxy.poll_attribute(attr, new_period)
-                # TODO See (NM 2016-04-11) comment below about back-to-back calls
-                time.sleep(0.05)
-            except Exception:
-                retry = True
-                LOGGER.warning(
-                    "Setting polling of attribute {} in {} due to unhandled"
-                    "exception in poll_attribute command".format(attr, retry_time),
-                    exc_info=True,
-                )
-            else:
-                retry = False
-
-            if retry:
-                time.sleep(retry_time)
-                device_proxy.poll_attribute(attr, new_period)
+    apply_attributes_polling(device_proxy, poll_periods, device_server, sim_control)
 
     def restore_polling():
         """Restore initial polling, for use during cleanup / teardown"""
-        for attr, period in initial_polling.items():
-            if period == 0:
-                continue  # zero period implies no polling, nothing to do
-            try:
-                device_proxy.poll_attribute(attr, period)
-                # TODO (NM 2016-04-11) For some reason Tango doesn't seem to handle
-                # back-to-back calls, and even with the sleep it sometimes goes bad. Need
-                # to check if this is fixed (and core dumps) when we upgrade to Tango 9.x
-                time.sleep(0.05)
-            except Exception:
-                retry = True
-                LOGGER.warning(
-                    "retrying restore of attribute {} in {} due to unhandled"
-                    "exception in poll_attribute command".format(attr, retry_time),
-                    exc_info=True,
-                )
-            else:
-                retry = False
-
-            if retry:
-                time.sleep(retry_time)
-                device_proxy.poll_attribute(attr, period)
+        apply_attributes_polling(
+            device_proxy, initial_polling, device_server, sim_control
+        )
 
     test_case.addCleanup(restore_polling)
     return restore_polling
@@ -235,3 +327,173 @@ class ClassCleanupUnittestMixin(object):
     @classmethod
     def tearDownClass(cls):
         cls.doCleanupsClass()
+
+
+class PooledDevice(object):
+    """A simulated device and its SimControl device, kept running by a pool.
+
+    The devices run in a device server in a child process, so the model is only
+    accessible through the SimControl device.
+
+    Attributes
+    ----------
+    sim_data_files : tuple
+        Paths to the simulator description files of the device.
+    device_name, control_device_name : str
+        TANGO names of the simulated device and of its SimControl device.
+    device, sim_control : PyTango.DeviceProxy instance
+        Proxies to the simulated device and to the SimControl device.
+    tango_context : tango.test_context.MultiDeviceTestContext instance
+        The test context running the device server.
+
+    """
+
+    def __init__(self, sim_data_files, device_class_name=None, device_name=None):
+        self.sim_data_files = tuple(sim_data_files)
+        self.device_name = device_name or DEFAULT_POOLED_DEVICE_NAME
+        self.control_device_name = "%scontrol" % self.device_name
+        models = tango_sim_generator.configure_device_models(
+            list(self.sim_data_files), self.device_name
+        )
+        device_server, sim_control = tango_sim_generator.get_tango_device_server(
+            models, list(self.sim_data_files), device_class_name
+        )
+        self.tango_context = MultiDeviceTestContext(
+            [
+                {"class": device_server, "devices": [{"name": self.device_name}]},
+                {
+                    "class": sim_control,
+                    "devices": [
+                        {
+                            "name": self.control_device_name,
+                            "properties": {"model_key": self.device_name},
+                        }
+                    ],
+                },
+            ],
+            process=True,
+        )
+        # The server process keeps the database mock it is started with.
+        with mock.patch("tango_simlib.utilities.helper_module.get_database"):
+            self.tango_context.start()
+        self.device = self.tango_context.get_device(self.device_name)
+        self.sim_control = self.tango_context.get_device(self.control_device_name)
+        self.sim_control.TakeModelSnapshot()
+        self.in_use = False
+
+    def reset(self):
+        """Put the model and the device state back as they were at start-up."""
+        self.sim_control.RestoreModelSnapshot()
+
+    def stop(self):
+        self.tango_context.stop()
+
+
+class DeviceTestContextPool(object):
+    """Simulated devices kept running for many tests, instead of one server per test.
+
+    The device servers are keyed by (simulator description files, device class
+    name, device name). A device is handed out to one test at a time, and another
+    server is started for the same key if all of them are in use, e.g. by the
+    threads of a parallel test runner. A released device has its model restored
+    from a snapshot taken at start-up and its initial state set, which is much
+    faster than starting a new server. Other changes to the device, e.g. to its
+    attribute polling, must be undone by the tests.
+
+    Each server runs in a child process, so that several of them can run at the
+    same time and the tests can start their own servers in the test process.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def acquire(self, sim_data_files, device_class_name=None, device_name=None):
+        """Get a simulated device for the exclusive use of the caller.
+
+        Parameters
+        ----------
+        sim_data_files : list
+            Paths to the xmi/json/fgo files describing the device.
+        device_class_name : str
+            TANGO device class name, by default read from `sim_data_files`.
+        device_name : str
+            TANGO device name, by default "test/nodb/tangodeviceserver". The
+            SimControl device is named after it with a "control" suffix.
+
+        Returns
+        -------
+        device : :class:`PooledDevice` instance
+            To be passed to :meth:`release` at the end of the test.
+
+        """
+        key = (tuple(sim_data_files), device_class_name, device_name)
+        with self._lock:
+            for device in self._devices.get(key, []):
+                if not device.in_use:
+                    device.in_use = True
+                    return device
+        # The other devices can be acquired while the server starts.
+        device = PooledDevice(sim_data_files, device_class_name, device_name)
+        device.in_use = True
+        with self._lock:
+            self._devices.setdefault(key, []).append(device)
+        return device
+
+    def release(self, device):
+        """Reset a device from :meth:`acquire` and make it available again.
+
+        A device that cannot be reset is stopped and removed from the pool.
+
+        """
+        try:
+            device.reset()
+        except Exception:
+            LOGGER.exception("Could not reset pooled device %s", device.device_name)
+            with self._lock:
+                for devices in self._devices.values():
+                    if device in devices:
+                        devices.remove(device)
+            device.stop()
+            raise
+        finally:
+            device.in_use = False
+
+    def close(self):
+        """Stop all the device servers."""
+        with self._lock:
+            devices = [device for devices in self._devices.values() for device in devices]
+            self._devices = {}
+        for device in devices:
+            device.stop()
+
+
+# The pool used by `get_pooled_device`.
+device_test_context_pool = DeviceTestContextPool()
+atexit.register(device_test_context_pool.close)
+
+
+def get_pooled_device(
+    test_case, sim_data_files, device_class_name=None, device_name=None
+):
+    """Acquire a device of the shared pool, released when the test is cleaned up.
+
+    Parameters
+    ----------
+    test_case : unittest.TestCase instance or class
+        Test, or class using :class:`ClassCleanupUnittestMixin`, to release the
+        device with.
+    sim_data_files, device_class_name, device_name
+        See :meth:`DeviceTestContextPool.acquire`.
+
+    Returns
+    -------
+    device : :class:`PooledDevice` instance
+
+    """
+    device = device_test_context_pool.acquire(
+        sim_data_files, device_class_name, device_name
+    )
+    test_case.addCleanup(device_test_context_pool.release, device)
+    return device
@@ -4,13 +4,25 @@
 # BSD license - see LICENSE.txt for details                                             #
 #########################################################################################
 """This module validates the conformance of a Tango device against a specification"""
+import glob
+import hashlib
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import requests
 import yaml
 
 from tango_simlib.tango_yaml_tools.base import TangoToYAML
-from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
+from tango_simlib.utilities.specification_diff import (
+    diff_element,
+    diff_elements,
+    diff_names,
+    diff_specifications,
+    format_differences,
+)
+from tango_simlib.utilities.specification_fetcher import get_specification_fetcher
 
 MINIMAL_SPEC_FORMAT = """
 class:
@@ -20,8 +32,25 @@ meta:
     properties:
 """
 
+# The number of devices interrogated at the same time when validating many devices,
+# which bounds the number of device proxies in use.
+DEFAULT_MAX_WORKERS = 16
+
+FQDN_PATTERN = re.compile(r"^(tango://)?(?P<host>[^:/]+):(?P<port>\d+)/(?P<name>.+)$")
+
+# Use the faster libyaml parser when it is available.
+YAML_LOADER = getattr(yaml, "CFullLoader", yaml.FullLoader)
+
+# The parsed specifications, keyed by the hash of their content, so that every
+# specification is parsed and checked once however many devices are validated.
+SPECIFICATION_CACHE_SIZE = 64
+_specification_cache = {}
+_specification_cache_lock = threading.Lock()
 
-def validate_device_from_url(tango_device_name, url_to_yaml_file, bidirectional):
+
+def validate_device_from_url(
+    tango_device_name, url_to_yaml_file, bidirectional, fetcher=None
+):
     """Retrieves the YAML from the URL and checks conformance against the Tango device.
 
     Parameters
@@ -36,15 +65,20 @@ def validate_device_from_url(tango_device_name, url_to_yaml_file, bidirectional)
     bidirectional: bool
         Whether to include details on the device that is not in the specification
 
+    fetcher : SpecificationFetcher
+        The fetcher to download the specification with, by default the shared one
+
     Returns
     -------
     str
         The validation result
     """
-    response = requests.get(url_to_yaml_file, allow_redirects=True)
-    response.raise_for_status()
-    return compare_data(
-        response.text, get_device_specification(tango_device_name), bidirectional
+    return "\n".join(
+        get_differences(
+            read_specification_from_url(url_to_yaml_file, fetcher),
+            get_device_data(tango_device_name),
+            bidirectional,
+        )
     )
 
 
@@ -68,14 +102,261 @@ def validate_device_from_path(tango_device_name, path_to_yaml_file, bidirectiona
     str
         The validation result
     """
+    return "\n".join(
+        get_differences(
+            read_specification_from_path(path_to_yaml_file),
+            get_device_data(tango_device_name),
+            bidirectional,
+        )
+    )
+
+
+def read_specification_from_url(url_to_yaml_file, fetcher=None):
+    """Download a specification file.
+
+    Parameters
+    ----------
+    url_to_yaml_file : str
+        The URL to the specification file
+
+    fetcher : SpecificationFetcher
+        The fetcher to download with, by default the shared one, which downloads
+        each URL once and keeps the downloads in an on-disk cache
+
+    Returns
+    -------
+    str
+        The specification in YAML format
+    """
+    if fetcher is None:
+        fetcher = get_specification_fetcher()
+    return fetcher.fetch(url_to_yaml_file)
+
+
+def read_specification_from_path(path_to_yaml_file):
+    """Read a specification file.
+
+    Parameters
+    ----------
+    path_to_yaml_file : str
+        The path to the specification file
+
+    Returns
+    -------
+    str
+        The specification in YAML format
+    """
     file_path = Path(path_to_yaml_file)
     assert file_path.is_file(), "{} is not a file".format(file_path)
-    file_data = ""
     with open(str(file_path), "r") as data_file:
-        file_data = data_file.read()
-    return compare_data(
-        file_data, get_device_specification(tango_device_name), bidirectional
-    )
+        return data_file.read()
+
+
+def expand_specification_paths(paths):
+    """Expand the glob patterns in a list of specification file paths.
+
+    Parameters
+    ----------
+    paths : list of str
+        Paths to specification files, or glob patterns matching them
+
+    Returns
+    -------
+    list of str
+        The paths to the specification files, in the given order without duplicates
+    """
+    expanded_paths = []
+    for path in paths:
+        matches = sorted(glob.glob(path)) if glob.has_magic(path) else [path]
+        assert matches, "No specification file matches {}".format(path)
+        expanded_paths.extend(match for match in matches if match not in expanded_paths)
+    return expanded_paths
+
+
+def expand_device_names(tango_device_names):
+    """Expand the wildcards in a list of Tango device names.
+
+    Names containing a ``*`` are looked up among the devices exported in the TANGO
+    database, the one given in a FQDN or else the default one.
+
+    Parameters
+    ----------
+    tango_device_names : list of str
+        Tango device names in the domain/family/member format or the
+        FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member
+
+    Returns
+    -------
+    list of str
+        The device names, in the given order without duplicates
+    """
+    expanded_names = []
+    for tango_device_name in tango_device_names:
+        matches = [tango_device_name]
+        if "*" in tango_device_name:
+            # Only import tango when a device is accessed.
+            import tango
+
+            fqdn = FQDN_PATTERN.match(tango_device_name)
+            if fqdn:
+                database = tango.Database(fqdn.group("host"), int(fqdn.group("port")))
+                pattern = fqdn.group("name")
+                prefix = tango_device_name[: fqdn.start("name")]
+            else:
+                database = tango.Database()
+                pattern = tango_device_name
+                prefix = ""
+            matches = [
+                prefix + name
+                for name in database.get_device_exported(pattern).value_string
+            ]
+        expanded_names.extend(name for name in matches if name not in expanded_names)
+    return expanded_names
+
+
+def validate_devices(
+    tango_device_names, specifications, bidirectional, max_workers=DEFAULT_MAX_WORKERS
+):
+    """Check the conformance of many Tango devices against their specifications.
+
+    The devices are interrogated concurrently, at most `max_workers` at a time.
+    When more than one specification is given, each device is checked against the
+    specification of its class.
+
+    Parameters
+    ----------
+    tango_device_names : list of str
+        Tango device names in the domain/family/member format or the
+        FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member
+
+    specifications : list of tuple
+        (source, specification in YAML format) for each specification
+
+    bidirectional: bool
+        Whether to include details on the device that is not in the specification
+
+    max_workers : int
+        The maximum number of devices interrogated at the same time
+
+    Returns
+    -------
+    list of dict
+        The validation result of each device, in the order of `tango_device_names`,
+        with the keys "device", "specification", "status" ("passed", "failed" or
+        "error"), "differences" (list of str), "records" (the differences as dicts,
+        see `Difference`) and "error" (str or None)
+    """
+    specifications_by_class = index_specifications(specifications)
+
+    def validate(tango_device_name):
+        try:
+            return get_validation_result(
+                tango_device_name,
+                get_device_data(tango_device_name),
+                specifications_by_class,
+                bidirectional,
+            )
+        except Exception as exc:
+            return get_error_result(tango_device_name, exc)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(validate, tango_device_names))
+
+
+def index_specifications(specifications):
+    """Index specifications by the class of the devices they specify.
+
+    Parameters
+    ----------
+    specifications : list of tuple
+        (source, specification in YAML format) for each specification. When there
+        is more than one, each has to name a different class.
+
+    Returns
+    -------
+    dict
+        The (source, specification in YAML format) by class name, or a single
+        specification by None, which applies to devices of any class
+    """
+    assert specifications, "No specification given"
+    classes = [load_specification(spec_yaml)["class"] for _, spec_yaml in specifications]
+    if len(specifications) == 1:
+        return {None: specifications[0]}
+    specifications_by_class = {}
+    for (source, specification_yaml), device_class in zip(specifications, classes):
+        assert device_class, "Specification {} does not name a class".format(source)
+        assert (
+            device_class not in specifications_by_class
+        ), "More than one specification for class {}".format(device_class)
+        specifications_by_class[device_class] = (source, specification_yaml)
+    return specifications_by_class
+
+
+def get_validation_result(
+    tango_device_name, tango_device_data, specifications_by_class, bidirectional
+):
+    """Check the data of a device against the specification of its class.
+
+    Parameters
+    ----------
+    tango_device_name : str
+        The Tango device name, to report
+    tango_device_data : dict
+        The Tango device specification, as built by `get_device_data`
+    specifications_by_class : dict
+        The specifications, as indexed by `index_specifications`
+    bidirectional: bool
+        Whether to include details on the device that is not in the specification
+
+    Returns
+    -------
+    dict
+        The validation result, see `validate_devices`
+    """
+    if None in specifications_by_class:
+        source, specification_yaml = specifications_by_class[None]
+    elif tango_device_data["class"] in specifications_by_class:
+        source, specification_yaml = specifications_by_class[tango_device_data["class"]]
+    else:
+        return get_error_result(
+            tango_device_name,
+            "No specification for class {}".format(tango_device_data["class"]),
+        )
+    records = get_difference_records(specification_yaml, tango_device_data, bidirectional)
+    differences = format_differences(records)
+    return {
+        "device": tango_device_name,
+        "specification": source,
+        "status": "failed" if differences else "passed",
+        "differences": differences,
+        "records": [record.to_dict() for record in records],
+        "error": None,
+    }
+
+
+def get_error_result(tango_device_name, error):
+    """The validation result of a device that could not be validated.
+
+    Parameters
+    ----------
+    tango_device_name : str
+        The Tango device name, to report
+    error : Exception or str
+        Why the device could not be validated
+
+    Returns
+    -------
+    dict
+        The validation result, see `validate_devices`
+    """
+    return {
+        "device": tango_device_name,
+        "specification": None,
+        "status": "error",
+        "differences": [],
+        "records": [],
+        "error": str(error) or repr(error),
+    }
 
 
 def get_device_specification(tango_device_name):
@@ -92,10 +373,77 @@ def get_device_specification(tango_device_name):
     str
         The device specification in YAML format
     """
+    # Only import tango when a device is accessed.
+    from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
+
     parser = TangoToYAML(TangoDeviceParser)
     return parser.build_yaml_from_device(tango_device_name)
 
 
+def get_device_data(tango_device_name):
+    """Interrogate a device for the data of its specification, without the YAML
+
+    Parameters
+    ----------
+    tango_device_name : str
+        Tango device name in the domain/family/member format or the
+        FQDN tango://<TANGO_HOST>:<TANGO_PORT>/domain/family/member
+
+    Returns
+    -------
+    dict
+        The device specification, as it would be loaded from its YAML format
+    """
+    # Only import tango when a device is accessed.
+    from tango_simlib.utilities.tango_device_parser import TangoDeviceParser
+
+    parser = TangoToYAML(TangoDeviceParser)
+    return parser.build_data_from_device(tango_device_name)
+
+
+def load_specification(specification_yaml):
+    """Parse and check a specification, once for the same content.
+
+    Parameters
+    ----------
+    specification_yaml : str
+        The specification in YAML format
+
+    Returns
+    -------
+    dict
+        The specification, with empty lists for missing commands, attributes and
+        properties. It is shared between callers and must not be modified.
+    """
+    content = specification_yaml
+    if not isinstance(content, bytes):
+        content = content.encode("utf-8")
+    key = hashlib.sha1(content).hexdigest()
+    with _specification_cache_lock:
+        specification_data = _specification_cache.get(key)
+    if specification_data is not None:
+        return specification_data
+
+    specification_data = _get_data(specification_yaml)
+    _validate_spec_data(specification_data)
+    for type_str in ["commands", "attributes", "properties"]:
+        if not specification_data["meta"][type_str]:
+            specification_data["meta"][type_str] = []
+    with _specification_cache_lock:
+        if len(_specification_cache) >= SPECIFICATION_CACHE_SIZE:
+            _specification_cache.clear()
+        _specification_cache[key] = specification_data
+    return specification_data
+
+
+def _get_data(specification_yaml):
+    """Load YAML built from a specification or device, without the enclosing list"""
+    data = yaml.load(specification_yaml, Loader=YAML_LOADER)
+    if isinstance(data, list):
+        data = data[0]
+    return data
+
+
 def compare_data(specification_yaml, tango_device_yaml, bidirectional):
     """Compare 2 sets of YAML built from the specification and from the device
 
@@ -115,61 +463,59 @@ def compare_data(specification_yaml, tango_device_yaml, bidirectional):
     str
         The validation result
     """
-    validate_spec_structure(specification_yaml)
-    specification_data = yaml.load(specification_yaml, Loader=yaml.FullLoader)
-    tango_device_data = yaml.load(tango_device_yaml, Loader=yaml.FullLoader)
-    if isinstance(specification_data, list):
-        specification_data = specification_data[0]
-    if isinstance(tango_device_data, list):
-        tango_device_data = tango_device_data[0]
-
-    issues = []
-    if not specification_data["meta"]["commands"]:
-        specification_data["meta"]["commands"] = []
-    if not specification_data["meta"]["attributes"]:
-        specification_data["meta"]["attributes"] = []
-    if not specification_data["meta"]["properties"]:
-        specification_data["meta"]["properties"] = []
-
-    # Class
-    if specification_data["class"]:
-        if tango_device_data["class"] != specification_data["class"]:
-            issues.append(
-                "\nClass differs, specified '{}', but device has '{}'".format(
-                    specification_data["class"], tango_device_data["class"]
-                )
-            )
-
-    # Commands
-    issues.extend(
-        check_list_dict_differences(
-            specification_data["meta"]["commands"],
-            tango_device_data["meta"]["commands"],
-            "Command",
-            bidirectional,
-        )
+    return "\n".join(
+        get_differences(specification_yaml, _get_data(tango_device_yaml), bidirectional)
     )
 
-    # Attributes
-    issues.extend(
-        check_list_dict_differences(
-            specification_data["meta"]["attributes"],
-            tango_device_data["meta"]["attributes"],
-            "Attribute",
-            bidirectional,
-        )
-    )
 
-    # Properties
-    issues.extend(
-        check_property_differences(
-            specification_data["meta"]["properties"],
-            tango_device_data["meta"]["properties"],
-            bidirectional,
-        )
+def get_differences(specification_yaml, tango_device_data, bidirectional):
+    """List the differences between the specification and the device
+
+    Parameters
+    ----------
+    specification_yaml : str
+        The specification in YAML format
+
+    tango_device_data : dict
+        The Tango device specification, as loaded from YAML or built by
+        `get_device_data`
+
+    bidirectional: bool
+        Whether to include details on the device that is not in the specification
+
+    Returns
+    -------
+    issues : list
+        A list of strings describing the issues, empty list for no issues
+    """
+    return format_differences(
+        get_difference_records(specification_yaml, tango_device_data, bidirectional)
     )
 
-    return "\n".join(issues)
+
+def get_difference_records(specification_yaml, tango_device_data, bidirectional):
+    """List the differences between the specification and the device as records
+
+    Parameters
+    ----------
+    specification_yaml : str
+        The specification in YAML format
+
+    tango_device_data : dict
+        The Tango device specification, as loaded from YAML or built by
+        `get_device_data`
+
+    bidirectional: bool
+        Whether to include details on the device that is not in the specification
+
+    Returns
+    -------
+    list of Difference
+        The typed difference records, empty list for no differences
+    """
+    return diff_specifications(
+        load_specification(specification_yaml), tango_device_data, bidirectional
+    )
 
 
 def check_list_dict_differences(spec_data, dev_data, type_str, bidirectional):
@@ -212,42 +558,9 @@ def check_list_dict_differences(spec_data, dev_data, type_str, bidirectional):
     issues : list
         A list of strings describing the issues, empty list for no issues
     """
-    issues = []
-    spec_data = sorted(spec_data, key=lambda i: i["name"])
-    dev_data = sorted(dev_data, key=lambda i: i["name"])
-
-    # Check that the command/attribute names match
-    spec_data_names = {i["name"] for i in spec_data}
-    dev_data_names = {i["name"] for i in dev_data}
-    if spec_data_names != dev_data_names:
-        diff = spec_data_names.difference(dev_data_names)
-        if diff:
-            diff = sorted(diff)
-            issues.append(
-                "{} differs, [{}] specified but missing in device".format(
-                    type_str, ",".join(diff)
-                )
-            )
-
-        if bidirectional:
-            diff = dev_data_names.difference(spec_data_names)
-            if diff:
-                diff = sorted(diff)
-                issues.append(
-                    "{} differs, [{}] present in device but not specified".format(
-                        type_str, ",".join(diff)
-                    )
-                )
-
-    # Check that the commands/attributes (by name) that are in both the spec and device
-    # are the same
-    mutual_names = spec_data_names.intersection(dev_data_names)
-    mutual_spec_data = filter(lambda x: x["name"] in mutual_names, spec_data)
-    mutual_dev_data = filter(lambda x: x["name"] in mutual_names, dev_data)
-    for spec, dev in zip(mutual_spec_data, mutual_dev_data):
-        issues.extend(check_single_dict_differences(spec, dev, type_str, bidirectional))
-
-    return issues
+    return format_differences(
+        diff_elements(spec_data, dev_data, type_str.lower(), bidirectional)
+    )
 
 
 def check_single_dict_differences(spec, dev, type_str, bidirectional):
@@ -285,42 +598,7 @@ def check_single_dict_differences(spec, dev, type_str, bidirectional):
         A list of strings describing the issues, empty list for no issues
     """
     assert spec["name"] == dev["name"]
-    issues = []
-
-    if spec != dev:
-        spec_keys = set(spec.keys())
-        dev_keys = set(dev.keys())
-
-        keys_not_in_spec = spec_keys.difference(dev_keys)
-        keys_not_in_dev = dev_keys.difference(spec_keys)
-        mutual_keys = spec_keys.intersection(dev_keys)
-
-        if keys_not_in_spec:
-            keys_not_in_spec = sorted(keys_not_in_spec)
-            issues.append(
-                "{} [{}] differs, specification has keys [{}] but it's "
-                "not in device".format(type_str, spec["name"], ",".join(keys_not_in_spec))
-            )
-
-        if keys_not_in_dev and bidirectional:
-            keys_not_in_dev = sorted(keys_not_in_dev)
-            issues.append(
-                "{} [{}] differs, device has keys [{}] but it's "
-                "not in the specification".format(
-                    type_str, spec["name"], ",".join(keys_not_in_dev)
-                )
-            )
-
-        for key in mutual_keys:
-            if dev[key] != spec[key]:
-                issues.append("{} [{}] differs:".format(type_str, spec["name"]))
-                issues.append(
-                    "\t{}:\n\t\tspecification: {}\n\t\tdevice: {}".format(
-                        key, spec[key], dev[key]
-                    )
-                )
-
-    return issues
+    return format_differences(diff_element(spec, dev, type_str.lower(), bidirectional))
 
 
 def check_property_differences(spec_properties, dev_properties, bidirectional):
@@ -354,32 +632,9 @@ def check_property_differences(spec_properties, dev_properties, bidirectional):
     issues : list
         A list of strings describing the issues, empty list for no issues
     """
-    issues = []
-
-    spec_props = {i["name"] for i in spec_properties}
-    dev_props = {i["name"] for i in dev_properties}
-
-    if spec_props != dev_props:
-        diff = spec_props.difference(dev_props)
-        if diff:
-            diff = sorted(diff)
-            issues.append(
-                "Property [{}] differs, specified but missing in device".format(
-                    ",".join(diff)
-                )
-            )
-
-        if bidirectional:
-            diff = dev_props.difference(spec_props)
-            if diff:
-                diff = sorted(diff)
-                issues.append(
-                    "Property [{}] differs, present in device but not specified".format(
-                        ",".join(diff)
-                    )
-                )
-
-    return issues
+    return format_differences(
+        diff_names(spec_properties, dev_properties, "property", bidirectional)
+    )
 
 
 def validate_spec_structure(specification_yaml):
@@ -390,10 +645,17 @@ def validate_spec_structure(specification_yaml):
     specification_yaml : str
         The specification in YAML format
     """
-    specification_data = yaml.load(specification_yaml, Loader=yaml.FullLoader)
-    if isinstance(specification_data, list):
-        specification_data = specification_data[0]
+    _validate_spec_data(_get_data(specification_yaml))
 
+
+def _validate_spec_data(specification_data):
+    """Make sure that the minimal specification structure is adhered to.
+
+    Parameters
+    ----------
+    specification_data : dict
+        The specification, as loaded from YAML
+    """
     passes = True
     if "class" not in specification_data:
         passes = False